@@ -0,0 +1,258 @@
+import math
+import heapq
+import itertools
+
+# the read side shared by the approximate counters - item counts that overestimate the true counts by
+# at most error(item), looked up as in a Counter
+class ApproximateCounter(object):
+    def __init__(self):
+        self.total = 0
+
+        self._counts = {}
+        self._errors = {}
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __bool__(self):
+        return bool(self._counts)
+
+    def __iter__(self):
+        return iter(self._counts)
+
+    def __contains__(self, item):
+        return item in self._counts
+
+    def __getitem__(self, item):
+        return self._counts.get(item, 0)
+
+    def get(self, item, default=None):
+        return self._counts.get(item, default)
+
+    def keys(self):
+        return self._counts.keys()
+
+    def values(self):
+        return self._counts.values()
+
+    def items(self):
+        return self._counts.items()
+
+    # merging another approximate counter adds its errors to the merged items. an item only one of the two
+    # kept may have had up to the other's max_error that wasn't kept, which is added to its count and error
+    # so a merged count is still an upper bound
+    def update(self, counts):
+        if not isinstance(counts, ApproximateCounter):
+            for item, count in counts.items():
+                self.merge_item(item, count)
+            return
+
+        total = self.total + counts.total
+        missing_error = self.max_error
+        other_error = counts.max_error
+        missing = counts.keys() - self._counts.keys()
+
+        if other_error:
+            for item in [item for item in self._counts if item not in counts]:
+                self.merge_item(item, other_error, other_error)
+
+        for item, count in counts.items():
+            error = counts.error(item)
+            if item in missing:
+                count += missing_error
+                error += missing_error
+            self.merge_item(item, count, error)
+
+        self.total = total
+
+    # an item's count and error from another counter or a snapshot
+    def merge_item(self, item, count, error=0):
+        self[item] = self[item] + count
+
+        if error and item in self._counts:
+            self._errors[item] = self._errors.get(item, 0) + error
+
+    def most_common(self, n=None):
+        if n is None:
+            return sorted(self._counts.items(), key=lambda pair: pair[1], reverse=True)
+
+        return heapq.nlargest(n, self._counts.items(), key=lambda pair: pair[1])
+
+    # max overestimate of an item's count
+    def error(self, item):
+        return self._errors.get(item, 0)
+
+    # count the item is guaranteed to have
+    def guaranteed(self, item):
+        return self._counts.get(item, 0) - self._errors.get(item, 0)
+
+# space-saving heavy hitters (metwally et al.) - keeps at most capacity items. when full a new item
+# replaces the item with the lowest count and inherits that count as its error, so an item's
+# count overestimates its true count by at most error(item) and any item with a true count over
+# total / capacity is guaranteed to be kept
+class SpaceSavingCounter(ApproximateCounter):
+    def __init__(self, capacity):
+        super().__init__()
+        self.capacity = capacity
+
+        # min heap of (count, sequence, item) - stale entries are skipped when popped and dropped on
+        # compaction, the sequence keeps items (which may not be comparable) out of comparisons
+        self._heap = []
+        self._sequence = itertools.count()
+
+    # supports the counter[item] += n idiom used for Counters
+    def __setitem__(self, item, count):
+        counts = self._counts
+        current = counts.get(item)
+
+        if current is None:
+            self.total += count
+
+            if len(counts) >= self.capacity:
+                min_count, min_item = self._pop_min()
+                del counts[min_item]
+                self._errors.pop(min_item, None)
+
+                self._errors[item] = min_count
+                count += min_count
+        else:
+            self.total += count - current
+
+        counts[item] = count
+        heapq.heappush(self._heap, (count, next(self._sequence), item))
+
+        if len(self._heap) > self.capacity * 4:
+            self._compact()
+
+    def _pop_min(self):
+        heap = self._heap
+        counts = self._counts
+        while True:
+            count, _, item = heapq.heappop(heap)
+            if counts.get(item) == count:
+                return count, item
+
+    def _compact(self):
+        sequence = self._sequence
+        self._heap = [(count, next(sequence), item) for item, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+    # bound on the error of any item, and on the true count of any item not kept
+    @property
+    def max_error(self):
+        if len(self._counts) < self.capacity:
+            return 0
+
+        return min(self._counts.values())
+
+    def __getstate__(self):
+        return {'capacity': self.capacity, 'total': self.total, 'counts': self._counts, 'errors': self._errors}
+
+    def __setstate__(self, state):
+        self.capacity = state['capacity']
+        self.total = state['total']
+        self._counts = state['counts']
+        self._errors = state['errors']
+        self._sequence = itertools.count()
+        self._compact()
+
+# lossy counting (manku and motwani) - counts are cut into buckets of 1 / error_rate and at the end of
+# each bucket the items counted no more than the buckets so far are dropped. a new item's count starts
+# from the buckets before it as its error, so as with space-saving a count overestimates by at most
+# error(item), and any item with a true count over error_rate * total is kept. between prunes an update
+# is a dict update, where space-saving pushes to its heap, which suits the many short lived items of
+# long tailed streams such as word n-grams
+class LossyCounter(ApproximateCounter):
+    def __init__(self, error_rate):
+        super().__init__()
+        self.error_rate = error_rate
+        self.width = math.ceil(1 / error_rate)
+
+        self._prune_at = self.width
+
+    # supports the counter[item] += n idiom used for Counters
+    def __setitem__(self, item, count):
+        counts = self._counts
+        current = counts.get(item)
+
+        if current is None:
+            error = self.total // self.width
+            self.total += count
+
+            if error:
+                self._errors[item] = error
+                count += error
+        else:
+            self.total += count - current
+
+        counts[item] = count
+
+        if self.total >= self._prune_at:
+            self._prune()
+
+    # one of each item, with one prune check. an item new to the counter takes the error of the buckets
+    # before the items, any prune it missed came before them
+    def add_items(self, items):
+        counts = self._counts
+        error = self.total // self.width
+        for item in items:
+            count = counts.get(item)
+            if count is None:
+                if error:
+                    self._errors[item] = error
+                counts[item] = error + 1
+            else:
+                counts[item] = count + 1
+
+        self.total += len(items)
+        if self.total >= self._prune_at:
+            self._prune()
+
+    # (item, count, error) entries of another counter or a snapshot and the total they counted. an item only
+    # one side kept may have had up to the other side's max_error pruned, which is added to its count and
+    # error (nothing when merging into an empty counter), and nothing is pruned so merging doesn't drop items
+    # the merged counts kept
+    def merge(self, entries, total):
+        counts = self._counts
+        errors = self._errors
+        missing_error = self.max_error
+        other_error = total // self.width
+
+        merged = set()
+        for item, count, error in entries:
+            merged.add(item)
+            current = counts.get(item)
+            if current is None:
+                current = missing_error
+                error += missing_error
+            counts[item] = current + count
+            if error:
+                errors[item] = errors.get(item, 0) + error
+
+        if other_error:
+            for item in counts:
+                if item not in merged:
+                    counts[item] += other_error
+                    errors[item] = errors.get(item, 0) + other_error
+
+        self.total += total
+
+    def update(self, counts):
+        if isinstance(counts, ApproximateCounter):
+            self.merge(((item, count, counts.error(item)) for item, count in counts.items()), counts.total)
+        else:
+            self.merge(((item, count, 0) for item, count in counts.items()), sum(counts.values()))
+
+    def _prune(self):
+        buckets = self.total // self.width
+        counts = self._counts
+        for item in [item for item, count in counts.items() if count <= buckets]:
+            del counts[item]
+            self._errors.pop(item, None)
+
+        self._prune_at = (buckets + 1) * self.width
+
+    # bound on the error of any item, and on the true count of any item not kept
+    @property
+    def max_error(self):
+        return self.total // self.width
@@ -0,0 +1,67 @@
+import time
+import random
+import threading
+import collections
+
+# bounded queue between the stream reading thread and the renderer. when full a put either drops the
+# oldest queued status, samples the stream or blocks the stream. sampling keeps the n-th status put
+# while the queue is full with probability maxsize / (maxsize + n), making room by dropping a random
+# queued one, and drops it otherwise - the queue spreads over the backlog like a reservoir sample while
+# queued statuses keep their order and put times
+class StatusQueue(object):
+    DROP_OLDEST = 'drop_oldest'
+    SAMPLE = 'sample'
+    BLOCK = 'block'
+    OVERFLOW_POLICIES = (DROP_OLDEST, SAMPLE, BLOCK)
+
+    def __init__(self, maxsize=1000, overflow=DROP_OLDEST):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy: {overflow}")
+
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.dropped = 0
+
+        # statuses put since the queue was last full, for sampling
+        self._seen = 0
+
+        self._items = collections.deque()
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    # items are queued with their put time so the renderer can tell how far behind it is
+    def put(self, item):
+        with self._condition:
+            items = self._items
+            if len(items) >= self.maxsize:
+                if self.overflow == self.BLOCK:
+                    while len(items) >= self.maxsize:
+                        self._condition.wait()
+                elif self.overflow == self.SAMPLE:
+                    self._seen += 1
+                    self.dropped += 1
+                    if random.random() * (self.maxsize + self._seen) >= self.maxsize:
+                        return
+                    del items[random.randrange(len(items))]
+                else:
+                    items.popleft()
+                    self.dropped += 1
+            else:
+                self._seen = 0
+
+            items.append((time.monotonic(), item))
+            self._condition.notify_all()
+
+    # waits for at least one item, returns up to max_items (put time, item) pairs
+    def get_batch(self, max_items, timeout=None):
+        with self._condition:
+            items = self._items
+            if not items and not self._condition.wait_for(lambda: items, timeout):
+                return []
+
+            batch = [items.popleft() for _ in range(min(max_items, len(items)))]
+            self._condition.notify_all()
+
+            return batch
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# the modules are scripts at the repository root, imported as they are by each other
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import tweet_corpus
+
+# synthetic corpora shared by the tests - deterministic for a seed, so a failure can be reproduced with
+# the same corpus from twitter_bench.py or tweet_corpus.py
+@pytest.fixture(scope='session')
+def stream_statuses():
+    return list(tweet_corpus.TweetCorpus(seed=1, mode=tweet_corpus.STREAM).statuses(5000))
+
+@pytest.fixture(scope='session')
+def rest_statuses():
+    return list(tweet_corpus.TweetCorpus(seed=1, mode=tweet_corpus.REST).statuses(2500))
@@ -0,0 +1,98 @@
+import math
+import time
+import types
+import random
+import threading
+import collections
+
+# tweepy style api over in-memory timelines of status json, newest first, so the timeline cache and
+# scheduler can be checked without the network. screen names match with or without @ in any case, like
+# the api's. calls are logged as (screen_name, since_id, max_id). with a rate limit only that many calls
+# are answered per window, with the rate limit headers in last_response (per thread, like a tweepy api
+# per thread) unless headers is off, and later ones raise RateLimitError. errors maps a user to
+# (call, exception) raised on that call of theirs. calls take a random delay of up to delay seconds so
+# concurrent pages finish out of order
+class FakeTimelineApi(object):
+    def __init__(self, timelines, rate_limit=0, window_seconds=1.0, headers=True, errors=None, delay=0.0, seed=1):
+        self.timelines = timelines
+        self.rate_limit = rate_limit
+        self.window_seconds = window_seconds
+        self.headers = headers
+        self.errors = errors or {}
+        self.delay = delay
+
+        self.calls = []
+        self.rate_limited = 0
+        self.most_concurrent = 0
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._rng = random.Random(seed)
+        self._user_calls = collections.Counter()
+        self._window_end = 0.0
+        self._window_calls = 0
+        self._concurrent = 0
+
+    @property
+    def last_response(self):
+        return getattr(self._local, 'response', None)
+
+    def _check_rate_limit(self):
+        import tweepy
+
+        now = time.time()
+        if now >= self._window_end:
+            self._window_end = now + self.window_seconds
+            self._window_calls = 0
+
+        if self._window_calls >= self.rate_limit:
+            self.rate_limited += 1
+            raise tweepy.RateLimitError("Rate limit exceeded")
+
+        self._window_calls += 1
+        if self.headers:
+            headers = {'x-rate-limit-remaining': str(self.rate_limit - self._window_calls),
+                       'x-rate-limit-reset': str(math.ceil(self._window_end))}
+            self._local.response = types.SimpleNamespace(headers=headers)
+
+    def user_timeline(self, screen_name, count=20, since_id=None, max_id=None, include_rts=True, **kwargs):
+        user = screen_name.lstrip('@').lower()
+        with self._lock:
+            self.calls.append((screen_name, since_id, max_id))
+            self._local.response = None
+            if self.rate_limit:
+                self._check_rate_limit()
+
+            call = self._user_calls[user]
+            self._user_calls[user] += 1
+            self._concurrent += 1
+            self.most_concurrent = max(self.most_concurrent, self._concurrent)
+            delay = self._rng.random() * self.delay
+
+        try:
+            time.sleep(delay)
+            error_call, error = self.errors.get(user, (None, None))
+            if call == error_call:
+                raise error
+        finally:
+            with self._lock:
+                self._concurrent -= 1
+
+        page = [status for status in self.timelines[user]
+                if (since_id is None or status['id'] > since_id) and (max_id is None or status['id'] <= max_id)]
+
+        # the api counts retweets before dropping them
+        page = page[:count]
+        if not include_rts:
+            page = [status for status in page if not status.get('retweeted_status')]
+
+        return page
+
+# rest corpus statuses dealt out to users in turn, each user's timeline newest first
+def get_fake_timelines(statuses, users):
+    timelines = {f"user{index}": [] for index in range(users)}
+    for index, status in enumerate(statuses):
+        timelines[f"user{index % users}"].append(status)
+
+    return {user: timeline[::-1] for user, timeline in timelines.items()}
+
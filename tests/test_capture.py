@@ -0,0 +1,52 @@
+import time
+import shutil
+
+import tweet_capture
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def lines(start, count):
+    return [f'{{"id": {number}}}' for number in range(start, start + count)]
+
+# captured tweets replay in order in their blocks, with the block after a gap flagged
+def test_capture_replay(tmp_path):
+    writer = tweet_capture.CaptureWriter(str(tmp_path), block_tweets=10).start()
+    for number, line in enumerate(lines(0, 25)):
+        writer.add(line, 1500000000 + number / 100)
+    writer.mark_gap()
+    for number, line in enumerate(lines(25, 5)):
+        writer.add(line, 1500000001 + number / 100)
+    writer.stop()
+
+    gaps = []
+    blocks = list(tweet_capture.iter_captured_blocks(str(tmp_path), on_gap=gaps.append))
+    assert [line for _, block in blocks for line in block] == lines(0, 30)
+    assert [len(block) for _, block in blocks] == [10, 10, 5, 5]
+    assert gaps == [1500000001000]
+    assert writer.tweet_count == 30 and writer.error is None
+
+# a segment that can't be written stops the capture - tweets added after are dropped, not kept in memory
+def test_capture_stops_on_write_error(tmp_path):
+    directory = tmp_path / 'capture'
+    writer = tweet_capture.CaptureWriter(str(directory), block_tweets=10, max_seconds=1).start()
+    for line in lines(0, 11):
+        writer.add(line, 1500000000)
+    wait_for(lambda: writer.block_count == 1)
+
+    # the next block starts a new segment in a directory that's gone
+    shutil.rmtree(directory)
+    for line in lines(11, 11):
+        assert writer.add(line, 1500000005)
+    wait_for(lambda: writer.error is not None)
+
+    assert isinstance(writer.error, OSError)
+    assert not writer.add(lines(22, 1)[0], 1500000005)
+    writer.mark_gap()
+    assert writer._lines == [] and not writer._blocks
+    assert writer.dropped == 12 and writer.gap_count == 0
+    writer.stop()
+    assert 'stopped on error' in writer.get_summary()
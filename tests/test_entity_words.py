@@ -0,0 +1,29 @@
+import pytest
+
+import twitter_words
+
+def count_statuses_with(statuses, fast_tokenizer, entity_words, include_retweet_words=False, batch=True):
+    tweet_words = twitter_words.TweetWords(1, 1, 0, fast_tokenizer=fast_tokenizer, entity_words=entity_words)
+    tweet_words.include_retweet_words = include_retweet_words
+    if batch:
+        tweet_words.count_statuses(statuses)
+    else:
+        for status in statuses:
+            tweet_words.count_status(status)
+
+    return tweet_words
+
+# counts with hashtags and mentions from the entities are the tokenized counts. the tokenizer's hashtags
+# run on over ' and - (#tag's) where twitter's entity stops, the corpus has none of those. nltk is slow,
+# it counts a part of the corpus
+@pytest.mark.parametrize('fast_tokenizer', [True, False])
+@pytest.mark.parametrize('include_retweet_words, batch', [(False, True), (True, True), (True, False)])
+def test_entity_words_match_tokens(stream_statuses, rest_statuses, fast_tokenizer, include_retweet_words, batch):
+    statuses = stream_statuses + rest_statuses
+    if not fast_tokenizer:
+        statuses = statuses[:1500] + rest_statuses[:1500]
+
+    expected = count_statuses_with(statuses, fast_tokenizer, False, include_retweet_words, batch)
+    entity_words = count_statuses_with(statuses, fast_tokenizer, True, include_retweet_words, batch)
+    for name in twitter_words.TweetWords.COUNTER_NAMES:
+        assert getattr(entity_words, name) == getattr(expected, name), name
@@ -0,0 +1,112 @@
+import random
+import pickle
+import collections
+
+import pytest
+
+import heavy_hitters
+
+# a zipf distributed stream over a large vocabulary - a few heavy items and a long tail of rare ones
+@pytest.fixture(scope='module')
+def stream():
+    rng = random.Random(1)
+    vocabulary = [f"w{rank}" for rank in range(1, 20001)]
+    weights = [1 / rank for rank in range(1, 20001)]
+    return rng.choices(vocabulary, weights, k=100000)
+
+def count_items(counter, items):
+    for item in items:
+        counter[item] += 1
+
+    return counter
+
+# every kept item's count is an upper bound on its true count and count - error a lower bound, and no
+# item over the guaranteed share of the total is dropped
+def assert_bounds(counter, exact, threshold):
+    assert counter.total == sum(exact.values())
+    for item, count in counter.items():
+        assert counter.guaranteed(item) <= exact[item] <= count, item
+
+    missing = [item for item, count in exact.items() if count > threshold and item not in counter]
+    assert missing == []
+
+def test_space_saving_bounds(stream):
+    exact = collections.Counter(stream)
+    counter = count_items(heavy_hitters.SpaceSavingCounter(500), stream)
+
+    assert len(counter) == 500
+    assert_bounds(counter, exact, len(stream) / 500)
+    assert counter.max_error <= len(stream) / 500
+    assert [item for item, _ in counter.most_common(10)] == [item for item, _ in exact.most_common(10)]
+
+def test_lossy_bounds(stream):
+    exact = collections.Counter(stream)
+    counter = count_items(heavy_hitters.LossyCounter(0.001), stream)
+
+    assert counter.max_error == len(stream) // 1000
+    assert all(counter.error(item) <= counter.max_error for item in counter)
+    assert_bounds(counter, exact, 0.001 * len(stream))
+    assert len(counter) < len(exact)
+
+# a tweet's items added at once, with one prune check, keep the bounds of items added one at a time
+def test_lossy_add_items(stream):
+    exact = collections.Counter()
+    counter = heavy_hitters.LossyCounter(0.001)
+    for start in range(0, len(stream), 7):
+        items = list(dict.fromkeys(stream[start:start + 7]))
+        exact.update(items)
+        counter.add_items(items)
+
+    assert counter.max_error == counter.total // 1000
+    assert_bounds(counter, exact, 0.001 * counter.total)
+
+# a pickled counter (sent back by a worker process) has the same counts and errors and counts on the same
+def test_space_saving_pickle(stream):
+    half = len(stream) // 2
+    counter = count_items(heavy_hitters.SpaceSavingCounter(500), stream[:half])
+    loaded = pickle.loads(pickle.dumps(counter))
+
+    assert dict(loaded.items()) == dict(counter.items())
+    assert loaded.total == counter.total
+    assert {item: loaded.error(item) for item in loaded} == {item: counter.error(item) for item in counter}
+
+    count_items(loaded, stream[half:])
+    count_items(counter, stream[half:])
+    assert dict(loaded.items()) == dict(counter.items())
+
+# merged shards keep the bounds of the whole stream, the errors of both shards are added
+@pytest.mark.parametrize('make_counter, threshold', [(lambda: heavy_hitters.SpaceSavingCounter(1000), 1 / 500),
+                                                     (lambda: heavy_hitters.LossyCounter(0.001), 0.002)])
+def test_merged_shards(stream, make_counter, threshold):
+    exact = collections.Counter(stream)
+    half = len(stream) // 2
+    merged = count_items(make_counter(), stream[:half])
+    merged.update(count_items(make_counter(), stream[half:]))
+
+    assert_bounds(merged, exact, threshold * len(stream))
+
+# merging a LossyCounter adds counts, errors and total as they are - nothing new takes a bucket error
+def test_lossy_merge_keeps_counts(stream):
+    shard = count_items(heavy_hitters.LossyCounter(0.001), stream[:50000])
+    merged = heavy_hitters.LossyCounter(0.001)
+    merged.update(shard)
+    merged.update(shard)
+
+    assert merged.total == 2 * shard.total
+    assert dict(merged.items()) == {item: 2 * count for item, count in shard.items()}
+    assert {item: merged.error(item) for item in merged} == {item: 2 * shard.error(item) for item in shard}
+
+# merge_item adds a counted item's error to a space-saving counter
+def test_space_saving_merge_item():
+    counter = heavy_hitters.SpaceSavingCounter(2)
+    counter.merge_item('a', 10, 3)
+    counter.merge_item('b', 5)
+    counter.merge_item('a', 2, 1)
+
+    assert counter['a'] == 12 and counter.error('a') == 4 and counter.guaranteed('a') == 8
+    assert counter['b'] == 5 and counter.error('b') == 0
+
+    # a new item replaces the smallest, inheriting its count as the error
+    counter.merge_item('c', 1)
+    assert 'b' not in counter
+    assert counter['c'] == 6 and counter.error('c') == 5
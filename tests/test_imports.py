@@ -0,0 +1,43 @@
+import sys
+import json
+import subprocess
+
+import pytest
+
+import tweet_corpus
+
+from conftest import ROOT
+
+# modules that must not load for a plain archive word count, nltk (which imports numpy itself) is only
+# allowed for its tokenizer
+HEAVY_MODULES = ('tweepy', 'requests', 'textblob', 'prettytable', 'wordcloud', 'matplotlib', 'numpy', 'PIL', 'click',
+                 'nltk')
+
+# runs twitter_words.py main in a fresh interpreter and reports the modules it loaded
+LOADED_MODULES_CODE = """
+import sys, json, runpy, contextlib, io
+sys.argv = ['twitter_words.py'] + json.loads(sys.argv[1])
+with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+    runpy.run_path('twitter_words.py', run_name='__main__')
+print(json.dumps(sorted(sys.modules)))
+"""
+
+def get_loaded_modules(arguments):
+    output = subprocess.run([sys.executable, '-c', LOADED_MODULES_CODE, json.dumps(arguments)], check=True,
+                            capture_output=True, text=True, cwd=ROOT).stdout
+    return set(json.loads(output))
+
+@pytest.mark.parametrize('arguments, allowed', [(['-ft'], ()), ([], ('nltk', 'numpy'))])
+def test_plain_count_loads_no_heavy_modules(tmp_path, arguments, allowed):
+    archive = str(tmp_path / 'corpus.jsonl')
+    tweet_corpus.write_corpus(archive, tweet_corpus.TweetCorpus(seed=1).statuses(200))
+
+    loaded = get_loaded_modules(['-a', archive] + arguments)
+    assert [module for module in HEAVY_MODULES if module in loaded and module not in allowed] == []
+
+# twitter_feed subclasses tweepy's listener, so only twitter_words is checked
+def test_import_loads_no_heavy_modules():
+    code = "import sys, json, twitter_words; print(json.dumps(sorted(sys.modules)))"
+    loaded = set(json.loads(subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                                           text=True, cwd=ROOT).stdout))
+    assert [name for name in HEAVY_MODULES if name in loaded] == []
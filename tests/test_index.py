@@ -0,0 +1,100 @@
+import collections
+
+import pytest
+
+import tweet_index
+import tweet_record
+
+# a record that is only its doc id, for indexes of more docs than the corpus has tweets
+class DocRecord(object):
+    def __init__(self, doc):
+        self.doc = doc
+
+    def to_list(self):
+        return [self.doc]
+
+# doc ids of a term with blocks of 1, 2 and 4 byte deltas, and a last block of one doc with no deltas
+MIXED_DOCS = (list(range(128)) + [1000 + n * 300 for n in range(128)] +
+              [40000 + n * 100 for n in range(127)] + [122600 + 70000] + [200000])
+
+def write_index(directory, records, doc_terms):
+    writer = tweet_index.IndexWriter(str(directory))
+    writer.add_records(records, doc_terms)
+    writer.close()
+    return tweet_index.TweetIndex(str(directory))
+
+@pytest.fixture(scope='module')
+def postings_index(tmp_path_factory):
+    mixed = set(MIXED_DOCS)
+    doc_terms = [['all'] + ['mixed'] * (doc in mixed) + ['sparse'] * (doc % 300 == 0) for doc in range(200001)]
+    index = write_index(tmp_path_factory.mktemp('postings'), map(DocRecord, range(200001)), doc_terms)
+    yield index
+    index.close()
+
+# the delta widths of a posting list's blocks
+def get_widths(postings):
+    widths = []
+    for block in range(len(postings._firsts)):
+        delta_count = min(tweet_index.BLOCK_SIZE, len(postings) - block * tweet_index.BLOCK_SIZE) - 1
+        if delta_count:
+            widths.append((postings._bounds[block + 1] - postings._bounds[block]) // delta_count)
+
+    return widths
+
+# postings decode to the doc ids written, whatever width their blocks' deltas are packed in
+@pytest.mark.parametrize('term, docs, widths', [('all', list(range(200001)), {1}),
+                                                ('sparse', list(range(0, 200001, 300)), {2}),
+                                                ('mixed', MIXED_DOCS, {1, 2, 4})])
+def test_postings_decode(postings_index, term, docs, widths):
+    postings = postings_index.get_postings(term)
+    assert len(postings) == len(docs)
+    assert len(postings._firsts) > 1
+    assert set(get_widths(postings)) == widths
+    assert list(postings) == docs
+
+# a doc is found in a posting list's block by the skip table
+def test_postings_contains(postings_index):
+    postings = postings_index.get_postings('mixed')
+    mixed = set(MIXED_DOCS)
+    for doc in range(0, 200002, 7):
+        assert (doc in postings) == (doc in mixed), doc
+    assert all(doc in postings for doc in MIXED_DOCS)
+
+@pytest.fixture(scope='module')
+def corpus_index(tmp_path_factory, stream_statuses):
+    records = list(tweet_record.iter_records(stream_statuses))
+    doc_terms = [[tweet_index.normalize_term(word) for word in record.text.split()] for record in records]
+    index = write_index(tmp_path_factory.mktemp('corpus'), records, doc_terms)
+    yield index, [terms for terms in doc_terms if terms], [record for record, terms in zip(records, doc_terms) if terms]
+    index.close()
+
+# conjunctive search finds the docs a filter over the corpus does, for terms common and rare enough to take
+# both the set and the skip table ways through the other terms
+def test_search_matches_filter(corpus_index):
+    index, doc_terms, _ = corpus_index
+    frequencies = collections.Counter(term for terms in doc_terms for term in set(terms))
+    ranked = [term for term, _ in frequencies.most_common()]
+    common, middle, rare = ranked[:5], ranked[100:105], ranked[2000:2005]
+
+    queries = ([[term] for term in common + rare] + [[a, b] for a in common for b in common if a < b] +
+               [[a, b] for a in common for b in middle] + [[a, b] for a in common for b in rare] +
+               [[a, b, c] for a in common[:2] for b in middle[:2] for c in common[2:4]])
+    found = 0
+    for query in queries:
+        expected = [doc for doc, terms in enumerate(doc_terms) if all(term in terms for term in query)]
+        assert index.search(query) == (len(expected), expected), query
+        assert index.search(query, limit=3) == (len(expected), expected[:3]), query
+        found += bool(expected)
+
+    assert found > len(queries) // 2
+
+# an unknown term matches nothing, and a doc id reads back the record indexed for it
+def test_search_records(corpus_index):
+    index, _, records = corpus_index
+    assert index.search(['no-such-term']) == (0, [])
+    assert index.search([]) == (0, [])
+
+    for doc in (0, 63, 64, len(records) - 1):
+        record = index.get_record(doc)
+        assert (record.id, record.screen_name, record.text) == (records[doc].id, records[doc].screen_name,
+                                                                records[doc].text)
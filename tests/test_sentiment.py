@@ -0,0 +1,26 @@
+import pytest
+
+import tweet_record
+import tweet_sentiment
+
+textblob = pytest.importorskip('textblob')
+
+def textblob_scores(texts):
+    return [tuple(textblob.TextBlob(text).sentiment) for text in texts]
+
+# negations carried over short words, negated modifiers and contractions score as TextBlob does
+def test_negation_texts():
+    texts = tweet_sentiment.NEGATION_TEXTS
+    scores = tweet_sentiment.LexiconSentiment().score_batch(list(texts))
+    for text, score, expected in zip(texts, scores, textblob_scores(texts)):
+        assert score == pytest.approx(expected), text
+
+# the documented tolerance on tweets - polarity and subjectivity within 0.1 of TextBlob for over 99% of texts
+def test_tolerance(stream_statuses):
+    texts = [record.text for record in tweet_record.iter_records(stream_statuses[:2000])]
+    scores = tweet_sentiment.LexiconSentiment().score_batch(texts)
+    expected = textblob_scores(texts)
+    for index in (0, 1):
+        differences = [abs(score[index] - value[index]) for score, value in zip(scores, expected)]
+        assert sum(difference <= 0.1 for difference in differences) / len(differences) > 0.99
+        assert sum(differences) / len(differences) < 0.01
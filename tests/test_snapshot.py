@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+import heavy_hitters
+import twitter_words
+import tweet_snapshot
+
+def make_words(approximate=False):
+    if approximate:
+        return twitter_words.TweetWords(1, 1, 0, fast_tokenizer=True, counter_capacity=300, ngram_size=2,
+                                        ngram_error=0.002)
+
+    return twitter_words.TweetWords(1, 1, 0, fast_tokenizer=True, ngram_size=2)
+
+def count_words(statuses, approximate=False):
+    tweet_words = make_words(approximate)
+    tweet_words.count_statuses(statuses)
+    return tweet_words
+
+def load_words(paths, approximate=False):
+    tweet_words = make_words(approximate)
+    header = tweet_snapshot.load_snapshots(tweet_words, paths)
+    return tweet_words, header
+
+# counts as a snapshot saves them, urls without an expanded url aren't saved
+def get_counts(tweet_words):
+    return {name: {item: count for item, count in counter.items() if item is not None}
+            for name, counter in tweet_words.get_counters().items()}
+
+def save_shards(tmp_path, statuses, approximate=False):
+    paths = []
+    for shard, shard_statuses in enumerate([statuses[:2000], statuses[2000:]]):
+        path = str(tmp_path / f'shard{shard}.snap.gz')
+        tweet_snapshot.save_snapshot(path, count_words(shard_statuses, approximate), len(shard_statuses))
+        paths.append(path)
+
+    return paths
+
+# a saved snapshot loads back to the counts it saved
+def test_save_load(tmp_path, stream_statuses):
+    path = str(tmp_path / 'all.snap.gz')
+    tweet_words = count_words(stream_statuses)
+    tweet_snapshot.save_snapshot(path, tweet_words, len(stream_statuses))
+
+    loaded, header = load_words([path])
+    assert get_counts(loaded) == get_counts(tweet_words)
+    assert header['tweets'] == len(stream_statuses) and not header['approximate']
+
+# snapshots of shards of an archive, merged to a file or loaded together, count as the whole archive
+def test_merged_shards(tmp_path, stream_statuses):
+    paths = save_shards(tmp_path, stream_statuses)
+    merged_path = str(tmp_path / 'merged.snap.gz')
+    header, _ = tweet_snapshot.merge_snapshots(paths, merged_path)
+    assert header['tweets'] == len(stream_statuses)
+    assert header['sources'] == paths
+
+    expected = get_counts(count_words(stream_statuses))
+    assert get_counts(load_words([merged_path])[0]) == expected
+    assert get_counts(load_words(paths)[0]) == expected
+
+# an approximate snapshot loads back with the same counts, errors and totals - the same error bounds
+def test_approximate_save_load(tmp_path, stream_statuses):
+    path = str(tmp_path / 'all.snap.gz')
+    tweet_words = count_words(stream_statuses, approximate=True)
+    tweet_snapshot.save_snapshot(path, tweet_words, len(stream_statuses))
+
+    loaded, header = load_words([path], approximate=True)
+    assert header['approximate']
+    assert get_counts(loaded) == get_counts(tweet_words)
+    for name, counter in tweet_words.get_counters().items():
+        if isinstance(counter, heavy_hitters.ApproximateCounter):
+            loaded_counter = getattr(loaded, name)
+            assert loaded_counter.total == counter.total, name
+            assert {item: loaded_counter.error(item) for item in loaded_counter} == \
+                   {item: counter.error(item) for item in counter}, name
+
+    assert loaded.ngrams.max_error == tweet_words.ngrams.max_error
+
+# merged approximate shards keep the error bounds of the exact counts of the whole archive, an item one shard
+# dropped gets that shard's max error
+def test_approximate_merged_shards(tmp_path, stream_statuses):
+    paths = save_shards(tmp_path, stream_statuses, approximate=True)
+    merged_path = str(tmp_path / 'merged.snap.gz')
+    tweet_snapshot.merge_snapshots(paths, merged_path)
+    loaded, header = load_words([merged_path], approximate=True)
+
+    exact = count_words(stream_statuses)
+    for name in ('words', 'mentions', 'hashtags', 'ngrams'):
+        counter = getattr(loaded, name)
+        exact_counts = getattr(exact, name)
+        assert counter.total == header['totals'][name] == sum(exact_counts.values()), name
+        for item, count in counter.items():
+            assert counter.guaranteed(item) <= exact_counts[item] <= count, (name, item)
+
+# entries out of snapshot order are rejected rather than merged wrong
+def test_out_of_order(tmp_path):
+    path = str(tmp_path / 'bad.snap.gz')
+    with tweet_snapshot.open_snapshot(path, 'wt') as snapshot_file:
+        snapshot_file.write(json.dumps(tweet_snapshot.make_header(2)) + "\n")
+        snapshot_file.write(json.dumps(['words', 'b', 1]) + "\n")
+        snapshot_file.write(json.dumps(['words', 'a', 1]) + "\n")
+
+    with pytest.raises(ValueError, match='out of order'):
+        tweet_snapshot.merge_snapshots([path], str(tmp_path / 'merged.snap.gz'))
+
+    with pytest.raises(ValueError, match='out of order'):
+        load_words([path])
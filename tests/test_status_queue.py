@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+import status_queue
+
+def fill(queue, count):
+    for item in range(count):
+        queue.put(item)
+
+    return queue.get_batch(count, timeout=0)
+
+def test_drop_oldest_keeps_the_newest():
+    queue = status_queue.StatusQueue(100, status_queue.StatusQueue.DROP_OLDEST)
+    batch = fill(queue, 1000)
+    assert [item for _, item in batch] == list(range(900, 1000))
+    assert queue.dropped == 900
+
+# sampled statuses stay in put order with their own put times, and spread over the whole backlog
+def test_sample_keeps_order_and_put_times():
+    random.seed(1)
+    queue = status_queue.StatusQueue(100, status_queue.StatusQueue.SAMPLE)
+    batch = fill(queue, 10000)
+
+    items = [item for _, item in batch]
+    put_times = [put_time for put_time, _ in batch]
+    assert len(items) == 100
+    assert items == sorted(items)
+    assert put_times == sorted(put_times)
+    assert queue.dropped == 10000 - 100
+
+    # a reservoir sample has about a tenth of its items in each tenth of the stream
+    tenths = [sum(1 for item in items if item // 1000 == tenth) for tenth in range(10)]
+    assert min(tenths[1:]) > 0
+    assert tenths[-1] < 50
+
+# once drained sampling starts over, the first statuses fill the queue again
+def test_sample_starts_over_when_drained():
+    queue = status_queue.StatusQueue(10, status_queue.StatusQueue.SAMPLE)
+    fill(queue, 100)
+    assert [item for _, item in fill(queue, 10)] == list(range(10))
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        status_queue.StatusQueue(10, 'drop_newest')
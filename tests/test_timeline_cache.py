@@ -0,0 +1,51 @@
+import timeline_cache
+
+from fake_timeline_api import FakeTimelineApi, get_fake_timelines
+
+# a cached timeline against the fake api: an empty cache pages back with max_id, later runs fetch only
+# newer tweets with since_id (paging back within them), a run with nothing new costs one call and older
+# tweets are fetched once until the timeline's end
+def test_timeline_cache(tmp_path, rest_statuses):
+    page_size = timeline_cache.TimelineCache.PAGE_SIZE
+    timeline = get_fake_timelines(rest_statuses[:1250], 1)['user0']
+    new_count = len(timeline) // 5
+    api = FakeTimelineApi({'user0': timeline[new_count:]})
+
+    path = str(tmp_path / "timelines.db")
+    cache = timeline_cache.TimelineCache(path)
+
+    count = page_size * 2 + page_size // 4
+    pages = -(-count // page_size)
+    assert cache.update(api, '@user0', count) == pages * page_size
+    assert [call[2] for call in api.calls] == [None] + [timeline[new_count + page * page_size - 1]['id'] - 1
+                                                       for page in range(1, pages)]
+    assert list(cache.iter_statuses('@user0', count)) == timeline[new_count:new_count + count]
+
+    # newer tweets only, since the newest cached one
+    newest_id = timeline[new_count]['id']
+    api.timelines['user0'] = timeline
+    api.calls.clear()
+    assert cache.update(api, '@user0', count) == new_count
+    assert all(call[1] == newest_id for call in api.calls)
+    assert len(api.calls) == new_count // page_size + 2
+    assert list(cache.iter_statuses('@user0')) == timeline[:new_count + pages * page_size]
+
+    # nothing new, from a reopened cache
+    cache.close()
+    cache = timeline_cache.TimelineCache(path)
+    api.calls.clear()
+    assert cache.update(api, '@user0', count) == 0
+    assert len(api.calls) == 1
+
+    # older tweets up to the end of the timeline, once
+    assert cache.update(api, '@user0', len(timeline) * 2) == len(timeline) - new_count - pages * page_size
+    assert cache.is_complete('@user0')
+    assert list(cache.iter_statuses('@user0')) == timeline
+    api.calls.clear()
+    cache.update(api, '@user0', len(timeline) * 2)
+    assert len(api.calls) == 1
+
+    tweets = [status for status in timeline if not status.get('retweeted_status')]
+    assert cache.get_count('@USER0', include_retweets=False) == len(tweets)
+    assert list(cache.iter_statuses('user0', 10, include_retweets=False)) == tweets[:10]
+    cache.close()
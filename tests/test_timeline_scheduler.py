@@ -0,0 +1,89 @@
+import io
+import time
+import contextlib
+import concurrent.futures
+
+import pytest
+import tweepy
+
+import timeline_scheduler
+
+from fake_timeline_api import FakeTimelineApi, get_fake_timelines
+
+COUNT = timeline_scheduler.TimelineScheduler.PAGE_SIZE * 2 + 100
+
+@pytest.fixture
+def timelines(rest_statuses):
+    return get_fake_timelines(rest_statuses, 4)
+
+def fetch(api, users, window_seconds=1.0):
+    out = io.StringIO()
+    budget = timeline_scheduler.RateLimitBudget(window_seconds=window_seconds, out=out)
+    scheduler = timeline_scheduler.TimelineScheduler(lambda: api, workers=len(users), budget=budget)
+    pages = {user: [] for user in users}
+    for user, page in scheduler.iter_pages(users, COUNT):
+        pages[user] += page
+
+    return pages, out.getvalue()
+
+# each user's pages arrive newest first without gaps or repeats whichever thread finishes first, users
+# in short end after that many tweets
+def assert_pages(pages, timelines, short=None):
+    short = short or {}
+    for user, user_pages in pages.items():
+        assert user_pages == timelines[user[1:]][:short.get(user, COUNT)], user
+
+def get_users(timelines):
+    return [f"@{user}" for user in timelines]
+
+def test_concurrent_pages(timelines):
+    api = FakeTimelineApi(timelines, delay=0.02)
+    pages, _ = fetch(api, get_users(timelines))
+    assert_pages(pages, timelines)
+    assert api.most_concurrent > 1
+    assert len(api.calls) == len(timelines) * 3
+
+# a rate limit smaller than the requests is waited out from the headers
+def test_rate_limit_headers(timelines):
+    api = FakeTimelineApi(timelines, rate_limit=8)
+    start = time.perf_counter()
+    pages, waits = fetch(api, get_users(timelines))
+    assert_pages(pages, timelines)
+    assert "rate limit: " in waits
+    assert time.perf_counter() - start >= 1
+
+# and without them from the RateLimitError
+def test_rate_limit_error(timelines):
+    api = FakeTimelineApi(timelines, rate_limit=6, headers=False)
+    pages, waits = fetch(api, get_users(timelines))
+    assert_pages(pages, timelines)
+    assert api.rate_limited
+    assert "rate limit: " in waits
+
+# tweepy errors end that user's pages
+def test_tweepy_errors(timelines):
+    api = FakeTimelineApi(timelines, errors={'user1': (0, tweepy.TweepError("Not authorized.")),
+                                             'user2': (1, tweepy.TweepError("Over capacity"))})
+    stderr = io.StringIO()
+    with contextlib.redirect_stderr(stderr):
+        pages, _ = fetch(api, get_users(timelines))
+    assert_pages(pages, timelines, {'@user1': 0, '@user2': timeline_scheduler.TimelineScheduler.PAGE_SIZE})
+    assert "@user1: Not authorized." in stderr.getvalue()
+
+# other errors are raised
+def test_other_errors_raised(timelines):
+    api = FakeTimelineApi(timelines, errors={'user3': (1, ValueError("bad page"))})
+    with pytest.raises(ValueError):
+        fetch(api, get_users(timelines))
+
+# api calls are counted from all the fetch threads, none lost to a racing increment
+def test_api_calls_counted(timelines):
+    api = FakeTimelineApi(timelines)
+    scheduler = timeline_scheduler.TimelineScheduler(lambda: api, workers=8,
+                                                     budget=timeline_scheduler.RateLimitBudget(default_limit=10 ** 6))
+    users = get_users(timelines)
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        for _ in executor.map(lambda number: scheduler.fetch_page(users[number % len(users)], 10), range(2000)):
+            pass
+
+    assert scheduler.api_calls == len(api.calls) == 2000
@@ -0,0 +1,66 @@
+import nltk
+import pytest
+
+import twitter_helper
+import twitter_words
+import tweet_tokenizer
+
+# covers the token kinds nltk TweetTokenizer splits out
+SAMPLE_TWEETS = [
+    "RT @NASA: Launch day! Watch live at https://t.co/Xy12AbCdEf #Artemis #NASA",
+    "@jack @biz this is a reply with a mention in the middle @Some_User and a url http://example.com/path?a=1&b=2",
+    "Climate change is real &amp; it's happening now... #ClimateChange #climate_action",
+    "Sooooo goooood!!!!! :-) :D <3 ;) xD :-(",
+    "Call 555-123-4567 or +1 (800) 555-0199 or mail me@example.com",
+    "prices rose 3.5% to $1,234.56 on 12/05 at 10:30",
+    "well-known, state-of-the-art, don't won't can't isn't",
+    "über café naïve résumé Zürich 東京 Москва",
+    "visit www.example.org or example.co.uk/page (see wikipedia.org/wiki/Foo_(bar))",
+    "-> <- --> <-- <b>html</b> &lt;tag&gt; . . . ...",
+    "#a ## #1 #hash-tag #hash'tag #_underscore_ # alone",
+    "@averyveryverylongscreenname is too long, @ok_name is fine, @@double",
+    "emoji 😀😀😀😀 and symbols ★★★★★ ✓",
+    "RT @someone: retweeted text with #tags and @names https://t.co/abc",
+    "Line one\nLine two\r\nLine three\ttabbed",
+    "",
+    "ALL CAPS SHOUTING WITH #UPPERCASE AND @UPPER",
+    "numbers 1 22 333 4444 55555 1st 2nd 3rd 2018-10-10",
+    "quotes \"double\" 'single' “curly” ‘curly’ «guillemets»",
+    "end with url https://t.co/abc123.",
+]
+
+@pytest.fixture(scope='module')
+def texts(stream_statuses):
+    return SAMPLE_TWEETS + [twitter_helper.get_status_text(status).replace("&amp;", "&")
+                            for status in stream_statuses[:2000]]
+
+def count_with(texts, fast_tokenizer, batch_size=0):
+    tweet_words = twitter_words.TweetWords(1, 1, 0, fast_tokenizer=fast_tokenizer)
+    if batch_size:
+        for i in range(0, len(texts), batch_size):
+            tweet_words.count_words_batch(texts[i:i + batch_size])
+    else:
+        for text in texts:
+            tweet_words.count_words(text)
+
+    return tweet_words
+
+# the fast tokenizer's tokens are nltk TweetTokenizer's
+def test_tokens_match_nltk(texts):
+    nltk_tokenizer = nltk.tokenize.TweetTokenizer()
+    fast_tokenizer = tweet_tokenizer.FastTweetTokenizer()
+
+    mismatches = [(text, nltk_tokenizer.tokenize(text), fast_tokenizer.tokenize(text)) for text in texts
+                  if fast_tokenizer.tokenize(text) != nltk_tokenizer.tokenize(text)]
+    assert mismatches == []
+
+def test_tokenize_batch_matches_tokenize(texts):
+    fast_tokenizer = tweet_tokenizer.FastTweetTokenizer()
+    assert fast_tokenizer.tokenize_batch(texts) == [fast_tokenizer.tokenize(text) for text in texts]
+
+@pytest.mark.parametrize('batch_size', [0, 7])
+def test_counts_match_nltk(texts, batch_size):
+    nltk_words = count_with(texts, False)
+    fast_words = count_with(texts, True, batch_size)
+    for name in twitter_words.TweetWords.COUNTER_NAMES:
+        assert getattr(fast_words, name) == getattr(nltk_words, name), name
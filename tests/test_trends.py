@@ -0,0 +1,44 @@
+import collections
+
+import tweet_trends
+
+from tweet_trends import MINUTE, HOUR
+
+START = 1539200000 // HOUR * HOUR
+
+def add_minutes(trend_index, minutes):
+    for minute in range(minutes):
+        trend_index.add(START + minute * MINUTE, {'hashtags': collections.Counter({f"#m{minute % 7}": 1})})
+
+# windows sum the minute and hour buckets in them, whole hours once rolled up
+def test_windows_count_rolled_up_hours():
+    trend_index = tweet_trends.TrendIndex(minute_retention=HOUR)
+    add_minutes(trend_index, 5 * 60)
+
+    counts, tweets = trend_index.get_window('hashtags', START, START + 5 * HOUR)
+    assert tweets == 5 * 60
+    assert sum(counts.values()) == 5 * 60
+    assert len(trend_index.hours) == 4
+
+    _, tweets = trend_index.get_window('hashtags', START + 4 * HOUR, START + 5 * HOUR)
+    assert tweets == 60
+
+# with an hour retention the hours out of it are dropped, the windows inside it count the same
+def test_hour_retention_drops_old_hours():
+    retention = 90 * MINUTE
+    kept = tweet_trends.TrendIndex(minute_retention=retention)
+    dropped = tweet_trends.TrendIndex(minute_retention=retention, hour_retention=retention)
+    for trend_index in (kept, dropped):
+        add_minutes(trend_index, 24 * 60)
+        trend_index.add(START + (24 * 60 - 1) * MINUTE, {'hashtags': collections.Counter({"#burst": 5})}, 0)
+
+    assert len(dropped) < 2 * 60 + 2
+    assert all(hour + HOUR > dropped.last_time - retention for hour in dropped.hours)
+    assert kept.get_bursts('hashtags', 10 * MINUTE, 60 * MINUTE)[0][0] == "#burst"
+    for window, baseline in ((10 * MINUTE, 60 * MINUTE), (30 * MINUTE, 60 * MINUTE)):
+        assert dropped.get_bursts('hashtags', window, baseline) == kept.get_bursts('hashtags', window, baseline)
+        assert dropped.get_top('hashtags', window + baseline) == kept.get_top('hashtags', window + baseline)
+
+    # a late tweet out of the retention isn't kept
+    dropped.add(START, {'hashtags': collections.Counter({"#late": 1})})
+    assert all(hour + HOUR > dropped.last_time - retention for hour in dropped.hours)
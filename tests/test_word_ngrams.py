@@ -0,0 +1,19 @@
+import heavy_hitters
+import word_ngrams
+
+# a lossy counted phrase first seen after a prune starts with the pruned count as its error - it's ranked
+# and shown by the count it's guaranteed, under phrases really counted more
+def test_lossy_phrases_ranked_by_guaranteed_count():
+    counter = heavy_hitters.LossyCounter(0.1)
+    for _ in range(5):
+        counter['climate change'] += 1
+    for word in range(30):
+        counter[str(word)] += 1
+    for _ in range(3):
+        counter['late phrase'] += 1
+
+    assert counter.error('late phrase') == 3
+    assert counter['late phrase'] > counter['climate change']
+    assert word_ngrams.get_top_ngrams(counter) == [('climate change', 5), ('late phrase', 3)]
+    assert word_ngrams.get_top_ngrams(counter, 1) == [('climate change', 5)]
+    assert word_ngrams.get_top_ngrams(counter, min_count=4) == [('climate change', 5)]
@@ -0,0 +1,28 @@
+import time
+
+import wordcloud
+import wordcloud.wordcloud
+
+import wordcloud_renderer
+
+# the font is cached by the frames' own WordCloud, the library's module is left alone
+def test_frames_leave_wordcloud_module_alone(tmp_path):
+    image_font = wordcloud.wordcloud.ImageFont
+    frames = wordcloud_renderer.WordcloudFrames(str(tmp_path / 'cloud.png'), width=200, height=100)
+    frame = frames.render({'climate': 5, 'change': 3, 'vote': 1})
+
+    assert frame.words == 3
+    assert (tmp_path / 'cloud.png').exists()
+    assert wordcloud.wordcloud.ImageFont is image_font
+    assert isinstance(wordcloud.WordCloud().font_path, str)
+
+# a dead render process doesn't hold up stop with a frame in flight
+def test_stop_returns_when_the_process_died(tmp_path):
+    renderer = wordcloud_renderer.WordcloudRenderer(str(tmp_path / 'cloud.png'), width=200, height=100).start()
+    renderer._process.kill()
+    renderer._process.join()
+    assert renderer.submit({'climate': 5, 'change': 3})
+
+    start = time.monotonic()
+    renderer.stop(timeout=30)
+    assert time.monotonic() - start < 5
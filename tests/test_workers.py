@@ -0,0 +1,26 @@
+import sys
+import subprocess
+
+import pytest
+
+import tweet_corpus
+
+from conftest import ROOT
+
+@pytest.fixture(scope='module')
+def archive(tmp_path_factory, stream_statuses):
+    path = str(tmp_path_factory.mktemp('archive') / 'corpus.jsonl.gz')
+    tweet_corpus.write_corpus(path, stream_statuses)
+    return path
+
+def report(arguments):
+    return subprocess.run([sys.executable, 'twitter_words.py'] + arguments, check=True, capture_output=True,
+                          text=True, cwd=ROOT).stdout
+
+# an archive counted by worker processes reports as one process does, lossy counted phrases too - their
+# counts depend on the order they're counted and pruned in
+@pytest.mark.parametrize('arguments', [['-ng', '3', '-nge', '0.001'], ['-ng', '2', '-nge', '0.001', '-ew'],
+                                       ['-ng', '3']])
+def test_jobs_report_matches_one_process(archive, arguments):
+    arguments = ['-a', archive, '-ft', '-t', '50'] + arguments
+    assert report(arguments + ['-j', '2']) == report(arguments + ['-j', '1'])
@@ -1,7 +1,6 @@
 import os
 import sys
 import re
-import click
 
 # iro is japanese romanji for color - saves text colors
 class IroList:
@@ -0,0 +1,122 @@
+import json
+import sqlite3
+
+# local cache of user timeline statuses (raw status json) so repeat runs only fetch tweets newer
+# than the cached ones, and older ones when more are asked for than the cache holds. api is
+# anything with a tweepy style user_timeline(screen_name=, count=, since_id=, max_id=, ...) method
+class TimelineCache(object):
+    PAGE_SIZE = 200
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS statuses (
+                user TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                is_retweet INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                PRIMARY KEY (user, id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS users (
+                user TEXT PRIMARY KEY,
+                complete INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+
+        self.api_calls = 0
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def _user_key(user):
+        return user.lstrip('@').lower()
+
+    def add_statuses(self, user, statuses):
+        rows = [(self._user_key(user), status['id'], 1 if status.get('retweeted_status') else 0, json.dumps(status))
+                for status in statuses]
+
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO statuses VALUES (?, ?, ?, ?)", rows)
+
+        return len(rows)
+
+    def get_id_range(self, user):
+        return self.connection.execute("SELECT MIN(id), MAX(id) FROM statuses WHERE user = ?",
+                                       (self._user_key(user),)).fetchone()
+
+    def get_count(self, user, include_retweets=True):
+        query = "SELECT COUNT(*) FROM statuses WHERE user = ?"
+        if not include_retweets:
+            query += " AND is_retweet = 0"
+
+        return self.connection.execute(query, (self._user_key(user),)).fetchone()[0]
+
+    # oldest end of the timeline was reached (api returns at most the latest ~3200 tweets)
+    def is_complete(self, user):
+        row = self.connection.execute("SELECT complete FROM users WHERE user = ?", (self._user_key(user),)).fetchone()
+        return bool(row and row[0])
+
+    def _set_complete(self, user):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO users VALUES (?, 1)", (self._user_key(user),))
+
+    def _fetch_page(self, api, user, **kwargs):
+        self.api_calls += 1
+        page = api.user_timeline(screen_name=user, count=self.PAGE_SIZE, include_rts=True, tweet_mode='extended',
+                                 **kwargs)
+
+        # status json from a JSONParser api, tweepy model objects keep theirs in _json
+        return [getattr(status, '_json', status) for status in page]
+
+    # retweets are always cached and filtered when read so the cache serves runs with and without -rt
+    def update(self, api, user, count, include_retweets=True):
+        min_id, max_id = self.get_id_range(user)
+        fetched = 0
+
+        # newer than the cache, paging back from the newest
+        if max_id is not None:
+            page_max_id = None
+            while True:
+                kwargs = {'since_id': max_id}
+                if page_max_id is not None:
+                    kwargs['max_id'] = page_max_id
+
+                page = self._fetch_page(api, user, **kwargs)
+                if not page:
+                    break
+
+                fetched += self.add_statuses(user, page)
+                page_max_id = min(status['id'] for status in page) - 1
+
+        # older than the cache, only while it holds fewer than count tweets
+        while self.get_count(user, include_retweets) < count and not self.is_complete(user):
+            kwargs = {}
+            if min_id is not None:
+                kwargs['max_id'] = min_id - 1
+
+            page = self._fetch_page(api, user, **kwargs)
+            if not page:
+                self._set_complete(user)
+                break
+
+            fetched += self.add_statuses(user, page)
+            min_id = min(status['id'] for status in page)
+
+        return fetched
+
+    # newest first, like the api
+    def iter_statuses(self, user, count=None, include_retweets=True):
+        query = "SELECT status FROM statuses WHERE user = ?"
+        if not include_retweets:
+            query += " AND is_retweet = 0"
+        query += " ORDER BY id DESC"
+
+        params = [self._user_key(user)]
+        if count:
+            query += " LIMIT ?"
+            params.append(count)
+
+        for row in self.connection.execute(query, params):
+            yield json.loads(row[0])
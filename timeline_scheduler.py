@@ -0,0 +1,144 @@
+import sys
+import time
+import threading
+import concurrent.futures
+
+import tweepy
+
+# remaining requests per api endpoint in the current rate limit window, shared by the fetch threads.
+# requests wait for the window to reset instead of tweepy blocking the whole process
+class RateLimitBudget(object):
+    # user auth limits for /statuses/user_timeline
+    DEFAULT_LIMIT = 900
+    WINDOW_SECONDS = 15 * 60
+
+    def __init__(self, default_limit=DEFAULT_LIMIT, window_seconds=WINDOW_SECONDS, out=sys.stderr):
+        self.default_limit = default_limit
+        self.window_seconds = window_seconds
+        self.out = out
+
+        self._condition = threading.Condition()
+        self._endpoints = {}
+
+    def _get_endpoint(self, endpoint, now):
+        budget = self._endpoints.get(endpoint)
+        if budget is None or now >= budget[1]:
+            budget = self._endpoints[endpoint] = [self.default_limit, now + self.window_seconds]
+
+        return budget
+
+    def remaining(self, endpoint):
+        with self._condition:
+            return self._get_endpoint(endpoint, time.time())[0]
+
+    def acquire(self, endpoint):
+        with self._condition:
+            while True:
+                now = time.time()
+                budget = self._get_endpoint(endpoint, now)
+                if budget[0] > 0:
+                    budget[0] -= 1
+                    return
+
+                wait_seconds = budget[1] - now + 1
+                print(f"rate limit: {endpoint} waiting {wait_seconds:.0f}s", file=self.out)
+                self._condition.wait(wait_seconds)
+
+    # remaining and reset (epoch seconds) as reported by the api
+    def update(self, endpoint, remaining, reset):
+        with self._condition:
+            budget = self._get_endpoint(endpoint, time.time())
+            budget[0] = min(budget[0], remaining)
+            budget[1] = reset
+            self._condition.notify_all()
+
+    def update_from_response(self, endpoint, response):
+        headers = getattr(response, 'headers', None) or {}
+        if 'x-rate-limit-remaining' in headers and 'x-rate-limit-reset' in headers:
+            self.update(endpoint, int(headers['x-rate-limit-remaining']), int(headers['x-rate-limit-reset']))
+
+    def exhaust(self, endpoint, reset=None):
+        with self._condition:
+            budget = self._get_endpoint(endpoint, time.time())
+            budget[0] = 0
+            if reset:
+                budget[1] = reset
+
+# fetches the timelines of many users concurrently. each thread has its own api (tweepy keeps the
+# last response per api) created by api_factory. a user's next page is requested as soon as its
+# current page arrives, so it downloads while the current page is being counted
+class TimelineScheduler(object):
+    ENDPOINT = '/statuses/user_timeline'
+    PAGE_SIZE = 200
+
+    def __init__(self, api_factory, workers=4, budget=None):
+        self.api_factory = api_factory
+        self.workers = workers
+        self.budget = budget or RateLimitBudget()
+
+        # counted by the fetch threads
+        self.api_calls = 0
+        self._calls_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get_api(self):
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = self._local.api = self.api_factory()
+
+        return api
+
+    def fetch_page(self, user, count, max_id=None, include_retweets=True):
+        api = self._get_api()
+
+        kwargs = {}
+        if max_id is not None:
+            kwargs['max_id'] = max_id
+
+        while True:
+            self.budget.acquire(self.ENDPOINT)
+            with self._calls_lock:
+                self.api_calls += 1
+            try:
+                page = api.user_timeline(screen_name=user, count=min(count, self.PAGE_SIZE),
+                                         include_rts=include_retweets, tweet_mode='extended', **kwargs)
+            except tweepy.RateLimitError:
+                self.budget.exhaust(self.ENDPOINT)
+                continue
+            finally:
+                self.budget.update_from_response(self.ENDPOINT, getattr(api, 'last_response', None))
+
+            return [getattr(status, '_json', status) for status in page]
+
+    # yields (user, statuses) pages as they arrive, up to count statuses per user
+    def iter_pages(self, users, count, include_retweets=True):
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            fetched = {user: 0 for user in users}
+            pending = {}
+
+            def submit(user, max_id=None):
+                future = executor.submit(self.fetch_page, user, count - fetched[user], max_id, include_retweets)
+                pending[future] = user
+
+            for user in users:
+                submit(user)
+
+            while pending:
+                done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    user = pending.pop(future)
+                    try:
+                        page = future.result()
+                    except tweepy.TweepError as err:
+                        print(f"{user}: {err}", file=sys.stderr)
+                        continue
+
+                    page = page[:count - fetched[user]]
+                    fetched[user] += len(page)
+
+                    # prefetch the next page before handing this one over
+                    if page and fetched[user] < count:
+                        submit(user, min(status['id'] for status in page) - 1)
+
+                    if page:
+                        yield user, page
@@ -0,0 +1,84 @@
+import sys
+import gzip
+import json
+import time
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# archives are jsonl files (plain or gzip) with one status json per line, '-' reads stdin
+def open_archive(path):
+    with open(path, 'rb') as archive_file:
+        magic = archive_file.read(2)
+
+    if magic == GZIP_MAGIC:
+        return gzip.open(path, 'rt', encoding='utf-8')
+
+    return open(path, 'r', encoding='utf-8')
+
+def read_archive_lines(paths):
+    for path in paths:
+        if path == '-':
+            archive_file = sys.stdin
+        else:
+            archive_file = open_archive(path)
+
+        try:
+            for line in archive_file:
+                line = line.strip()
+                if line:
+                    yield line
+        finally:
+            if archive_file is not sys.stdin:
+                archive_file.close()
+
+def parse_archive_lines(lines, include_retweets=True):
+    for line in lines:
+        try:
+            status = json.loads(line)
+        except ValueError:
+            continue
+
+        # skip stream control messages (delete, limit, etc.)
+        if not isinstance(status, dict) or ('text' not in status and 'full_text' not in status):
+            continue
+
+        if not include_retweets and status.get('retweeted_status'):
+            continue
+
+        yield status
+
+class TweetRate(object):
+    def __init__(self, report_every=100000, out=sys.stderr):
+        self.report_every = report_every
+        self.out = out
+        self.count = 0
+        self.start_time = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    @property
+    def rate(self):
+        elapsed = self.elapsed
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def tick(self, n=1):
+        self.count += n
+        if self.report_every and self.count % self.report_every < n:
+            self.report()
+
+    def report(self, prefix="archive"):
+        print(f"{prefix}: {self.count} tweets in {self.elapsed:.1f}s ({self.rate:.0f} tweets/sec)", file=self.out)
+
+    def track(self, items):
+        try:
+            for item in items:
+                self.tick()
+                yield item
+        finally:
+            self.report()
+
+def iter_archive_statuses(paths, include_retweets=True, report_every=100000):
+    tweet_rate = TweetRate(report_every)
+    return tweet_rate.track(parse_archive_lines(read_archive_lines(paths), include_retweets))
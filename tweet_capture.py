@@ -0,0 +1,424 @@
+import os
+import sys
+import glob
+import mmap
+import zlib
+import gzip
+import time
+import struct
+import argparse
+import datetime
+import collections
+import threading
+
+import twitter_helper
+import tweet_record
+import tweet_archive
+
+# raw stream statuses captured to rotating segment files. a segment is a series of gzip members, one per
+# block of tweets (every block_tweets tweets or block_seconds), so it is also a plain gzip jsonl archive.
+# a sidecar .idx file has a fixed size record per block - first and last receive time in ms, offset and
+# length of the block's gzip member, tweet count and flags - memory-mapped and binary searched to replay
+# a time range. receive times never go back so both times are sorted across blocks
+SEGMENT_SUFFIX = '.jsonl.gz'
+INDEX_SUFFIX = '.idx'
+
+INDEX_MAGIC = b'TWCI'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<4sI')
+INDEX_RECORD = struct.Struct('<qqQIII')
+
+# the stream disconnected before this block
+GAP_BEFORE = 1
+
+def get_index_path(segment_path):
+    return segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+def format_ms(ms):
+    return datetime.datetime.fromtimestamp(ms / 1000, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+# appends status json from the stream thread. a block is cut once it has block_tweets tweets or spans
+# block_seconds, full blocks are compressed and written by a writer thread so the stream never waits on the
+# disk. a block is written to the segment before its index record, a crash loses at most the blocks not
+# yet written. a block that can't be written (disk full, directory gone) stops the capture: the error is
+# kept in error and tweets added after it are dropped rather than queued in memory
+class CaptureWriter(object):
+    def __init__(self, directory, prefix='stream', max_bytes=64 * 1024 * 1024, max_seconds=3600, block_tweets=500,
+                 block_seconds=1.0, compresslevel=6):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.block_tweets = block_tweets
+        self.block_seconds = block_seconds
+        self.compresslevel = compresslevel
+
+        self.tweet_count = 0
+        self.block_count = 0
+        self.segment_count = 0
+        self.bytes_written = 0
+        self.gap_count = 0
+        self.dropped = 0
+        self.error = None
+
+        self._lines = []
+        self._first_ms = None
+        self._last_ms = 0
+        self._flags = 0
+        self._blocks = collections.deque()
+        self._stopping = False
+        self._condition = threading.Condition()
+
+        self._segment = None
+        self._index = None
+        self._segment_start_ms = 0
+        self._segment_bytes = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread.start()
+
+        return self
+
+    # one status json line, received now unless given (seconds). False once the capture stopped on an error
+    def add(self, raw_json, received=None):
+        received_ms = int((received if received is not None else time.time()) * 1000)
+        with self._condition:
+            if self.error is not None:
+                self.dropped += 1
+                return False
+
+            received_ms = max(received_ms, self._last_ms)
+            if self._lines and (len(self._lines) >= self.block_tweets or
+                                received_ms - self._first_ms >= self.block_seconds * 1000):
+                self._cut_block()
+
+            if not self._lines:
+                self._first_ms = received_ms
+            self._lines.append(raw_json)
+            self._last_ms = received_ms
+
+        return True
+
+    # the stream disconnected - tweets so far go out in their own block and the next block is flagged
+    def mark_gap(self):
+        with self._condition:
+            if self.error is not None:
+                return
+
+            self._cut_block()
+            self._flags = GAP_BEFORE
+            self.gap_count += 1
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+
+        if self._thread.is_alive():
+            self._thread.join()
+
+    # called holding the condition
+    def _cut_block(self):
+        if self._lines:
+            self._blocks.append((self._lines, self._first_ms, self._last_ms, self._flags))
+            self._lines = []
+            self._flags = 0
+            self._condition.notify()
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    # a block still filling after block_seconds is cut when the stream goes quiet
+                    if not self._condition.wait_for(lambda: self._stopping or self._blocks,
+                                                    timeout=self.block_seconds) or self._stopping:
+                        self._cut_block()
+                    blocks = list(self._blocks)
+                    self._blocks.clear()
+                    stopping = self._stopping
+
+                for index, block in enumerate(blocks):
+                    try:
+                        self._write_block(*block)
+                    except OSError as err:
+                        self._stop_on_error(err, blocks[index:])
+                        return
+                if stopping:
+                    break
+        finally:
+            self._close_segment()
+
+    # the block that failed, the blocks after it and the tweets still being added are dropped
+    def _stop_on_error(self, error, blocks):
+        with self._condition:
+            self.error = error
+            blocks.extend(self._blocks)
+            self.dropped += sum(len(block[0]) for block in blocks) + len(self._lines)
+            self._blocks.clear()
+            self._lines = []
+
+    def _open_segment(self, first_ms):
+        self._close_segment()
+
+        name = datetime.datetime.fromtimestamp(first_ms / 1000, datetime.timezone.utc).strftime('%Y%m%d-%H%M%S')
+        sequence = 0
+        while True:
+            path = os.path.join(self.directory, f"{self.prefix}-{name}-{sequence:04d}{SEGMENT_SUFFIX}")
+            try:
+                self._segment = open(path, 'xb')
+                break
+            except FileExistsError:
+                sequence += 1
+
+        self._index = open(get_index_path(path), 'wb')
+        self._index.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION))
+        self._index.flush()
+
+        self._segment_start_ms = first_ms
+        self._segment_bytes = 0
+        self.segment_count += 1
+
+    def _close_segment(self):
+        if self._segment is not None:
+            segment, index = self._segment, self._index
+            self._segment = self._index = None
+            try:
+                segment.close()
+            finally:
+                index.close()
+
+    def _write_block(self, lines, first_ms, last_ms, flags):
+        if (self._segment is None or self._segment_bytes >= self.max_bytes or
+                (self.max_seconds and first_ms - self._segment_start_ms >= self.max_seconds * 1000)):
+            self._open_segment(first_ms)
+
+        data = gzip.compress(("\n".join(lines) + "\n").encode('utf-8'), self.compresslevel, mtime=0)
+        self._segment.write(data)
+        self._segment.flush()
+        self._index.write(INDEX_RECORD.pack(first_ms, last_ms, self._segment_bytes, len(data), len(lines), flags))
+        self._index.flush()
+
+        self._segment_bytes += len(data)
+        self.bytes_written += len(data)
+        self.block_count += 1
+        self.tweet_count += len(lines)
+
+    def get_summary(self):
+        return (f"capture: {self.tweet_count} tweets in {self.block_count} blocks, {self.segment_count} segments "
+                f"({self.bytes_written / 1024 / 1024:.1f} MiB) to {self.directory}"
+                f"{f', {self.gap_count} gaps' if self.gap_count else ''}"
+                f"{f', stopped on error: {self.error} ({self.dropped} tweets dropped)' if self.error else ''}")
+
+# a segment's index, memory-mapped - records are read from the map when needed
+class SegmentIndex(object):
+    def __init__(self, segment_path):
+        self.segment_path = segment_path
+        self.path = get_index_path(segment_path)
+
+        self._file = open(self.path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < INDEX_HEADER.size:
+            self._file.close()
+            raise ValueError(f"{self.path}: not a capture index")
+
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = INDEX_HEADER.unpack_from(self._map, 0)
+        if magic != INDEX_MAGIC or version > INDEX_VERSION:
+            self.close()
+            raise ValueError(f"{self.path}: not a capture index or unsupported version")
+
+        # a partly written last record is left out
+        self.count = (size - INDEX_HEADER.size) // INDEX_RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    # (first_ms, last_ms, offset, length, tweets, flags)
+    def __getitem__(self, block):
+        if not 0 <= block < self.count:
+            raise IndexError(block)
+
+        return INDEX_RECORD.unpack_from(self._map, INDEX_HEADER.size + block * INDEX_RECORD.size)
+
+    @property
+    def first_ms(self):
+        return self[0][0] if self.count else None
+
+    @property
+    def last_ms(self):
+        return self[self.count - 1][1] if self.count else None
+
+    @property
+    def tweet_count(self):
+        return sum(self[block][4] for block in range(self.count))
+
+    # first block with tweets received at or after start_ms
+    def find(self, start_ms):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self[middle][1] < start_ms:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    # blocks overlapping [start_ms, end_ms), either end None for open
+    def iter_blocks(self, start_ms=None, end_ms=None):
+        block = self.find(start_ms) if start_ms is not None else 0
+        while block < self.count:
+            record = self[block]
+            if end_ms is not None and record[0] >= end_ms:
+                break
+
+            yield record
+            block += 1
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+def open_indexes(directory):
+    indexes = []
+    for segment_path in glob.glob(os.path.join(glob.escape(directory), f"*{SEGMENT_SUFFIX}")):
+        if not os.path.exists(get_index_path(segment_path)):
+            print(f"capture: {segment_path} has no index, skipped", file=sys.stderr)
+            continue
+
+        index = SegmentIndex(segment_path)
+        if len(index):
+            indexes.append(index)
+        else:
+            index.close()
+
+    indexes.sort(key=lambda index: index.first_ms)
+
+    return indexes
+
+def read_block(segment_file, offset, length):
+    segment_file.seek(offset)
+    return zlib.decompress(segment_file.read(length), wbits=31).decode('utf-8').splitlines()
+
+# (record, lines) of each captured block in [start_ms, end_ms) - to within a block, blocks span at most
+# block_seconds. on_gap(ms) is called for blocks the stream reconnected before
+def iter_captured_blocks(directory, start_ms=None, end_ms=None, on_gap=None):
+    indexes = open_indexes(directory)
+    try:
+        for index in indexes:
+            if start_ms is not None and index.last_ms < start_ms:
+                continue
+            if end_ms is not None and index.first_ms >= end_ms:
+                break
+
+            with open(index.segment_path, 'rb') as segment_file:
+                for record in index.iter_blocks(start_ms, end_ms):
+                    if record[5] & GAP_BEFORE and on_gap:
+                        on_gap(record[0])
+
+                    yield record, read_block(segment_file, record[2], record[3])
+    finally:
+        for index in indexes:
+            index.close()
+
+def list_capture(directory):
+    indexes = open_indexes(directory)
+    try:
+        for index in indexes:
+            blocks = [index[block] for block in range(len(index))]
+            gaps = sum(1 for record in blocks if record[5] & GAP_BEFORE)
+            print(f"{os.path.basename(index.segment_path)}  {format_ms(index.first_ms)} - {format_ms(index.last_ms)}  "
+                  f"{sum(record[4] for record in blocks)} tweets  {len(blocks)} blocks"
+                  f"{f'  {gaps} gaps' if gaps else ''}")
+    finally:
+        for index in indexes:
+            index.close()
+
+def replay_render(blocks):
+    import twitter_feed
+
+    listener = twitter_feed.FeedListener(queue_size=sys.maxsize)
+    renderer = twitter_feed.FeedRenderer(listener, lag_seconds=float('inf'))
+    for _, lines in blocks:
+        for line in lines:
+            listener.on_data(line)
+
+        batch = listener.status_queue.get_batch(len(listener.status_queue), timeout=0)
+        if batch:
+            renderer.render_batch(batch)
+
+def replay_words(blocks, user_args):
+    import twitter_words
+
+    tweet_words = twitter_words.TweetWords(min_word_length=user_args.min_length, min_word_frequency=user_args.min_freq,
+                                           display_top=user_args.top, fast_tokenizer=user_args.fast_tokenizer,
+                                           entity_words=user_args.entity_words)
+    tweet_rate = tweet_archive.TweetRate(report_every=0)
+    for _, lines in blocks:
+        records = [record for record in map(tweet_record.parse_record, lines)
+                   if record is not None and (user_args.retweets or not record.is_retweet)]
+        tweet_rate.tick(len(records))
+        tweet_words.count_records(records)
+
+    tweet_rate.report("replay")
+    twitter_words.print_report(tweet_words)
+
+def replay_output(blocks, path):
+    with gzip.open(path, 'wt', encoding='utf-8') if path.endswith('.gz') else open(path, 'w', encoding='utf-8') \
+            as output_file:
+        for _, lines in blocks:
+            output_file.write("\n".join(lines) + "\n")
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory', help="capture directory (twitter_feed.py --capture)")
+    parser.add_argument('-s', '--start', help="replay tweets received from TIME (utc iso or epoch seconds)",
+                        type=twitter_helper.arg_time, metavar='TIME')
+    parser.add_argument('-e', '--end', help="replay tweets received before TIME", type=twitter_helper.arg_time,
+                        metavar='TIME')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('-ls', '--list', help="list the segments and their time ranges", default=False,
+                        action='store_true')
+    action.add_argument('-w', '--words', help="count the tweets' words and print the twitter_words report",
+                        default=False, action='store_true')
+    action.add_argument('-o', '--output', help="write the tweets to a jsonl archive FILE (.gz compressed)",
+                        metavar='FILE')
+    parser.add_argument('-t', '--top', help="display top number of words by freq", type=int, default=0)
+    parser.add_argument('-l', '--min_length', help="min word length", type=int, default=1)
+    parser.add_argument('-f', '--min_freq', help="min word frequency", type=int, default=1)
+    parser.add_argument('-rt', '--retweets', help="include retweets", default=False, action='store_true')
+    parser.add_argument('-ft', '--fast_tokenizer', help="use the compiled tweet tokenizer instead of nltk",
+                        default=False, action='store_true')
+    parser.add_argument('-ew', '--entity_words', help="take hashtags and mentions from the tweet entities",
+                        default=False, action='store_true')
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    user_args = get_arguments()
+
+    if user_args.list:
+        list_capture(user_args.directory)
+        return
+
+    def on_gap(ms):
+        print(f"replay: stream reconnected before {format_ms(ms)}", file=sys.stderr)
+
+    start_ms, end_ms = (int(seconds * 1000) if seconds is not None else None
+                        for seconds in (user_args.start, user_args.end))
+    blocks = iter_captured_blocks(user_args.directory, start_ms, end_ms, on_gap)
+    if user_args.words:
+        replay_words(blocks, user_args)
+    elif user_args.output:
+        replay_output(blocks, user_args.output)
+    else:
+        replay_render(blocks)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+import sys
+import gzip
+import html
+import json
+import random
+import argparse
+import datetime
+import itertools
+
+import twitter_helper
+
+# deterministic synthetic tweet corpus - status json like the api returns (rest timeline with
+# full_text, or stream with text and extended_tweet for tweets over 140 chars) with retweets,
+# replies, quotes, hashtags, mentions, urls and media. the same seed and options give the same corpus
+COMMON_WORDS = (
+    "the be to of and a in that have i it for not on with he as you do at this but his by from they we "
+    "say her she or an will my one all would there their what so up out if about who get which go me when "
+    "make can like time no just him know take people into year your good some could them see other than "
+    "then now look only come its over think also back after use two how our work first well way even new "
+    "want because any these give day most us is was are been has had were said did very really great love "
+    "happy sad bad best better never always today tonight tomorrow news vote election climate change game "
+    "win lost team music live watch thanks amazing awesome terrible beautiful wrong right free big little"
+).split()
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+PUNCTUATION = ("", "", "", "", ".", ",", "!", "?", "...", " &amp;", ":", " -")
+EMOTICONS = (":)", ":(", ":D", ";)", "<3", ":-)", "😀", "😂", "🔥")
+
+STREAM = 'stream'
+REST = 'rest'
+
+class TweetCorpus(object):
+    START_TIME = datetime.datetime(2018, 10, 10, 12, 0, 0)
+    FIRST_ID = 1050000000000000000
+
+    def __init__(self, seed=1, mode=STREAM, users=5000, vocabulary=20000, hashtags=1000, domains=200,
+                 retweet_rate=0.35, reply_rate=0.2, quote_rate=0.05, media_rate=0.15, url_rate=0.3,
+                 long_rate=0.2, tweets_per_second=50.0):
+        self.seed = seed
+        self.mode = mode
+        self.retweet_rate = retweet_rate
+        self.reply_rate = reply_rate
+        self.quote_rate = quote_rate
+        self.media_rate = media_rate
+        self.url_rate = url_rate
+        self.long_rate = long_rate
+        self.tweets_per_second = tweets_per_second
+
+        rng = random.Random(seed)
+        self.random = rng
+
+        self.words = list(COMMON_WORDS) + [self._make_word(rng, 3, 12) for _ in range(vocabulary)]
+        self.word_weights = self._zipf_weights(len(self.words))
+        self.hashtags = [self._make_word(rng, 3, 14).capitalize() for _ in range(hashtags)]
+        self.hashtag_weights = self._zipf_weights(hashtags)
+        self.users = [self._make_user(rng, user_id) for user_id in range(1, users + 1)]
+        self.user_weights = self._zipf_weights(users, 0.8)
+        self.domains = [f"{self._make_word(rng, 4, 10)}.{rng.choice(('com', 'org', 'net', 'co.uk', 'io'))}"
+                        for _ in range(domains)]
+
+        self.status_id = self.FIRST_ID
+        self.created_at = self.START_TIME
+        self.recent = []
+
+    # cumulative weights so random.choices does not rebuild them on every call
+    @staticmethod
+    def _zipf_weights(size, exponent=1.0):
+        return list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, size + 1)))
+
+    @staticmethod
+    def _make_word(rng, min_length, max_length):
+        return "".join(rng.choice(LETTERS) for _ in range(rng.randint(min_length, max_length)))
+
+    @classmethod
+    def _make_user(cls, rng, user_id):
+        name = cls._make_word(rng, 3, 9) + rng.choice(("", "_", "")) + str(rng.randint(0, 999))
+        return {'id': user_id, 'id_str': str(user_id), 'screen_name': name[:15], 'name': name.title(),
+                'followers_count': int(rng.paretovariate(1.2) * 50), 'lang': 'en'}
+
+    def _short_url(self):
+        return "https://t.co/" + "".join(self.random.choice(LETTERS + LETTERS.upper() + "0123456789")
+                                         for _ in range(10))
+
+    def _pick_user(self):
+        return self.random.choices(self.users, cum_weights=self.user_weights)[0]
+
+    def _next_id_and_time(self):
+        self.status_id += self.random.randint(1, 5000) << 22
+        self.created_at += datetime.timedelta(seconds=self.random.expovariate(self.tweets_per_second))
+        return self.status_id, self.created_at.strftime('%a %b %d %H:%M:%S +0000 %Y')
+
+    # entity indices count code points of the unescaped text, like the api
+    @staticmethod
+    def _text_length(text):
+        return len(html.unescape(text)) if '&' in text else len(text)
+
+    # text pieces with their entities, indices are offsets into the joined text
+    def _make_text(self, user, reply_to=None):
+        rng = self.random
+        pieces = []
+        entities = {'hashtags': [], 'symbols': [], 'user_mentions': [], 'urls': []}
+        media = []
+        length = 0
+
+        def add(piece, entity_key=None, entity=None):
+            nonlocal length
+            if pieces:
+                pieces.append(" ")
+                length += 1
+            if entity is not None:
+                entity['indices'] = [length, length + len(piece)]
+                (media if entity_key == 'media' else entities[entity_key]).append(entity)
+            pieces.append(piece)
+            length += self._text_length(piece)
+
+        if reply_to is not None:
+            add("@" + reply_to['screen_name'], 'user_mentions', self._mention(reply_to))
+
+        word_count = rng.randint(12, 40) if rng.random() < self.long_rate else rng.randint(3, 16)
+        for _ in range(word_count):
+            roll = rng.random()
+            if roll < 0.06:
+                tag = rng.choices(self.hashtags, cum_weights=self.hashtag_weights)[0]
+                add("#" + tag, 'hashtags', {'text': tag})
+            elif roll < 0.10:
+                mentioned = self._pick_user()
+                add("@" + mentioned['screen_name'], 'user_mentions', self._mention(mentioned))
+            elif roll < 0.12:
+                add(rng.choice(EMOTICONS))
+            else:
+                word = rng.choices(self.words, cum_weights=self.word_weights)[0]
+                if rng.random() < 0.1:
+                    word = word.capitalize()
+                add(word + rng.choice(PUNCTUATION))
+
+        if rng.random() < self.url_rate:
+            url = self._short_url()
+            expanded = f"https://{rng.choice(self.domains)}/{self._make_word(rng, 4, 12)}/{rng.randint(1, 99999)}"
+            add(url, 'urls', {'url': url, 'expanded_url': expanded, 'display_url': expanded[8:30]})
+
+        if rng.random() < self.media_rate:
+            url = self._short_url()
+            media_id = rng.randint(10 ** 17, 10 ** 18)
+            add(url, 'media', {'id': media_id, 'id_str': str(media_id), 'type': 'photo', 'url': url,
+                               'media_url_https': f"https://pbs.twimg.com/media/{self._make_word(rng, 15, 15)}.jpg",
+                               'expanded_url': f"https://twitter.com/{user['screen_name']}/status/1/photo/1",
+                               'display_url': "pic.twitter.com/" + url[13:]})
+
+        if media:
+            entities['media'] = media
+
+        return "".join(pieces), entities, media
+
+    @staticmethod
+    def _mention(user):
+        return {'screen_name': user['screen_name'], 'name': user['name'], 'id': user['id'], 'id_str': user['id_str']}
+
+    def _make_base_status(self, user, text, entities, media):
+        status_id, created_at = self._next_id_and_time()
+        status = {'created_at': created_at, 'id': status_id, 'id_str': str(status_id), 'user': user,
+                  'in_reply_to_status_id': None, 'in_reply_to_status_id_str': None, 'in_reply_to_user_id': None,
+                  'in_reply_to_screen_name': None, 'is_quote_status': False, 'retweet_count': 0,
+                  'favorite_count': 0, 'lang': 'en', 'source': "Twitter Web Client"}
+
+        if self.mode == REST:
+            status['full_text'] = text
+            status['truncated'] = False
+            status['display_text_range'] = [0, self._text_length(text)]
+            status['entities'] = entities
+        elif self._text_length(text) > 140:
+            # stream statuses over 140 chars are truncated with the full text in extended_tweet
+            link = self._short_url()
+            short_text = text[:140 - len(link) - 2].rstrip() + "… " + link
+            status['text'] = short_text
+            status['truncated'] = True
+            status['entities'] = {'hashtags': [], 'symbols': [], 'user_mentions': [],
+                                  'urls': [{'url': link, 'expanded_url': f"https://twitter.com/i/web/status/{status_id}",
+                                            'indices': [self._text_length(short_text) - len(link),
+                                                        self._text_length(short_text)]}]}
+            status['extended_tweet'] = {'full_text': text, 'display_text_range': [0, self._text_length(text)],
+                                        'entities': entities}
+            if media:
+                status['extended_tweet']['extended_entities'] = {'media': media}
+        else:
+            status['text'] = text
+            status['truncated'] = False
+            status['entities'] = entities
+
+        if media:
+            status['extended_entities'] = {'media': media}
+
+        return status
+
+    def make_status(self):
+        rng = self.random
+        user = self._pick_user()
+
+        # retweet of a recent status
+        if self.recent and rng.random() < self.retweet_rate:
+            original = rng.choice(self.recent)
+            original_user = original['user']
+            original_text = twitter_helper.get_status_text(original)
+            text = f"RT @{original_user['screen_name']}: {original_text}"
+            entities = {'hashtags': [], 'symbols': [], 'urls': [],
+                        'user_mentions': [dict(self._mention(original_user), indices=[3, 4 + len(original_user['screen_name'])])]}
+            shift = self._text_length(text) - self._text_length(original_text)
+            original_entities = original.get('extended_tweet', original).get('entities', original['entities'])
+            for key in ('hashtags', 'user_mentions', 'urls'):
+                for entity in original_entities.get(key, ()):
+                    start, end = entity['indices']
+                    entities[key].append(dict(entity, indices=[start + shift, end + shift]))
+
+            if self.mode != REST and self._text_length(text) > 140:
+                text = text[:139]
+                limit = self._text_length(text)
+                text += "…"
+                entities = {key: [entity for entity in values if entity['indices'][1] <= limit]
+                            for key, values in entities.items()}
+
+            status = self._make_base_status(user, text, entities, [])
+            status['retweeted_status'] = original
+            if self.mode != REST:
+                status.pop('extended_tweet', None)
+                status['truncated'] = False
+            return status
+
+        reply_to = self._pick_user() if rng.random() < self.reply_rate else None
+        text, entities, media = self._make_text(user, reply_to)
+        status = self._make_base_status(user, text, entities, media)
+
+        if reply_to is not None:
+            status['in_reply_to_screen_name'] = reply_to['screen_name']
+            status['in_reply_to_user_id'] = reply_to['id']
+            status['in_reply_to_status_id'] = self.FIRST_ID
+
+        if self.recent and rng.random() < self.quote_rate:
+            status['is_quote_status'] = True
+            quoted = rng.choice(self.recent)
+            status['quoted_status'] = {key: value for key, value in quoted.items() if key != 'quoted_status'}
+
+        self.recent.append(status)
+        if len(self.recent) > 200:
+            self.recent.pop(0)
+
+        return status
+
+    def statuses(self, count):
+        for _ in range(count):
+            yield self.make_status()
+
+def write_corpus(path, statuses):
+    corpus_file = gzip.open(path, 'wt', encoding='utf-8') if path.endswith('.gz') else open(path, 'w', encoding='utf-8')
+    count = 0
+    with corpus_file:
+        for status in statuses:
+            corpus_file.write(json.dumps(status, ensure_ascii=False))
+            corpus_file.write("\n")
+            count += 1
+
+    return count
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', help="number of tweets", type=int, default=10000)
+    parser.add_argument('-o', '--output', help="jsonl file to write (.gz for gzip), - for stdout", default='-')
+    parser.add_argument('-s', '--seed', help="random seed", type=int, default=1)
+    parser.add_argument('-m', '--mode', help="status json as from the stream or the rest timeline",
+                        choices=[STREAM, REST], default=STREAM)
+    parser.add_argument('-u', '--users', help="number of users", type=int, default=5000)
+    parser.add_argument('-v', '--vocabulary', help="number of synthetic words", type=int, default=20000)
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    user_args = get_arguments()
+
+    corpus = TweetCorpus(seed=user_args.seed, mode=user_args.mode, users=user_args.users,
+                         vocabulary=user_args.vocabulary)
+    statuses = corpus.statuses(user_args.number)
+
+    if user_args.output == '-':
+        for status in statuses:
+            print(json.dumps(status, ensure_ascii=False))
+    else:
+        count = write_corpus(user_args.output, statuses)
+        print(f"corpus: {count} tweets written to {user_args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import itertools
+import numpy
+
+# near-duplicates of recent tweets (copy-paste campaigns, templated bot tweets) found with minhash and
+# lsh. a tweet's shingles are its pairs of adjacent words with urls left out, so the t.co links and the
+# odd changed word of a template don't hide a copy. its signature is the minimum of each of SIGNATURE_SIZE
+# hash permutations over the shingle hashes - the share of equal minimums between two signatures
+# estimates the jaccard similarity of their shingles. signatures are split into BANDS bands of ROWS
+# minimums and a tweet sharing a whole band with a recent one is a candidate (about (1 / BANDS) ^ (1 / ROWS)
+# similar or more), then a duplicate when its signatures estimate at least similarity.
+#
+# the recent tweets are the last window distinct ones in a ring of signatures with a dict of band -> slot
+# per band, so memory is fixed, and duplicates aren't added to it. signatures of a batch of texts and
+# their bands (hashed to an int each) are computed in a few numpy calls, leaving a dict lookup per band
+# for each tweet
+SIGNATURE_SIZE = 32
+BANDS = 8
+ROWS = SIGNATURE_SIZE // BANDS
+
+DEFAULT_WINDOW = 5000
+DEFAULT_SIMILARITY = 0.6
+
+# tweets of fewer shingles aren't checked, short replies ("thank you so much") repeat without being copied
+MIN_SHINGLES = 4
+
+# the text's whitespace separated words without urls, its shingles are the pairs of adjacent words
+def get_words(text):
+    words = text.lower().split()
+    if "http" in text:
+        return [word for word in words if not word.startswith("http")]
+
+    return words
+
+class DuplicateDetector(object):
+    def __init__(self, window=DEFAULT_WINDOW, similarity=DEFAULT_SIMILARITY, seed=1):
+        self.window = window
+        self.similarity = similarity
+
+        self.checked_count = 0
+        self.duplicate_count = 0
+
+        # most tweets of a recent one and its duplicates
+        self.largest_group = 0
+
+        # (a * x + b) mod 2^64 with odd a, the high 32 bits taken
+        rng = numpy.random.default_rng(seed)
+        self._multipliers = rng.integers(0, 2 ** 63, SIGNATURE_SIZE, dtype=numpy.uint64) * 2 + 1
+        self._increments = rng.integers(0, 2 ** 63, SIGNATURE_SIZE, dtype=numpy.uint64)
+        self._band_multipliers = rng.integers(0, 2 ** 63, ROWS, dtype=numpy.uint64) * 2 + 1
+        self._pair_multiplier = rng.integers(0, 2 ** 63, dtype=numpy.uint64) * numpy.uint64(2) + numpy.uint64(1)
+
+        self._signatures = numpy.zeros((window, SIGNATURE_SIZE), dtype=numpy.uint32)
+        self._band_keys = [None] * window
+        self._groups = [0] * window
+        self._used = 0
+        self._next_slot = 0
+        self._buckets = [{} for _ in range(BANDS)]
+
+    def __len__(self):
+        return self._used
+
+    # signature rows of the word lists (of 2 words or more), in one array. word pairs are hashed from the
+    # words' hashes, str hashes are salted per process so signatures are only compared within one
+    def get_signatures(self, word_lists):
+        lengths = numpy.fromiter(map(len, word_lists), dtype=numpy.int64, count=len(word_lists))
+        ends = numpy.cumsum(lengths)
+        hashes = numpy.fromiter(map(hash, itertools.chain.from_iterable(word_lists)), dtype=numpy.int64,
+                                count=int(ends[-1])).view(numpy.uint64)
+        with numpy.errstate(over='ignore'):
+            shingles = hashes[:-1] * self._pair_multiplier + hashes[1:]
+
+            # the pairs from each list's last word to the next list's first
+            shingles = numpy.delete(shingles, ends[:-1] - 1)
+            values = (shingles[:, None] * self._multipliers + self._increments) >> numpy.uint64(32)
+
+        offsets = ends - lengths - numpy.arange(len(word_lists))
+
+        return numpy.minimum.reduceat(values, offsets, axis=0).astype(numpy.uint32)
+
+    # a hash of each band's rows, as lists of ints
+    def get_band_keys(self, signatures):
+        with numpy.errstate(over='ignore'):
+            keys = (signatures.reshape(-1, BANDS, ROWS).astype(numpy.uint64) * self._band_multipliers).sum(axis=2)
+
+        return keys.tolist()
+
+    # the recent slot the signature is a near-duplicate of or None
+    def _find(self, signature, band_keys):
+        checked = set()
+        for bucket, band_key in zip(self._buckets, band_keys):
+            slot = bucket.get(band_key)
+            if slot is None or slot in checked:
+                continue
+
+            checked.add(slot)
+            if numpy.count_nonzero(self._signatures[slot] == signature) >= self.similarity * SIGNATURE_SIZE:
+                return slot
+
+        return None
+
+    def _add(self, signature, band_keys):
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.window
+
+        if self._used == self.window:
+            for bucket, band_key in zip(self._buckets, self._band_keys[slot]):
+                if bucket.get(band_key) == slot:
+                    del bucket[band_key]
+        else:
+            self._used += 1
+
+        self._signatures[slot] = signature
+        self._band_keys[slot] = band_keys
+        self._groups[slot] = 1
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket[band_key] = slot
+
+    # whether each text is a near-duplicate of a recent one (or one before it in texts), distinct texts
+    # become recent ones. None texts and texts too short to tell are never duplicates
+    def check_batch(self, texts):
+        duplicates = [False] * len(texts)
+        checked = []
+        word_lists = []
+        for index, text in enumerate(texts):
+            if text is not None:
+                words = get_words(text)
+                if len(words) > MIN_SHINGLES:
+                    checked.append(index)
+                    word_lists.append(words)
+
+        if not checked:
+            return duplicates
+
+        self.checked_count += len(checked)
+        signatures = self.get_signatures(word_lists)
+        for index, signature, band_keys in zip(checked, signatures, self.get_band_keys(signatures)):
+            slot = self._find(signature, band_keys)
+            if slot is None:
+                self._add(signature, band_keys)
+                continue
+
+            duplicates[index] = True
+            self.duplicate_count += 1
+            self._groups[slot] += 1
+            if self._groups[slot] > self.largest_group:
+                self.largest_group = self._groups[slot]
+
+        return duplicates
+
+    def is_duplicate(self, text):
+        return self.check_batch([text])[0]
+
+    def get_summary(self):
+        return (f"duplicates: {self.duplicate_count} of {self.checked_count} checked tweets, largest group "
+                f"{self.largest_group} tweets")
@@ -0,0 +1,82 @@
+URL = 'url'
+MEDIA = 'media'
+HASHTAG = 'hashtag'
+MENTION = 'mention'
+# text between entities
+TEXT = 'text'
+
+# entity kinds by entities key, with the text each entity spans
+ENTITY_KINDS = (
+    ('urls', URL, lambda entity: entity['url']),
+    ('media', MEDIA, lambda entity: entity['url']),
+    ('hashtags', HASHTAG, lambda entity: f"#{entity['text']}"),
+    ('user_mentions', MENTION, lambda entity: f"@{entity['screen_name']}"),
+)
+
+# sorted non overlapping (start, end, kind, entity) spans. indices are checked against the text
+# and the entity searched for when they don't match (html escaped text shifts them)
+def get_entity_spans(text, entities):
+    spans = []
+    lower_text = None
+    for key, kind, get_entity_text in ENTITY_KINDS:
+        for entity in entities.get(key, ()):
+            entity_text = get_entity_text(entity)
+            start, end = entity.get('indices', (0, 0))
+
+            if (end - start != len(entity_text) or not text.startswith(entity_text, start) and
+                    text[start:end].lower() != entity_text.lower()):
+                if lower_text is None:
+                    lower_text = text.lower()
+                start = lower_text.find(entity_text.lower())
+                if start < 0:
+                    continue
+                end = start + len(entity_text)
+
+            spans.append((start, end, kind, entity))
+
+    if len(spans) < 2:
+        return spans
+
+    spans.sort(key=lambda span: span[0])
+
+    position = 0
+    non_overlapping = []
+    for span in spans:
+        if span[0] >= position:
+            non_overlapping.append(span)
+            position = span[1]
+
+    return non_overlapping
+
+# the text from start on split on its entities - the (kind, text) of each entity in order, the text
+# between them joined with spaces for tokenizing, and whether an entity comes before any other text.
+# the spaces around the gaps are left out, every space costs the tokenizer regex a failed match (only
+# phone numbers match across spaces, and any number of them)
+def split_entities(text, entities, start=0):
+    entity_parts = []
+    gaps = []
+    leading_entity = False
+    position = start
+    for span_start, span_end, kind, _ in get_entity_spans(text, entities) if entities else ():
+        if span_start < start:
+            continue
+
+        if span_start > position:
+            gap = text[position:span_start].strip(" ")
+            if gap:
+                gaps.append(gap)
+        if not entity_parts:
+            leading_entity = not text[start:span_start].strip()
+
+        entity_parts.append((kind, text[span_start:span_end]))
+        position = span_end
+
+    if not entity_parts:
+        return entity_parts, text[start:] if start else text, False
+
+    if position < len(text):
+        gap = text[position:].strip(" ")
+        if gap:
+            gaps.append(gap)
+
+    return entity_parts, " ".join(gaps), leading_entity
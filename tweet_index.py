@@ -0,0 +1,387 @@
+import os
+import sys
+import mmap
+import json
+import zlib
+import time
+import array
+import bisect
+import itertools
+import struct
+import argparse
+import datetime
+
+import tweet_record
+
+# an inverted index of counted tweets on disk, a directory of
+#   meta.json     format, version and counts
+#   docs.bin      the tweet records (tweet_record.TweetRecord.to_list json lines) in zlib blocks of DOC_BLOCK_SIZE
+#   docs.idx      uint64 offset of each docs block and the end of the last
+#   terms.bin     the terms, utf-8, sorted
+#   terms.idx     a TERM_RECORD per term in the same order - binary searched through a memory map
+#   postings.bin  each term's doc ids in blocks of BLOCK_SIZE: a skip table of (first doc id, offset) per
+#                 block, then the blocks' doc ids after the first as deltas packed in the fewest bytes (1, 2
+#                 or 4) that fit the block's largest delta - the width is the block's length over its deltas
+# blocks decode in one array and accumulate call, and a query decodes only the blocks it needs. a
+# conjunction filters the rarest term's doc ids through the other terms - a set of all their doc ids when
+# they are dense enough, otherwise a skip table lookup and one block per doc
+INDEX_FORMAT = 'twitter-words-index'
+INDEX_VERSION = 1
+
+BLOCK_SIZE = 128
+DOC_BLOCK_SIZE = 64
+
+# term offset, term length, postings offset, postings length, doc count
+TERM_RECORD = struct.Struct('<QIQII')
+SKIP_ENTRY = struct.Struct('<II')
+
+# array typecodes by delta width in bytes
+DELTA_TYPECODES = {1: 'B', 2: 'H', 4: 'I'}
+
+# other terms with up to this many times the rarest term's doc ids are read whole in a conjunction
+DENSE_RATIO = 16
+
+# little-endian on disk whatever the machine
+def _array_bytes(values):
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+def _pack_deltas(deltas):
+    largest = max(deltas)
+    width = 1 if largest < 0x100 else 2 if largest < 0x10000 else 4
+    return _array_bytes(array.array(DELTA_TYPECODES[width], deltas))
+
+# query terms are normalized as counted terms are
+def normalize_term(term):
+    return term.lower().strip()
+
+# records added in counting order with the terms TweetWords counted for each, records without terms are
+# left out. postings are kept in memory, packed a block at a time, until close
+class IndexWriter(object):
+    def __init__(self, directory, doc_block_size=DOC_BLOCK_SIZE, compresslevel=6):
+        self.directory = directory
+        self.doc_block_size = doc_block_size
+        self.compresslevel = compresslevel
+
+        self.doc_count = 0
+        self.term_count = 0
+        self.bytes_written = 0
+
+        # term -> [last doc id, doc count, packed blocks, skip table, deltas of the block being filled]
+        self._postings = {}
+        self._docs = []
+        self._doc_offsets = array.array('Q')
+
+        os.makedirs(directory, exist_ok=True)
+        self._docs_file = open(self._path('docs.bin'), 'wb')
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def add_records(self, records, tweet_terms):
+        postings = self._postings
+        for record, terms in zip(records, tweet_terms):
+            if not terms:
+                continue
+
+            doc = self.doc_count
+            self.doc_count += 1
+            self._docs.append(json.dumps(record.to_list(), ensure_ascii=False, separators=(',', ':')))
+            if len(self._docs) >= self.doc_block_size:
+                self._write_docs()
+
+            for term in set(terms):
+                posting = postings.get(term)
+                if posting is None:
+                    postings[term] = [doc, 1, bytearray(), array.array('I', (doc, 0)), []]
+                    continue
+
+                if posting[1] % BLOCK_SIZE:
+                    posting[4].append(doc - posting[0])
+                else:
+                    posting[2] += _pack_deltas(posting[4])
+                    posting[4] = []
+                    posting[3].extend((doc, len(posting[2])))
+
+                posting[0] = doc
+                posting[1] += 1
+
+    def _write_docs(self):
+        self._doc_offsets.append(self._docs_file.tell())
+        self._docs_file.write(zlib.compress(("\n".join(self._docs)).encode('utf-8'), self.compresslevel))
+        self._docs = []
+
+    def close(self):
+        if self._docs:
+            self._write_docs()
+        self._doc_offsets.append(self._docs_file.tell())
+        self.bytes_written = self._docs_file.tell()
+        self._docs_file.close()
+
+        with open(self._path('docs.idx'), 'wb') as docs_index_file:
+            docs_index_file.write(_array_bytes(self._doc_offsets))
+
+        terms = sorted(self._postings)
+        with open(self._path('terms.bin'), 'wb') as terms_file, \
+                open(self._path('terms.idx'), 'wb') as terms_index_file, \
+                open(self._path('postings.bin'), 'wb') as postings_file:
+            term_offset = postings_offset = 0
+            for term in terms:
+                _, count, deltas, skips, block_deltas = self._postings.pop(term)
+                if block_deltas:
+                    deltas += _pack_deltas(block_deltas)
+                term_bytes = term.encode('utf-8')
+                skip_bytes = _array_bytes(skips)
+
+                terms_file.write(term_bytes)
+                postings_file.write(skip_bytes)
+                postings_file.write(deltas)
+                terms_index_file.write(TERM_RECORD.pack(term_offset, len(term_bytes), postings_offset,
+                                                        len(skip_bytes) + len(deltas), count))
+
+                term_offset += len(term_bytes)
+                postings_offset += len(skip_bytes) + len(deltas)
+
+        self.term_count = len(terms)
+        self.bytes_written += term_offset + postings_offset + len(terms) * TERM_RECORD.size
+
+        with open(self._path('meta.json'), 'w', encoding='utf-8') as meta_file:
+            json.dump({'format': INDEX_FORMAT, 'version': INDEX_VERSION, 'docs': self.doc_count,
+                       'terms': self.term_count, 'block_size': BLOCK_SIZE, 'doc_block_size': self.doc_block_size,
+                       'created': datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')},
+                      meta_file, indent=2)
+
+    def get_summary(self):
+        return (f"index: {self.doc_count} tweets, {self.term_count} terms "
+                f"({self.bytes_written / 1024 / 1024:.1f} MiB) to {self.directory}")
+
+# the doc ids of one term, blocks decoded when first needed
+class PostingList(object):
+    def __init__(self, data, offset, length, count):
+        self.count = count
+        self._data = data
+
+        block_count = -(-count // BLOCK_SIZE)
+        skips = struct.unpack_from(f'<{block_count * 2}I', data, offset)
+        self._firsts = skips[0::2]
+
+        start = offset + block_count * SKIP_ENTRY.size
+        self._bounds = [start + block_offset for block_offset in skips[1::2]] + [offset + length]
+        self._blocks = {}
+
+    def __len__(self):
+        return self.count
+
+    def _decode_block(self, block):
+        docs = self._blocks.get(block)
+        if docs is not None:
+            return docs
+
+        data = self._data[self._bounds[block]:self._bounds[block + 1]]
+        delta_count = min(BLOCK_SIZE, self.count - block * BLOCK_SIZE) - 1
+        if delta_count:
+            deltas = array.array(DELTA_TYPECODES[len(data) // delta_count], data)
+            if sys.byteorder == 'big':
+                deltas.byteswap()
+            docs = list(itertools.accumulate(deltas, initial=self._firsts[block]))
+        else:
+            docs = [self._firsts[block]]
+
+        self._blocks[block] = docs
+        return docs
+
+    def __iter__(self):
+        for block in range(len(self._firsts)):
+            yield from self._decode_block(block)
+
+    def __contains__(self, doc):
+        block = bisect.bisect_right(self._firsts, doc) - 1
+        if block < 0:
+            return False
+
+        docs = self._decode_block(block)
+        position = bisect.bisect_left(docs, doc)
+        return position < len(docs) and docs[position] == doc
+
+class TweetIndex(object):
+    def __init__(self, directory):
+        self.directory = directory
+
+        with open(self._path('meta.json'), encoding='utf-8') as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta.get('format') != INDEX_FORMAT or self.meta.get('version', 0) > INDEX_VERSION:
+            raise ValueError(f"{directory}: not a tweet index or unsupported version")
+
+        self.doc_count = self.meta['docs']
+        self.term_count = self.meta['terms']
+        self.doc_block_size = self.meta['doc_block_size']
+
+        self._files = []
+        self._terms_index = self._map('terms.idx')
+        self._terms = self._map('terms.bin')
+        self._postings = self._map('postings.bin')
+        self._doc_offsets = self._map('docs.idx')
+        self._docs_file = open(self._path('docs.bin'), 'rb')
+
+        self._doc_block = (None, None)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    # an empty file can't be mapped, its bytes are empty
+    def _map(self, name):
+        index_file = open(self._path(name), 'rb')
+        self._files.append(index_file)
+        if not os.fstat(index_file.fileno()).st_size:
+            return b""
+
+        data = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append(data)
+        return data
+
+    def close(self):
+        self._docs_file.close()
+        for index_file in reversed(self._files):
+            index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get_term(self, position):
+        term_offset, term_length = TERM_RECORD.unpack_from(self._terms_index, position * TERM_RECORD.size)[:2]
+        return self._terms[term_offset:term_offset + term_length].decode('utf-8')
+
+    def get_postings(self, term):
+        term = normalize_term(term)
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_term(middle) < term:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == self.term_count or self._get_term(low) != term:
+            return None
+
+        _, _, offset, length, count = TERM_RECORD.unpack_from(self._terms_index, low * TERM_RECORD.size)
+        return PostingList(self._postings, offset, length, count)
+
+    # (matches, doc ids) of the tweets with all the terms, at most limit doc ids (0 for all) in counting order
+    def search(self, terms, limit=0):
+        postings = [self.get_postings(term) for term in terms]
+        if not postings or None in postings:
+            return 0, []
+
+        postings.sort(key=len)
+        rarest, others = postings[0], postings[1:]
+        if not others:
+            docs = []
+            for doc in rarest:
+                if limit and len(docs) >= limit:
+                    break
+                docs.append(doc)
+
+            return len(rarest), docs
+
+        docs = list(rarest)
+        for other in others:
+            if len(other) <= len(docs) * DENSE_RATIO:
+                other_docs = set(other)
+                docs = [doc for doc in docs if doc in other_docs]
+            else:
+                docs = [doc for doc in docs if doc in other]
+
+        return len(docs), docs[:limit] if limit else docs
+
+    def _read_doc_block(self, block):
+        if self._doc_block[0] == block:
+            return self._doc_block[1]
+
+        start, end = struct.unpack_from('<2Q', self._doc_offsets, block * 8)
+        self._docs_file.seek(start)
+        lines = zlib.decompress(self._docs_file.read(end - start)).decode('utf-8').split("\n")
+        self._doc_block = (block, lines)
+
+        return lines
+
+    def get_record(self, doc):
+        block, position = divmod(doc, self.doc_block_size)
+        return tweet_record.TweetRecord.from_list(json.loads(self._read_doc_block(block)[position]))
+
+def print_info(tweet_index):
+    sizes = {name: os.path.getsize(tweet_index._path(name))
+             for name in ('docs.bin', 'docs.idx', 'terms.bin', 'terms.idx', 'postings.bin')}
+    print(f"{tweet_index.directory}: {tweet_index.doc_count} tweets, {tweet_index.term_count} terms, "
+          f"created {tweet_index.meta['created']}")
+    for name, size in sizes.items():
+        print(f"{name:<14s}{size / 1024:>12.0f} KiB")
+
+def render_feed(records, matches):
+    import twitter_feed
+
+    listener = twitter_feed.FeedListener()
+    listener.tweet_count = matches
+    sys.stdout.write("".join(listener.render_status(record) for record in records))
+
+def render_rows(records, user_args):
+    import twitter_words
+    import tweet_output
+
+    def score_sentiments(texts):
+        return twitter_words.get_sentiments(texts, user_args.textblob)
+
+    row_writer = tweet_output.get_row_writer(user_args.show_format, score_sentiments, sys.stdout)
+    for number, record in enumerate(records, 1):
+        row_writer.add(twitter_words.get_tweet_row(number, record))
+    row_writer.close()
+
+FEED = 'feed'
+
+def get_arguments():
+    import tweet_output
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('directory', help="index directory (twitter_words.py --index)")
+    parser.add_argument('terms', help="words, #hashtags or @names the tweets must all have, none for the index "
+                        "sizes", nargs='*', metavar='TERM')
+    parser.add_argument('-n', '--number', help="show at most NUMBER matching tweets, 0 for all", type=int,
+                        default=20)
+    parser.add_argument('-sf', '--show_format', help="matching tweets as a table, a streamed table, jsonl or csv "
+                        "rows or coloured like twitter_feed", choices=tweet_output.FORMATS + (FEED,),
+                        default=tweet_output.STREAM)
+    parser.add_argument('-tb', '--textblob', help="score sentiment with textblob (slower, exact)", default=False,
+                        action='store_true')
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    user_args = get_arguments()
+
+    with TweetIndex(user_args.directory) as tweet_index:
+        if not user_args.terms:
+            print_info(tweet_index)
+            return
+
+        start = time.perf_counter()
+        matches, docs = tweet_index.search(user_args.terms, user_args.number)
+        records = [tweet_index.get_record(doc) for doc in docs]
+        search_ms = (time.perf_counter() - start) * 1000
+
+    print(f"search: {matches} tweets with {' '.join(map(normalize_term, user_args.terms))} in {search_ms:.1f} ms, "
+          f"showing {len(records)}", file=sys.stderr)
+
+    if user_args.show_format == FEED:
+        render_feed(records, matches)
+    elif records:
+        render_rows(records, user_args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import time
+import heapq
+import collections
+
+# the tracked keywords a tweet matched, as the streaming api matches them: a keyword is one or more space
+# separated words that must all be in the text in any order, matched case insensitively as whole words -
+# "python" matches "#python", "@python" and "python's" but not "pythonista", "#python" only the hashtag.
+# the keywords' distinct words are built into one aho-corasick automaton, so the text is read once
+# whatever the number of keywords
+class KeywordMatcher(object):
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keyword.strip() for keyword in keywords if keyword.strip()))
+
+        words = {}
+        self._keyword_words = []
+        for keyword in self.keywords:
+            self._keyword_words.append(frozenset(words.setdefault(word, len(words))
+                                                 for word in keyword.lower().split()))
+        self._words = list(words)
+
+        # goto, fail and output (word ids ending in a state, through its fail states too) of each state
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        for word_id, word in enumerate(self._words):
+            state = 0
+            for char in word:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = self._goto[state][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (word_id,)
+
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._output[next_state] += self._output[fail]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    @staticmethod
+    def _is_word_char(char):
+        return char.isalnum() or char == "_"
+
+    # ids of the keyword words found as whole words in text
+    def find_words(self, text):
+        text = text.lower()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        words = self._words
+        is_word_char = self._is_word_char
+
+        found = set()
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for word_id in output[state]:
+                if word_id in found:
+                    continue
+
+                word = words[word_id]
+                start = end - len(word)
+                if ((start == 0 or not is_word_char(text[start - 1]) or not is_word_char(word[0])) and
+                        (end == len(text) or not is_word_char(text[end]) or not is_word_char(word[-1]))):
+                    found.add(word_id)
+
+        return found
+
+    # matched keywords in keywords order
+    def match(self, text):
+        found = self.find_words(text)
+        if not found:
+            return []
+
+        return [keyword for keyword, keyword_words in zip(self.keywords, self._keyword_words)
+                if keyword_words <= found]
+
+# tweets and retweets matching each keyword, and their tweets per minute over the last full rate_seconds.
+# windows roll over as tweets are added, on the stream thread, and readers only see finished windows
+# (or the first one so far) so they can read from another thread
+class KeywordStats(object):
+    def __init__(self, keywords, rate_seconds=60):
+        self.keywords = keywords
+        self.rate_seconds = rate_seconds
+
+        self.tweets = collections.Counter()
+        self.retweets = collections.Counter()
+        self.unmatched = 0
+
+        self._window_start = time.monotonic()
+        self._window_tweets = collections.Counter()
+        self._rates = None
+
+    def add(self, keywords, is_retweet=False, now=None):
+        now = time.monotonic() if now is None else now
+        if now - self._window_start >= self.rate_seconds:
+            minutes = (now - self._window_start) / 60
+            self._rates = {keyword: count / minutes for keyword, count in self._window_tweets.items()}
+            self._window_tweets = collections.Counter()
+            self._window_start = now
+
+        if not keywords:
+            self.unmatched += 1
+            return
+
+        self.tweets.update(keywords)
+        self._window_tweets.update(keywords)
+        if is_retweet:
+            self.retweets.update(keywords)
+
+    # tweets per minute in the last full window, the rate so far before the first one
+    def get_rate(self, keyword, now=None):
+        rates = self._rates
+        if rates is not None:
+            return rates.get(keyword, 0.0)
+
+        minutes = ((time.monotonic() if now is None else now) - self._window_start) / 60
+        return self._window_tweets[keyword] / minutes if minutes > 0 else 0.0
+
+    # (keyword, rate) of the matched keywords with the highest rates
+    def get_top(self, top=3, now=None):
+        rates = ((keyword, self.get_rate(keyword, now)) for keyword in self.keywords if self.tweets[keyword])
+        return heapq.nlargest(top, rates, key=lambda pair: pair[1])
+
+    def get_summary(self):
+        pad_to = max(len("(no match)"), max([len(keyword) for keyword in self.keywords], default=0)) + 1
+        lines = [f"{'keyword':<{pad_to}s}{'tweets':>10s}{'retweets':>10s}{'per min':>10s}"]
+        for keyword in self.keywords:
+            lines.append(f"{keyword:<{pad_to}s}{self.tweets[keyword]:>10d}{self.retweets[keyword]:>10d}"
+                         f"{self.get_rate(keyword):>10.1f}")
+        lines.append(f"{'(no match)':<{pad_to}s}{self.unmatched:>10d}")
+
+        return "\n".join(lines)
@@ -0,0 +1,235 @@
+import os
+import re
+import json
+import time
+import atexit
+import bisect
+import threading
+import collections
+
+# stage timing histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram(object):
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # last slot counts values over the largest bucket
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    # upper bound of the bucket holding the quantile
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': self.sum, 'mean': self.sum / self.count if self.count else 0.0,
+                'max': self.max, 'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99),
+                'buckets': dict(zip([str(bound) for bound in self.buckets] + ['+Inf'], self.bucket_counts))}
+
+class _Timer(object):
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_TIMER = _NullTimer()
+
+# per stage timers, counters and gauges. disabled by default - timer() hands back a shared no-op context
+# and the other calls return straight away, hot loops can also test enabled first
+class Metrics(object):
+    def __init__(self, enabled=False, prefix="twitter"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.path = None
+
+        self.counters = collections.Counter()
+        self.gauges = {}
+        self.gauge_max = {}
+        self.histograms = {}
+
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._exporter = None
+        self._stopping = threading.Event()
+
+    def timer(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+
+        return _Timer(self, name)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.counters[name] += value
+
+    def gauge(self, name, value):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self.gauges[name] = value
+            if value > self.gauge_max.get(name, value - 1):
+                self.gauge_max[name] = value
+
+    # times each next() of an iterable - api paging, archive reading
+    def timed(self, name, iterable):
+        if not self.enabled:
+            return iterable
+
+        return self._timed(name, iterable)
+
+    def _timed(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.observe(name, time.perf_counter() - start)
+                return
+            self.observe(name, time.perf_counter() - start)
+            yield item
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def snapshot(self):
+        elapsed = self.elapsed
+        with self._lock:
+            return {'prefix': self.prefix, 'time': time.time(), 'elapsed': elapsed,
+                    'counters': dict(self.counters),
+                    'rates': {name: value / elapsed if elapsed else 0.0 for name, value in self.counters.items()},
+                    'gauges': dict(self.gauges), 'gauge_max': dict(self.gauge_max),
+                    'stages': {name: histogram.to_dict() for name, histogram in self.histograms.items()}}
+
+    @staticmethod
+    def _metric_name(name):
+        return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+    # prometheus text exposition format, for the node exporter textfile collector
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        prefix = self._metric_name(self.prefix)
+        lines = [f"# TYPE {prefix}_elapsed_seconds gauge", f"{prefix}_elapsed_seconds {snapshot['elapsed']:.6f}"]
+
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f"{prefix}_{self._metric_name(name)}"
+            lines += [f"# TYPE {metric}_total counter", f"{metric}_total {value}"]
+
+        for name, value in sorted(snapshot['gauges'].items()):
+            metric = f"{prefix}_{self._metric_name(name)}"
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}",
+                      f"# TYPE {metric}_max gauge", f"{metric}_max {snapshot['gauge_max'][name]}"]
+
+        if snapshot['stages']:
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, stage in sorted(snapshot['stages'].items()):
+                cumulative = 0
+                for bound, bucket_count in stage['buckets'].items():
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {stage["sum"]:.6f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {stage["count"]}')
+
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    # .prom files get prometheus text, anything else json. written to a temp file and renamed so a
+    # reader never sees half a file
+    def write(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+
+        output = self.to_prometheus() if path.endswith('.prom') else self.to_json()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write(output)
+        os.replace(temp_path, path)
+
+    def _export(self, interval):
+        while not self._stopping.wait(interval):
+            self.write()
+
+    def stop(self):
+        self._stopping.set()
+        if self._exporter:
+            self._exporter.join()
+            self._exporter = None
+
+        self.write()
+
+    # turns collection on, writing path on exit and every interval seconds if set
+    def enable(self, path=None, interval=0, prefix=None):
+        self.enabled = True
+        self.path = path
+        if prefix:
+            self.prefix = prefix
+
+        self._start = time.perf_counter()
+
+        if path:
+            atexit.register(self.stop)
+            if interval > 0:
+                self._exporter = threading.Thread(target=self._export, args=(interval,), daemon=True)
+                self._exporter.start()
+
+        return self
+
+# shared by the stages of a run
+METRICS = Metrics()
@@ -0,0 +1,142 @@
+import sys
+import csv
+import json
+import collections
+
+import twitter_helper
+
+# a shown tweet - formatting (wrapping, sentiment strings) is left to the writers
+TweetRow = collections.namedtuple('TweetRow', ['number', 'id', 'created', 'reply', 'retweet', 'text'])
+
+TABLE = 'table'
+STREAM = 'stream'
+JSONL = 'jsonl'
+CSV = 'csv'
+FORMATS = (TABLE, STREAM, JSONL, CSV)
+
+# rows are scored for sentiment in batches of batch_size and written as each batch fills, 0 keeps every
+# row until close. score_sentiments is a function of texts returning (polarity, subjectivity) pairs
+class RowWriter(object):
+    BATCH_SIZE = 100
+
+    def __init__(self, score_sentiments, out=sys.stdout, batch_size=BATCH_SIZE):
+        self.score_sentiments = score_sentiments
+        self.out = out
+        self.batch_size = batch_size
+        self.row_count = 0
+
+        self._rows = []
+
+    def add(self, row):
+        self._rows.append(row)
+        if self.batch_size and len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+
+        rows = self._rows
+        self._rows = []
+        self.write_rows(rows, self.score_sentiments([row.text for row in rows]))
+        self.row_count += len(rows)
+        self.out.flush()
+
+    def close(self):
+        self.flush()
+        self.finish()
+
+    def write_rows(self, rows, sentiments):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+# the original output - one prettytable printed once every row is in
+class PrettyTableWriter(RowWriter):
+    def __init__(self, score_sentiments, out=sys.stdout, batch_size=0):
+        import prettytable
+
+        super().__init__(score_sentiments, out, batch_size)
+        self.table = prettytable.PrettyTable(['', 'Created', 'Reply', 'RT', 'Text', 'Sentiment'])
+        self.table.align = "l"
+        self.table.hrules = True
+
+    def write_rows(self, rows, sentiments):
+        for row, (polarity, subjectivity) in zip(rows, sentiments):
+            self.table.add_row([row.number, row.created, row.reply, row.retweet,
+                                twitter_helper.insert_newlines(row.text, StreamTableWriter.TEXT_WIDTH),
+                                f"pol:{polarity:.2f}\nsub:{subjectivity:.2f}"])
+
+    def finish(self):
+        print("TWEETS", file=self.out)
+        print(self.table, file=self.out)
+        print(file=self.out)
+
+# the same table printed a batch at a time with fixed column widths, longer values are cut
+class StreamTableWriter(RowWriter):
+    TEXT_WIDTH = 65
+    # number, created, reply, rt, text, sentiment
+    COLUMN_WIDTHS = (7, 19, 16, 16, TEXT_WIDTH, 9)
+
+    def __init__(self, score_sentiments, out=sys.stdout, batch_size=RowWriter.BATCH_SIZE):
+        super().__init__(score_sentiments, out, batch_size)
+        self.rule = "+" + "+".join("-" * (width + 2) for width in self.COLUMN_WIDTHS) + "+\n"
+
+    def _format_line(self, values):
+        cells = (f" {str(value)[:width]:<{width}s} " for value, width in zip(values, self.COLUMN_WIDTHS))
+        return "|" + "|".join(cells) + "|\n"
+
+    def _format_row(self, row, polarity, subjectivity):
+        text_lines = [line for text_line in row.text.splitlines() or [""]
+                      for line in twitter_helper.cut_lines(text_line, self.TEXT_WIDTH) or [""]]
+        sentiment_lines = [f"pol:{polarity:.2f}", f"sub:{subjectivity:.2f}"]
+
+        lines = [self._format_line((row.number, row.created, row.reply, row.retweet, text_lines[0],
+                                    sentiment_lines[0]))]
+        for i in range(1, max(len(text_lines), len(sentiment_lines))):
+            lines.append(self._format_line(("", "", "", "", text_lines[i] if i < len(text_lines) else "",
+                                            sentiment_lines[i] if i < len(sentiment_lines) else "")))
+
+        return "".join(lines) + self.rule
+
+    def write_rows(self, rows, sentiments):
+        output = []
+        if not self.row_count:
+            output.append("TWEETS\n" + self.rule)
+            output.append(self._format_line(('', 'Created', 'Reply', 'RT', 'Text', 'Sentiment')) + self.rule)
+
+        for row, (polarity, subjectivity) in zip(rows, sentiments):
+            output.append(self._format_row(row, polarity, subjectivity))
+
+        self.out.write("".join(output))
+
+    def finish(self):
+        if self.row_count:
+            self.out.write("\n")
+
+def get_row_fields(row, polarity, subjectivity):
+    return {'number': row.number, 'id': row.id, 'created_at': row.created.isoformat() if row.created else None,
+            'reply': row.reply, 'retweet': row.retweet, 'text': row.text,
+            'polarity': round(polarity, 4), 'subjectivity': round(subjectivity, 4)}
+
+class JsonlWriter(RowWriter):
+    def write_rows(self, rows, sentiments):
+        self.out.write("".join(json.dumps(get_row_fields(row, *sentiment), ensure_ascii=False) + "\n"
+                               for row, sentiment in zip(rows, sentiments)))
+
+class CsvWriter(RowWriter):
+    FIELDS = ('number', 'id', 'created_at', 'reply', 'retweet', 'text', 'polarity', 'subjectivity')
+
+    def __init__(self, score_sentiments, out=sys.stdout, batch_size=RowWriter.BATCH_SIZE):
+        super().__init__(score_sentiments, out, batch_size)
+        self.writer = csv.DictWriter(out, fieldnames=self.FIELDS)
+        self.writer.writeheader()
+
+    def write_rows(self, rows, sentiments):
+        self.writer.writerows(get_row_fields(row, *sentiment) for row, sentiment in zip(rows, sentiments))
+
+WRITERS = {TABLE: PrettyTableWriter, STREAM: StreamTableWriter, JSONL: JsonlWriter, CSV: CsvWriter}
+
+def get_row_writer(output_format, score_sentiments, out=sys.stdout):
+    return WRITERS[output_format](score_sentiments, out)
@@ -0,0 +1,84 @@
+import json
+
+import twitter_helper
+
+# the fields of a status json that TweetWords and FeedListener use, projected once from the raw json
+# instead of a tweepy Status object graph. the rest of the json is dropped with the parsed dict.
+# created_at stays the raw string until shown, entities are those of text (the extended tweet's for
+# truncated stream statuses) for rendering, urls and media are counted from the status' own entities and
+# its extended tweet's. keywords are the tracked keywords a feed matched the tweet with
+# (tweet_keywords.KeywordMatcher)
+class TweetRecord(object):
+    __slots__ = ('id', 'created_at', 'text', 'screen_name', 'in_reply_to_screen_name', 'is_retweet', 'is_quote',
+                 'entities', 'urls', 'media', 'quoted_mentions', 'keywords')
+
+    def __repr__(self):
+        return f"TweetRecord(id={self.id!r}, screen_name={self.screen_name!r}, text={self.text!r})"
+
+    @classmethod
+    def from_json(cls, status):
+        record = cls()
+        record.id = status.get('id')
+        record.created_at = status.get('created_at')
+        record.in_reply_to_screen_name = status.get('in_reply_to_screen_name')
+        record.is_retweet = bool(status.get('retweeted_status'))
+        record.is_quote = bool(status.get('is_quote_status'))
+
+        user = status.get('user')
+        record.screen_name = user.get('screen_name') if user else None
+
+        record.text, record.entities = twitter_helper.get_status_text_entities(status)
+        record.urls = get_entity_values(status, 'entities', 'urls', 'expanded_url')
+        record.media = get_entity_values(status, 'extended_entities', 'media', 'media_url_https')
+
+        quoted_status = status.get('quoted_status')
+        quoted_mentions = quoted_status.get('entities', {}).get('user_mentions') if quoted_status else None
+        record.quoted_mentions = [user['screen_name'] for user in quoted_mentions] if quoted_mentions else ()
+        record.keywords = ()
+
+        return record
+
+    # slot values as a json list and back, for records stored in a tweet_index. lists stored before a
+    # slot was added leave it at its default
+    def to_list(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values):
+        record = cls()
+        record.keywords = ()
+        for name, value in zip(cls.__slots__, values):
+            setattr(record, name, value)
+
+        return record
+
+    @property
+    def created(self):
+        return twitter_helper.parse_created_at(self.created_at)
+
+# a value of each entity of a kind in the extended tweet's entities and in the status' own that aren't
+# among them - a truncated status' own entities only cover its shortened text and the link to the rest
+def get_entity_values(status, entities_key, kind, value_key):
+    entities = status.get(entities_key)
+    items = entities.get(kind) if entities else None
+    values = [item.get(value_key) for item in items] if items else []
+
+    extended_tweet = status.get('extended_tweet')
+    extended_entities = extended_tweet.get(entities_key) if extended_tweet else None
+    extended_items = extended_entities.get(kind) if extended_entities else None
+    if extended_items:
+        extended_values = [item.get(value_key) for item in extended_items]
+        values = extended_values + [value for value in values if value not in extended_values]
+
+    return values or ()
+
+def iter_records(statuses):
+    return map(TweetRecord.from_json, statuses)
+
+# a status record from a raw stream message, None for delete, limit and other control messages
+def parse_record(raw_data):
+    status = json.loads(raw_data)
+    if not isinstance(status, dict) or 'in_reply_to_status_id' not in status:
+        return None
+
+    return TweetRecord.from_json(status)
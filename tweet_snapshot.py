@@ -0,0 +1,203 @@
+import sys
+import gzip
+import json
+import heapq
+import argparse
+import datetime
+import itertools
+
+import heavy_hitters
+import twitter_words
+
+# TweetWords counts on disk - gzip jsonl, a header line then one [counter, item, count] line per item sorted by
+# counter (in COUNTER_NAMES order) then item. sorted snapshots from any number of hosts merge in one streaming
+# pass (heapq.merge) holding a line per input, and the merged file is itself a snapshot. since version 2 an
+# approximately counted item's line ends with its error when it has one, and the header has the totals the
+# approximate counters counted and their max errors - an item missing from a snapshot may have had up to its
+# counter's max error there, which a merge adds to the item's count and error
+SNAPSHOT_FORMAT = 'twitter-words-snapshot'
+SNAPSHOT_VERSION = 2
+
+COUNTER_NAMES = twitter_words.TweetWords.COUNTER_NAMES
+COUNTER_INDEXES = {name: index for index, name in enumerate(COUNTER_NAMES)}
+
+def open_snapshot(path, mode='rt'):
+    return gzip.open(path, mode, encoding='utf-8')
+
+def make_header(tweets=0, approximate=False, sources=None, totals=None, max_errors=None):
+    return {'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION, 'counters': list(COUNTER_NAMES),
+            'tweets': tweets, 'approximate': approximate, 'sources': sources or [], 'totals': totals or {},
+            'max_errors': max_errors or {},
+            'created': datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
+
+def read_header(snapshot_file, path):
+    line = snapshot_file.readline()
+    try:
+        header = json.loads(line)
+    except ValueError:
+        header = None
+
+    if not isinstance(header, dict) or header.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"{path}: not a twitter words snapshot")
+    if header.get('version', 0) > SNAPSHOT_VERSION:
+        raise ValueError(f"{path}: unsupported snapshot version {header['version']}")
+
+    return header
+
+def write_entries(snapshot_file, header, entries):
+    snapshot_file.write(json.dumps(header, ensure_ascii=False) + "\n")
+
+    count = 0
+    for name, item, value, error in entries:
+        entry = [name, item, value, error] if error else [name, item, value]
+        snapshot_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        count += 1
+
+    return count
+
+# (counter, item, count, error) entries of a TweetWords sorted for merging, the error is 0 for exact
+# counts. items without a value (urls with no expanded_url) are left out as they can't be ordered against
+# strings
+def iter_tweet_words_entries(tweet_words):
+    for name in COUNTER_NAMES:
+        counter = getattr(tweet_words, name)
+        get_error = counter.error if isinstance(counter, heavy_hitters.ApproximateCounter) else lambda item: 0
+        for item, value in sorted((item, value) for item, value in counter.items() if item is not None):
+            yield name, item, value, get_error(item)
+
+def save_snapshot(path, tweet_words, tweets=0, sources=None):
+    approximate = bool(tweet_words.counter_capacity or tweet_words.ngram_size and tweet_words.ngram_error)
+    totals = {name: counter.total for name, counter in tweet_words.get_counters().items()
+              if isinstance(counter, heavy_hitters.ApproximateCounter)}
+    max_errors = {name: counter.max_error for name, counter in tweet_words.get_counters().items()
+                  if isinstance(counter, heavy_hitters.ApproximateCounter) and counter.max_error}
+    header = make_header(tweets, approximate, sources, totals, max_errors)
+    with open_snapshot(path, 'wt') as snapshot_file:
+        return write_entries(snapshot_file, header, iter_tweet_words_entries(tweet_words))
+
+class SnapshotReader(object):
+    def __init__(self, path):
+        self.path = path
+        self._file = open_snapshot(path)
+        self.header = read_header(self._file, path)
+
+    # entries checked to be in snapshot order so a bad input can't silently break a merge
+    def __iter__(self):
+        last_key = None
+        for line in self._file:
+            name, item, value, *error = json.loads(line)
+            key = (COUNTER_INDEXES[name], item)
+            if last_key is not None and key <= last_key:
+                raise ValueError(f"{self.path}: entries out of order at {name} {item!r}")
+            last_key = key
+
+            yield key, value, error[0] if error else 0
+
+    def close(self):
+        self._file.close()
+
+# entries of the readers tagged with the reader's index, so an item's merged count also gets the max errors of
+# the snapshots it's missing from
+def merge_entries(readers):
+    reader_errors = [reader.header.get('max_errors', {}) for reader in readers]
+    max_errors = {name: sum(errors.get(name, 0) for errors in reader_errors) for name in COUNTER_NAMES}
+
+    tagged = [zip(reader, itertools.repeat(index)) for index, reader in enumerate(readers)]
+    merged = heapq.merge(*tagged, key=lambda pair: pair[0][0])
+    for key, entries in itertools.groupby(merged, key=lambda pair: pair[0][0]):
+        entries = list(entries)
+        name = COUNTER_NAMES[key[0]]
+        missing_error = max_errors[name] - sum(reader_errors[index].get(name, 0) for _, index in entries)
+        yield (name, key[1], sum(value for (_, value, _), _ in entries) + missing_error,
+               sum(error for (_, _, error), _ in entries) + missing_error)
+
+# a counter's total is merged only when every snapshot has it, version 1 snapshots have none. an item missing
+# from all the snapshots may have had the max errors of all of them
+def merge_headers(headers, paths):
+    totals = {}
+    max_errors = {}
+    for name in COUNTER_NAMES:
+        header_totals = [header.get('totals', {}).get(name) for header in headers]
+        if all(total is not None for total in header_totals):
+            totals[name] = sum(header_totals)
+
+        max_error = sum(header.get('max_errors', {}).get(name, 0) for header in headers)
+        if max_error:
+            max_errors[name] = max_error
+
+    return make_header(sum(header.get('tweets', 0) for header in headers),
+                       any(header.get('approximate') for header in headers),
+                       [source for header, path in zip(headers, paths) for source in header.get('sources') or [path]],
+                       totals, max_errors)
+
+def open_readers(paths):
+    readers = []
+    try:
+        for path in paths:
+            readers.append(SnapshotReader(path))
+    except Exception:
+        for reader in readers:
+            reader.close()
+        raise
+
+    return readers
+
+# streams any number of snapshots into one
+def merge_snapshots(paths, output_path):
+    readers = open_readers(paths)
+    try:
+        header = merge_headers([reader.header for reader in readers], paths)
+        with open_snapshot(output_path, 'wt') as snapshot_file:
+            count = write_entries(snapshot_file, header, merge_entries(readers))
+    finally:
+        for reader in readers:
+            reader.close()
+
+    return header, count
+
+# counts of one or more snapshots (merged as they are read) added to a TweetWords, returns the merged header
+def load_snapshots(tweet_words, paths):
+    readers = open_readers(paths)
+    try:
+        header = merge_headers([reader.header for reader in readers], paths)
+        counters = tweet_words.get_counters()
+        for name, entries in itertools.groupby(merge_entries(readers), key=lambda entry: entry[0]):
+            counter = counters[name]
+            total = header['totals'].get(name)
+            if isinstance(counter, heavy_hitters.LossyCounter):
+                # counts and errors as saved, without the error a new item would take from the counts loaded
+                # before it. snapshots without the total count it as the sum of the counts
+                entries = [(item, value, error) for _, item, value, error in entries]
+                counter.merge(entries, sum(value for _, value, _ in entries) if total is None else total)
+            elif isinstance(counter, heavy_hitters.ApproximateCounter):
+                loaded_total = counter.total
+                for _, item, value, error in entries:
+                    counter.merge_item(item, value, error)
+                if total is not None:
+                    counter.total = loaded_total + total
+            else:
+                for _, item, value, _ in entries:
+                    counter[item] = counter[item] + value
+    finally:
+        for reader in readers:
+            reader.close()
+
+    return header
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('snapshots', help="snapshot files to merge", nargs='+', metavar='FILE')
+    parser.add_argument('-o', '--output', help="merged snapshot file", required=True, metavar='FILE')
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    user_args = get_arguments()
+
+    header, count = merge_snapshots(user_args.snapshots, user_args.output)
+    print(f"snapshot: merged {len(user_args.snapshots)} snapshots of {header['tweets']} tweets, {count} items to "
+          f"{user_args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
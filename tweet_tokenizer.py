@@ -0,0 +1,223 @@
+import re
+import html.entities
+
+import twitter_helper
+
+# compiled replacement for nltk TweetTokenizer (default options) on the count_words hot path. the
+# patterns follow nltk.tokenize.casual in the same order so tokens match, with the top level
+# alternatives as named groups so a token's kind comes out of the same regex pass
+
+URLS = r"""
+  (?:
+    https?:
+    (?:
+      /{1,3}
+      |
+      [a-z0-9%]
+    )
+    |
+    [a-z0-9.\-]+[.]
+    (?:[a-z]{2,13})
+    /
+  )
+  (?:
+    [^\s()<>{}\[\]]+
+    |
+    \([^\s()]*?\([^\s()]+\)[^\s()]*?\)
+    |
+    \([^\s]+?\)
+  )+
+  (?:
+    \([^\s()]*?\([^\s()]+\)[^\s()]*?\)
+    |
+    \([^\s]+?\)
+    |
+    [^\s`!()\[\]{};:'".,<>?«»“”‘’]
+  )
+  |
+  (?:
+    (?<!@)
+    [a-z0-9]+
+    (?:[.\-][a-z0-9]+)*
+    [.]
+    (?:[a-z]{2,13})
+    \b
+    /?
+    (?!@)
+  )
+"""
+
+PHONE_NUMBERS = r"""
+    (?:
+      (?:
+        \+?[01]
+        [ *\-.\)]*
+      )?
+      (?:
+        [\(]?
+        \d{3}
+        [ *\-.\)]*
+      )?
+      \d{3}
+      [ *\-.\)]*
+      \d{4}
+    )
+"""
+
+EMOTICONS = r"""
+    (?:
+      [<>]?
+      [:;=8]
+      [\-o\*\']?
+      [\)\]\(\[dDpP/\:\}\{@\|\\]
+      |
+      [\)\]\(\[dDpP/\:\}\{@\|\\]
+      [\-o\*\']?
+      [:;=8]
+      [<>]?
+      |
+      </?3
+    )
+"""
+
+OTHER = r"""
+    <[^>\s]+>
+    |
+    [\-]+>|<[\-]+
+"""
+
+MENTIONS = r"""(?:@[\w_]+)"""
+
+HASHTAGS = r"""(?:\#+[\w_]+[\w\'_\-]*[\w_]+)"""
+
+EMAILS = r"""[\w.+-]+@[\w-]+\.(?:[\w-]\.?)+[\w-]"""
+
+WORDS = r"""
+    (?:[^\W\d_](?:[^\W\d_]|['\-_])+[^\W\d_])
+    |
+    (?:[+\-]?\d+[,/.:-]\d+[+\-]?)
+    |
+    (?:[\w_]+)
+    |
+    (?:\.(?:\s*\.){1,})
+    |
+    (?:\S)
+"""
+
+# plain letter runs ending at whitespace or simple punctuation can't start any of the earlier
+# patterns, so they are matched first to skip trying every alternative on most tokens
+PLAIN_WORDS = r"""[^\W\d_]+(?=[\s,!?")]|\Z)"""
+
+TOKEN_PATTERN = re.compile(
+    fr"(?P<plain>{PLAIN_WORDS})|(?P<url>{URLS})|(?P<phone>{PHONE_NUMBERS})|(?P<emoticon>{EMOTICONS})|(?P<other>{OTHER})|"
+    fr"(?P<mention>{MENTIONS})|(?P<hashtag>{HASHTAGS})|(?P<email>{EMAILS})|(?P<word>{WORDS})",
+    re.VERBOSE | re.IGNORECASE | re.UNICODE)
+
+# html entities as nltk replaces them - only with the closing ';' (html.unescape also takes "&amp" without
+# it), numeric references in 0x80-0x9f as cp1252 and unknown entities removed
+ENTITY_PATTERN = re.compile(r'&(#?(x?))([^&;\s]+);')
+
+def _replace_entity(match):
+    entity_body = match.group(3)
+    if match.group(1):
+        try:
+            number = int(entity_body, 16 if match.group(2) else 10)
+            if 0x80 <= number <= 0x9F:
+                return bytes((number,)).decode("cp1252")
+        except ValueError:
+            number = None
+    else:
+        number = html.entities.name2codepoint.get(entity_body)
+
+    if number is not None:
+        try:
+            return chr(number)
+        except (ValueError, OverflowError):
+            pass
+
+    return ""
+
+# nltk shortens runs of 4 or more of the same non alphanumeric character to 3
+HANG_PATTERN = re.compile(r'([^a-zA-Z0-9])\1{3,}')
+
+# token kinds as counted by TweetWords
+TOKEN_URL = 'url'
+TOKEN_HASHTAG = 'hashtag'
+TOKEN_NAME = 'name'
+TOKEN_WORD = 'word'
+
+# batched texts are joined on a separator that always tokenizes on its own
+BATCH_SEPARATOR = "\n\x00\n"
+
+def classify_token(word):
+    if twitter_helper.TwitterHelper.WORD_HTTP_PATTERN.match(word):
+        return TOKEN_URL
+
+    if word[0] == "#" and len(word) > 1:
+        return TOKEN_HASHTAG
+
+    if twitter_helper.TwitterHelper.is_screen_name(word):
+        return TOKEN_NAME
+
+    return TOKEN_WORD
+
+class FastTweetTokenizer(object):
+    # token kinds are cached, tweet vocabularies are small compared to token counts
+    MAX_CACHED_TOKENS = 200000
+
+    def __init__(self):
+        self._token_kinds = {}
+
+    @staticmethod
+    def _prepare(text):
+        if "&" in text:
+            text = ENTITY_PATTERN.sub(_replace_entity, text)
+
+        return HANG_PATTERN.sub(r'\1\1\1', text)
+
+    # same tokens as nltk TweetTokenizer().tokenize(text)
+    def tokenize(self, text):
+        return [match.group() for match in TOKEN_PATTERN.finditer(self._prepare(text))]
+
+    def tokenize_batch(self, texts):
+        return self._tokenize_joined(texts, lower=False)
+
+    def _kind(self, word):
+        kind = self._token_kinds.get(word)
+        if kind is None:
+            if len(self._token_kinds) >= self.MAX_CACHED_TOKENS:
+                self._token_kinds.clear()
+
+            kind = self._token_kinds[word] = classify_token(word)
+
+        return kind
+
+    # list of (kind, lowercase token) - the text is lowercased once instead of every token
+    def classify(self, text):
+        kind = self._kind
+        return [(kind(word), word) for word in
+                (match.group() for match in TOKEN_PATTERN.finditer(self._prepare(text).lower()))]
+
+    def classify_batch(self, texts):
+        kind = self._kind
+        return [[(kind(word), word) for word in tokens] for tokens in self._tokenize_joined(texts, lower=True)]
+
+    # one regex pass over all the texts joined together
+    def _tokenize_joined(self, texts, lower):
+        text = BATCH_SEPARATOR.join(self._prepare(text.replace("\x00", " ")) for text in texts)
+        if lower:
+            text = text.lower()
+
+        batch = []
+        tokens = []
+        for match in TOKEN_PATTERN.finditer(text):
+            word = match.group()
+            if word == "\x00":
+                batch.append(tokens)
+                tokens = []
+            else:
+                tokens.append(word)
+
+        batch.append(tokens)
+
+        return batch
@@ -0,0 +1,190 @@
+import math
+import heapq
+import datetime
+import itertools
+import calendar
+import operator
+import collections
+
+import twitter_helper
+
+MINUTE = 60
+HOUR = 3600
+
+# the TweetWords counters kept per bucket
+TREND_KINDS = ('words', 'hashtags', 'mentions')
+
+# created_at to the start of its minute (epoch seconds) parsed once per minute - the seconds are cut
+# from the key ('Wed Oct 10 20:19:24 +0000 2018' -> 'Wed Oct 10 20:19 +0000 2018')
+_minute_cache = {}
+
+def get_minute(created_at):
+    if not created_at:
+        return None
+
+    key = created_at[:16] + created_at[19:]
+    minute = _minute_cache.get(key)
+    if minute is None:
+        if len(_minute_cache) > 100000:
+            _minute_cache.clear()
+
+        created = twitter_helper.parse_created_at(created_at)
+        minute = calendar.timegm(created.timetuple()) // MINUTE * MINUTE
+        _minute_cache[key] = minute
+
+    return minute
+
+def get_record_minute(record):
+    return get_minute(record.created_at)
+
+def format_time(seconds):
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+# tweets and term counts of one minute or hour
+class TrendBucket(object):
+    __slots__ = ('tweets', 'counters')
+
+    def __init__(self, kinds):
+        self.tweets = 0
+        self.counters = {kind: collections.Counter() for kind in kinds}
+
+    def add(self, counters, tweets):
+        self.tweets += tweets
+        for kind, counter in self.counters.items():
+            counts = counters.get(kind)
+            if counts:
+                counter.update(counts)
+
+    def merge(self, other):
+        self.add(other.counters, other.tweets)
+
+# term counts of tweets in per minute buckets keyed by created_at. minutes older than minute_retention
+# before the newest tweet are rolled up into hour buckets, so memory grows with the hours covered and
+# recent windows keep minute resolution. with an hour_retention hours ending that long before the newest
+# tweet are dropped, for a stream that only queries recent windows. a window sums only the buckets in
+# it, its cost grows with the window and not with the tweets counted
+class TrendIndex(object):
+    def __init__(self, kinds=TREND_KINDS, minute_retention=6 * HOUR, hour_retention=None):
+        self.kinds = kinds
+        self.minute_retention = minute_retention
+        self.hour_retention = hour_retention
+
+        self.minutes = {}
+        self.hours = {}
+        self.tweet_count = 0
+
+        # first and last minute counted
+        self.first_time = None
+        self.last_time = None
+
+    def __len__(self):
+        return len(self.minutes) + len(self.hours)
+
+    def _get_bucket(self, buckets, start):
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = TrendBucket(self.kinds)
+
+        return bucket
+
+    # counters (by TweetWords counter name) of tweets created in minute, from get_minute. undated
+    # tweets aren't indexed
+    def add(self, minute, counters, tweets=1):
+        if minute is None:
+            return
+
+        if self.last_time is None or minute > self.last_time:
+            self.last_time = minute
+            self._roll_up()
+        if self.first_time is None or minute < self.first_time:
+            self.first_time = minute
+
+        if minute < self.last_time - self.minute_retention:
+            hour = minute // HOUR * HOUR
+            if self.hour_retention is not None and hour + HOUR <= self.last_time - self.hour_retention:
+                return
+
+            bucket = self._get_bucket(self.hours, hour)
+        else:
+            bucket = self._get_bucket(self.minutes, minute)
+
+        bucket.add(counters, tweets)
+        self.tweet_count += tweets
+
+    def _roll_up(self):
+        cutoff = self.last_time - self.minute_retention
+        for minute in [minute for minute in self.minutes if minute < cutoff]:
+            self._get_bucket(self.hours, minute // HOUR * HOUR).merge(self.minutes.pop(minute))
+
+        if self.hour_retention is not None:
+            cutoff = self.last_time - self.hour_retention
+            for hour in [hour for hour in self.hours if hour + HOUR <= cutoff]:
+                del self.hours[hour]
+
+    # bucket starts in [start, end) at step, looked up one by one or taken from the buckets when
+    # there are fewer of them than steps in the range
+    @staticmethod
+    def _iter_buckets(buckets, start, end, step):
+        first = -(-start // step) * step
+        if (end - first) // step > len(buckets):
+            return (bucket for bucket_start, bucket in buckets.items() if first <= bucket_start < end)
+
+        return (buckets[bucket_start] for bucket_start in range(first, end, step) if bucket_start in buckets)
+
+    # summed counts of kind and the number of tweets created in [start, end) (epoch seconds). times
+    # rolled up to hours count whole hours that overlap the range
+    def get_window(self, kind, start, end):
+        counts = collections.Counter()
+        tweets = 0
+
+        buckets = itertools.chain(self._iter_buckets(self.hours, start // HOUR * HOUR, end, HOUR),
+                                  self._iter_buckets(self.minutes, start, end, MINUTE))
+        for bucket in buckets:
+            counts.update(bucket.counters[kind])
+            tweets += bucket.tweets
+
+        return counts, tweets
+
+    # end of the windows - the end of the newest minute unless given
+    def get_end(self, end=None):
+        if end is not None:
+            return int(end)
+
+        return self.last_time + MINUTE if self.last_time is not None else 0
+
+    # most counted (term, count) of kind in the window seconds up to end
+    def get_top(self, kind, window, top=10, end=None, item_filter=None):
+        end = self.get_end(end)
+        counts, _ = self.get_window(kind, end - window, end)
+
+        items = counts.items()
+        if item_filter is not None:
+            items = filter(item_filter, items)
+
+        return heapq.nlargest(top, items, key=operator.itemgetter(1))
+
+    # (term, count, expected, score) of the terms of kind counted more in the window than in the
+    # baseline seconds before it. expected is the baseline count scaled by the ratio of tweets in the
+    # window to tweets in the baseline, so a busier stream alone doesn't make a burst, and the score is
+    # (count - expected) / sqrt(expected + 1) - a term new in the window scores its count. nothing bursts
+    # without tweets in the baseline to compare with
+    def get_bursts(self, kind, window, baseline, top=10, end=None, min_count=3, item_filter=None):
+        end = self.get_end(end)
+        counts, tweets = self.get_window(kind, end - window, end)
+        baseline_counts, baseline_tweets = self.get_window(kind, end - window - baseline, end - window)
+        if not baseline_tweets:
+            return []
+
+        scale = tweets / baseline_tweets
+
+        bursts = []
+        for term, count in counts.items():
+            if count < min_count or (item_filter is not None and not item_filter((term, count))):
+                continue
+
+            expected = baseline_counts.get(term, 0) * scale
+            score = (count - expected) / math.sqrt(expected + 1)
+            if score > 0:
+                bursts.append((term, count, expected, score))
+
+        return heapq.nlargest(top, bursts, key=operator.itemgetter(3))
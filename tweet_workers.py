@@ -0,0 +1,91 @@
+import collections
+import itertools
+import multiprocessing
+
+import tweet_archive
+
+# per worker process TweetWords, created once by the pool initializer
+_worker_words = None
+_worker_include_retweets = True
+
+def _init_worker(word_options, include_retweets):
+    global _worker_words, _worker_include_retweets
+
+    # imported here as twitter_words imports this module
+    import twitter_words
+
+    _worker_words = twitter_words.TweetWords(min_word_length=1, min_word_frequency=1, display_top=0,
+                                             fast_tokenizer=word_options['fast_tokenizer'],
+                                             counter_capacity=word_options['counter_capacity'],
+                                             compact_vocabulary=word_options['compact_vocabulary'],
+                                             entity_words=word_options['entity_words'],
+                                             ngram_size=word_options['ngram_size'],
+                                             ngram_error=word_options['ngram_error'])
+    _worker_words.include_retweet_words = word_options['include_retweet_words']
+
+    # lossy counted n-grams are sent back uncounted, counted in the main process in tweet order
+    if _worker_words.ngram_size and _worker_words.ngram_error:
+        _worker_words.ngram_lists = []
+
+    _worker_include_retweets = include_retweets
+
+def _count_chunk(lines):
+    statuses = list(tweet_archive.parse_archive_lines(lines, _worker_include_retweets))
+    _worker_words.count_statuses(statuses)
+    tweet_count = len(statuses)
+
+    counters = _worker_words.get_counters()
+    _worker_words.reset_counters()
+
+    ngram_lists = _worker_words.ngram_lists
+    if ngram_lists is not None:
+        _worker_words.ngram_lists = []
+
+    return counters, ngram_lists, tweet_count
+
+def get_word_options(tweet_words):
+    return {'fast_tokenizer': tweet_words.fast_tokenizer, 'counter_capacity': tweet_words.counter_capacity,
+            'compact_vocabulary': tweet_words.compact_vocabulary, 'entity_words': tweet_words.entity_words,
+            'include_retweet_words': tweet_words.include_retweet_words, 'ngram_size': tweet_words.ngram_size,
+            'ngram_error': tweet_words.ngram_error}
+
+def merge_chunk(tweet_words, counters, ngram_lists, tweet_count):
+    tweet_words.merge_counters(counters)
+    if ngram_lists:
+        tweet_words.count_ngram_lists(ngram_lists)
+
+    return tweet_count
+
+def iter_chunks(items, chunk_size):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, chunk_size))
+        if not chunk:
+            break
+
+        yield chunk
+
+# archive lines are split into chunks counted by a pool of worker processes, results are merged back
+# in chunk order so counts match counting in a single process (lossy counted n-grams are counted here
+# as the workers found them). at most jobs * 2 chunks are in flight to keep memory bounded (pool.imap
+# would read the whole archive ahead)
+def count_archive(tweet_words, paths, jobs, include_retweets=True, chunk_size=2000, report_every=100000):
+    tweet_rate = tweet_archive.TweetRate(report_every)
+    chunks = iter_chunks(tweet_archive.read_archive_lines(paths), chunk_size)
+
+    with multiprocessing.Pool(jobs, initializer=_init_worker,
+                              initargs=(get_word_options(tweet_words), include_retweets)) as pool:
+        pending = collections.deque()
+
+        for chunk in chunks:
+            pending.append(pool.apply_async(_count_chunk, (chunk,)))
+
+            if len(pending) >= jobs * 2:
+                tweet_rate.tick(merge_chunk(tweet_words, *pending.popleft().get()))
+
+        while pending:
+            tweet_rate.tick(merge_chunk(tweet_words, *pending.popleft().get()))
+
+    tweet_rate.report()
+
+    return tweet_rate.count
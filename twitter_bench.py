@@ -0,0 +1,829 @@
+import os
+import sys
+import time
+import re
+import html
+import json
+import gzip
+import random
+import tempfile
+import subprocess
+import argparse
+import platform
+import itertools
+import tracemalloc
+import collections
+
+import twitter_helper
+import tweet_archive
+import tweet_corpus
+import tweet_tokenizer
+import twitter_words
+import tweet_sentiment
+import tweet_record
+
+def get_statuses(user_args):
+    if user_args.archive:
+        statuses = tweet_archive.parse_archive_lines(tweet_archive.read_archive_lines(user_args.archive))
+        return list(itertools.islice(statuses, user_args.number))
+
+    corpus = tweet_corpus.TweetCorpus(seed=user_args.seed, mode=user_args.mode)
+    return list(corpus.statuses(user_args.number))
+
+def get_status_texts(statuses):
+    return [twitter_helper.get_status_text(status).replace("&amp;", "&") for status in statuses]
+
+def get_texts(user_args):
+    return get_status_texts(get_statuses(user_args))
+
+def time_best(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+def print_rate(name, tweet_count, seconds, baseline=None, unit="tweets"):
+    rate = tweet_count / seconds if seconds else 0.0
+    speedup = f" ({baseline / seconds:.1f}x)" if baseline else ""
+    print(f"{name:<28s}{rate:>12.0f} {unit}/sec{speedup}")
+
+def count_with(texts, fast_tokenizer, batch_size=0):
+    tweet_words = twitter_words.TweetWords(1, 1, 0, fast_tokenizer=fast_tokenizer)
+    if batch_size:
+        for i in range(0, len(texts), batch_size):
+            tweet_words.count_words_batch(texts[i:i + batch_size])
+    else:
+        for text in texts:
+            tweet_words.count_words(text)
+
+    return tweet_words
+
+def bench_tokenizer(texts, repeat):
+    import nltk
+
+    nltk_tokenizer = nltk.tokenize.TweetTokenizer()
+    fast_tokenizer = tweet_tokenizer.FastTweetTokenizer()
+
+    print(f"tokenizer: {len(texts)} tweets, best of {repeat}")
+    nltk_time = time_best(lambda: [nltk_tokenizer.tokenize(text) for text in texts], repeat)
+    print_rate("nltk tokenize", len(texts), nltk_time)
+    print_rate("fast tokenize", len(texts),
+               time_best(lambda: [fast_tokenizer.tokenize(text) for text in texts], repeat), nltk_time)
+    print_rate("fast tokenize_batch", len(texts),
+               time_best(lambda: fast_tokenizer.tokenize_batch(texts), repeat), nltk_time)
+
+    print(f"\ncount_words: {len(texts)} tweets, best of {repeat}")
+    nltk_time = time_best(lambda: count_with(texts, False), repeat)
+    print_rate("nltk count_words", len(texts), nltk_time)
+    print_rate("fast count_words", len(texts), time_best(lambda: count_with(texts, True), repeat), nltk_time)
+    print_rate("fast count_words_batch", len(texts),
+               time_best(lambda: count_with(texts, True, batch_size=1000), repeat), nltk_time)
+
+# get_filtered_words before the single pass top-k, for comparison
+def legacy_filtered_words(tweet_words):
+    filtered = collections.Counter()
+    for attr in tweet_words.words:
+        value = tweet_words.words[attr]
+        if len(attr) >= tweet_words.min_word_length and value >= tweet_words.min_word_frequency \
+            and attr not in twitter_words.get_stopwords():
+            filtered[attr] = value
+
+    final_list = collections.Counter()
+    for attr, value in tweet_words.get_sorted_items(filtered):
+        if tweet_words.display_top and len(final_list) >= tweet_words.display_top:
+            break
+        final_list[attr] = value
+
+    return final_list
+
+# zipf distributed counts over a synthetic vocabulary
+def get_synthetic_words(vocabulary_size, seed=1):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = collections.Counter()
+    for rank in range(1, vocabulary_size + 1):
+        word = "".join(rng.choice(letters) for _ in range(rng.randint(2, 12)))
+        words[word] += max(1, int(1000000 / rank))
+
+    return words
+
+def bench_topk(sizes, top, repeat):
+    for size in sizes:
+        tweet_words = twitter_words.TweetWords(min_word_length=3, min_word_frequency=2, display_top=top)
+        tweet_words.words = get_synthetic_words(size)
+
+        if list(legacy_filtered_words(tweet_words).items()) != list(tweet_words.get_filtered_words().items()):
+            print(f"topk mismatch: vocabulary {size}")
+
+        print(f"get_filtered_words: vocabulary {len(tweet_words.words)}, top {top}, best of {repeat}")
+        legacy_time = time_best(lambda: legacy_filtered_words(tweet_words), repeat)
+        print_rate("full sort", len(tweet_words.words), legacy_time, unit="words")
+        print_rate("single pass top-k", len(tweet_words.words),
+                   time_best(tweet_words.get_filtered_words, repeat), legacy_time, unit="words")
+        print()
+
+# memory retained by what func builds
+def get_retained_memory(func):
+    tracemalloc.start()
+    built = func()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return built, retained
+
+def measure_peak(func):
+    tracemalloc.start()
+    built = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return built, peak
+
+def bench_vocabulary(sizes, top, repeat):
+    import word_vocabulary
+
+    for size in sizes:
+        source = get_synthetic_words(size)
+        # words are decoded while tracing so both counters pay for their strings
+        encoded = [(word.encode('utf-8'), count) for word, count in source.items()]
+
+        def build_counter():
+            counter = collections.Counter()
+            for word, count in encoded:
+                counter[word.decode('utf-8')] = count
+            return counter
+
+        def build_vocabulary():
+            vocabulary = word_vocabulary.VocabularyCounter()
+            for word, count in encoded:
+                vocabulary[word.decode('utf-8')] = count
+            return vocabulary
+
+        counter, counter_memory = get_retained_memory(build_counter)
+        vocabulary, vocabulary_memory = get_retained_memory(build_vocabulary)
+
+        counter_words = twitter_words.TweetWords(min_word_length=3, min_word_frequency=2, display_top=top)
+        counter_words.words = counter
+        vocabulary_words = twitter_words.TweetWords(min_word_length=3, min_word_frequency=2, display_top=top,
+                                                    compact_vocabulary=True)
+        vocabulary_words.words = vocabulary
+
+        if counter_words.get_top_words() != vocabulary_words.get_top_words():
+            print(f"vocabulary mismatch: vocabulary {size}")
+
+        print(f"vocabulary: {len(source)} words, top {top}, best of {repeat}")
+        print(f"{'Counter memory':<28s}{counter_memory / 1024:>12.0f} KiB")
+        print(f"{'VocabularyCounter memory':<28s}{vocabulary_memory / 1024:>12.0f} KiB "
+              f"(arrays {vocabulary.nbytes / 1024:.0f} KiB)")
+
+        counter_time = time_best(counter_words.get_top_words, repeat)
+        print_rate("Counter top words", len(source), counter_time, unit="words")
+        print_rate("VocabularyCounter top words", len(source), time_best(vocabulary_words.get_top_words, repeat),
+                   counter_time, unit="words")
+
+        with tempfile.TemporaryDirectory() as directory:
+            for name, path, mmap in (("npz", os.path.join(directory, 'words.npz'), False),
+                                     ("npy mmap", os.path.join(directory, 'words'), True)):
+                vocabulary.save(path)
+                loaded, loaded_memory = get_retained_memory(
+                    lambda: word_vocabulary.VocabularyCounter.load(path, mmap=mmap))
+                vocabulary_words.words = loaded
+                print(f"{name + ' loaded memory':<28s}{loaded_memory / 1024:>12.0f} KiB")
+                load_time = time_best(lambda: word_vocabulary.VocabularyCounter.load(path, mmap=mmap), repeat)
+                print(f"{name + ' load + top words':<28s}{(load_time + time_best(vocabulary_words.get_top_words, 1)) * 1000:>12.1f} ms")
+
+        print()
+
+def bench_sentiment(texts, repeat):
+    import textblob
+
+    texts = texts + list(tweet_sentiment.NEGATION_TEXTS)
+    print(f"sentiment: {len(texts)} tweets ({len(set(texts))} distinct) with {len(tweet_sentiment.NEGATION_TEXTS)} "
+          f"negation texts, best of {repeat}")
+    textblob_time = time_best(lambda: [textblob.TextBlob(text).sentiment for text in texts], 1)
+    print_rate("textblob", len(texts), textblob_time)
+
+    # new analyzer each run so the memo only dedupes within the batch
+    print_rate("lexicon score_batch", len(texts),
+               time_best(lambda: tweet_sentiment.LexiconSentiment().score_batch(texts), repeat), textblob_time)
+
+    expected = [textblob.TextBlob(text).sentiment for text in texts]
+    scores = tweet_sentiment.LexiconSentiment().score_batch(texts)
+    for name, index in (("polarity", 0), ("subjectivity", 1)):
+        differences = sorted(abs(score[index] - value[index]) for score, value in zip(scores, expected))
+        within = sum(1 for difference in differences if difference <= 0.1) / len(differences)
+        print(f"{name:<28s}mean diff {sum(differences) / len(differences):.3f}, "
+              f"within 0.1 {within:.1%}, max diff {differences[-1]:.3f}")
+
+# FeedListener rendering before the single pass entity renderer, for comparison
+# a new WordCloud per image saved with png optimize, as create_wordcloud did
+def legacy_wordcloud(words, path):
+    import wordcloud
+
+    word_cloud = wordcloud.WordCloud(background_color='white', width=1280, height=800,
+                                     stopwords=set(wordcloud.STOPWORDS), random_state=1)
+    word_cloud.generate_from_frequencies(words)
+    word_cloud.to_file(path)
+
+# the legacy run goes first, WordcloudFrames swaps in its font cache for the process
+def bench_wordcloud(top, repeat):
+    import wordcloud_renderer
+
+    words = get_synthetic_words(top)
+    print(f"wordcloud: {len(words)} words 1280x800, best of {repeat}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'wordcloud.png')
+
+        legacy_time = time_best(lambda: legacy_wordcloud(words, path), repeat)
+        print(f"{'new WordCloud per image':<28s}{legacy_time:>12.2f} s")
+
+        frames = wordcloud_renderer.WordcloudFrames(path)
+        frame_times = []
+        for _ in range(repeat + 1):
+            frame = frames.render(words)
+            frame_times.append(frame.layout_seconds + frame.write_seconds)
+        # the first frame fills the font cache
+        print(f"{'WordcloudFrames first frame':<28s}{frame_times[0]:>12.2f} s")
+        print(f"{'WordcloudFrames next frames':<28s}{min(frame_times[1:]):>12.2f} s  "
+              f"({legacy_time / min(frame_times[1:]):.2f}x)")
+
+    # top words of a growing count, refreshed every 1000 tweets - how many refreshes min_change skips
+    texts = get_status_texts(tweet_corpus.TweetCorpus(seed=1).statuses(20000))
+    tweet_words = twitter_words.TweetWords(min_word_length=1, min_word_frequency=1, display_top=200,
+                                           fast_tokenizer=True)
+    renderer = wordcloud_renderer.WordcloudRenderer(top=200)
+    last = None
+    rendered = 0
+    for start in range(0, len(texts), 1000):
+        tweet_words.count_words_batch(texts[start:start + 1000])
+        frequencies = wordcloud_renderer.get_top_frequencies(tweet_words.get_filtered_words(), renderer.top)
+        if last is None or wordcloud_renderer.get_change(last, frequencies) >= renderer.min_change:
+            last = frequencies
+            rendered += 1
+    print(f"{'refreshes rendered':<28s}{rendered:>12d} of {len(texts) // 1000} "
+          f"(min change {renderer.min_change})")
+
+def legacy_render_text(listener, status, text):
+    def handle_urls(urls, text, url_index, tag="URL"):
+        url_list = []
+        for url in urls:
+            text = text.replace(url['url'], listener.term.gray(f"[{tag}#{url_index}]"))
+            url_list.append(f"[{url_index}]{url['expanded_url']}")
+            url_index += 1
+
+        return url_list, text, url_index
+
+    def handle_hashtags(hashtags, text):
+        for hashtag in hashtags:
+            text = text.replace(f"#{hashtag['text']}", listener.term.orange(f"#{hashtag['text']}"))
+
+        return text
+
+    url_index = 0
+    url_list = []
+    for entities in (getattr(status, 'extended_tweet', {}).get('entities', {}), getattr(status, 'entities', {})):
+        if 'urls' in entities:
+            urls, text, url_index = handle_urls(entities['urls'], text, url_index)
+            url_list += urls
+        if 'hashtags' in entities:
+            text = handle_hashtags(entities['hashtags'], text)
+        if 'media' in entities and entities is status.entities:
+            urls, text, url_index = handle_urls(entities['media'], text, url_index, tag="MEDIA")
+            url_list += urls
+
+    text = re.sub(twitter_helper.TwitterHelper.TWEET_SCREEN_NAME_PATTERN, listener.term.gold(r'\1'), text)
+    text = html.unescape(text)
+    text = re.sub('[ ]{2,}', ' ', text)
+    text = re.sub('[\r\n]{1,}', listener.term.gray(' • '), text)
+
+    return url_list, text
+
+def bench_render(statuses, repeat):
+    import tweepy
+    import twitter_feed
+
+    listener = twitter_feed.FeedListener()
+    records = list(tweet_record.iter_records(statuses))
+    statuses = [tweepy.models.Status.parse(None, status) for status in statuses]
+
+    def get_text(status):
+        if hasattr(status, 'extended_tweet') and status.truncated:
+            return status.extended_tweet['full_text']
+        return status.text
+
+    def render_legacy():
+        for status in statuses:
+            legacy_render_text(listener, status, get_text(status))
+
+    def render_single_pass():
+        for record in records:
+            listener.render_text(record.text, record.entities)
+
+    print(f"render: {len(statuses)} tweets, best of {repeat}")
+    legacy_time = time_best(render_legacy, repeat)
+    print_rate("replace per entity", len(statuses), legacy_time)
+    print_rate("single pass entities", len(statuses), time_best(render_single_pass, repeat), legacy_time)
+    # full output including wrapping, for scale
+    print_rate("render_status", len(records),
+               time_best(lambda: [listener.render_status(record) for record in records], repeat))
+
+# raw stream lines to tweepy Status models or to tweet records - parse time per tweet, and the memory
+# a queue of them holds (the stream and render queue keep parsed tweets alive)
+def bench_records(statuses, repeat):
+    import tweepy
+
+    lines = [json.dumps(status) for status in statuses]
+    print(f"records: {len(lines)} tweets, best of {repeat}")
+
+    # the floor, nothing kept
+    def parse_json():
+        for line in lines:
+            json.loads(line)
+
+    loads_time = time_best(parse_json, repeat)
+    print(f"{'json.loads':<28s}{loads_time / len(lines) * 1e6:>12.1f} us/tweet")
+
+    def parse_models():
+        return [tweepy.models.Status.parse(None, json.loads(line)) for line in lines]
+
+    def parse_records():
+        return [tweet_record.TweetRecord.from_json(json.loads(line)) for line in lines]
+
+    model_time = time_best(parse_models, repeat)
+    record_time = time_best(parse_records, repeat)
+    print(f"{'json + Status.parse':<28s}{model_time / len(lines) * 1e6:>12.1f} us/tweet")
+    print(f"{'json + TweetRecord':<28s}{record_time / len(lines) * 1e6:>12.1f} us/tweet  "
+          f"({model_time / record_time:.2f}x)")
+
+    for name, parse in (("Status retained", parse_models), ("TweetRecord retained", parse_records)):
+        _, retained = get_retained_memory(parse)
+        print(f"{name:<28s}{retained / len(lines):>12.0f} bytes/tweet")
+
+    _, peak = measure_peak(parse_models)
+    _, record_peak = measure_peak(parse_records)
+    print(f"{'Status peak':<28s}{peak / 1024:>12.0f} KiB")
+    print(f"{'TweetRecord peak':<28s}{record_peak / 1024:>12.0f} KiB")
+
+# throughput from the best of repeat runs, peak traced memory from one more run - tracing slows the
+# code down so it is kept out of the timings
+def measure(name, func, count, repeat, unit="tweets"):
+    seconds = time_best(func, repeat)
+
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    func()
+    peak_memory = tracemalloc.get_traced_memory()[1] - start_memory
+    tracemalloc.stop()
+
+    return {'name': name, 'count': count, 'unit': unit, 'seconds': seconds,
+            'rate': count / seconds if seconds else 0.0, 'peak_memory': peak_memory}
+
+def print_result(result, baseline=None):
+    line = f"{result['name']:<28s}{result['rate']:>12.0f} {result['unit']}/sec{result['peak_memory'] / 1024:>12.0f} KiB peak"
+    if baseline and baseline.get('rate'):
+        line += f"  ({result['rate'] / baseline['rate']:.2f}x rate, " \
+                f"{(result['peak_memory'] - baseline['peak_memory']) / 1024:+.0f} KiB peak vs baseline)"
+    print(line)
+
+def load_results(path):
+    with open(path, encoding='utf-8') as results_file:
+        results = json.load(results_file)
+
+    return {result['name']: result for result in results['results']}
+
+def save_results(path, results, user_args):
+    corpus = {'archive': user_args.archive, 'number': user_args.number, 'seed': user_args.seed, 'mode': user_args.mode}
+    with open(path, 'w', encoding='utf-8') as results_file:
+        json.dump({'python': platform.python_version(), 'repeat': user_args.repeat, 'corpus': corpus,
+                   'results': results}, results_file, indent=2)
+
+def feed_on_data(lines):
+    import twitter_feed
+
+    listener = twitter_feed.FeedListener(queue_size=len(lines))
+    for line in lines:
+        listener.on_data(line)
+
+    return listener
+
+def colorize_texts(term, texts):
+    colors = (term.orange, term.gold, term.gray, term.darkcyan)
+    return [color(text) for text in texts for color in colors]
+
+# hot paths over one corpus, results optionally saved as json and compared with a saved baseline
+def bench_suite(statuses, user_args):
+    import tweepy
+    import twitter_feed
+
+    repeat = user_args.repeat
+    baseline = load_results(user_args.baseline) if user_args.baseline else {}
+
+    texts = get_status_texts(statuses)
+    tweet_words = count_with(texts, True)
+    listener = twitter_feed.FeedListener()
+    term = twitter_helper.TextColorSet()
+    feed_lines = [json.dumps(status) for status in statuses]
+    feed_records = list(tweet_record.iter_records(statuses))
+    shown_records = [record for record in feed_records if not record.is_retweet]
+
+    cases = (
+        ("count_words nltk", lambda: count_with(texts, False), len(texts), "tweets"),
+        ("count_words fast", lambda: count_with(texts, True), len(texts), "tweets"),
+        ("count_statuses fast", lambda: twitter_words.TweetWords(1, 1, 0, fast_tokenizer=True).count_statuses(statuses),
+         len(statuses), "tweets"),
+        ("get_filtered_words", tweet_words.get_filtered_words, len(tweet_words.words), "words"),
+        ("feed on_data", lambda: feed_on_data(feed_lines), len(feed_lines), "tweets"),
+        ("feed render_status", lambda: [listener.render_status(record) for record in shown_records],
+         len(shown_records), "tweets"),
+        ("insert_newlines", lambda: [twitter_helper.insert_newlines(text, 80, 4, newline_to_spaces=True)
+                                     for text in texts], len(texts), "tweets"),
+        ("TermTextColorizer", lambda: colorize_texts(term, texts), len(texts) * 4, "texts"),
+    )
+
+    print(f"suite: {len(statuses)} tweets, best of {repeat}")
+    results = []
+    for name, func, count, unit in cases:
+        if user_args.cases and name.split()[0] not in user_args.cases:
+            continue
+
+        result = measure(name, func, count, repeat, unit)
+        print_result(result, baseline.get(name))
+        results.append(result)
+
+    if user_args.output:
+        save_results(user_args.output, results, user_args)
+        print(f"\nresults saved to {user_args.output}")
+
+def time_command(arguments, repeat):
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return time_best(lambda: subprocess.run([sys.executable] + arguments, check=True, cwd=directory,
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL), repeat)
+
+# startup time of the scripts, the modules a plain word count loads are checked by tests/test_imports.py
+def bench_imports(user_args):
+    with tempfile.TemporaryDirectory() as directory:
+        archive = os.path.join(directory, 'corpus.jsonl')
+        tweet_corpus.write_corpus(archive, tweet_corpus.TweetCorpus(seed=user_args.seed).statuses(200))
+
+        print(f"startup: best of {user_args.repeat}")
+        for name, arguments in (("python", ['-c', 'pass']),
+                                ("import twitter_words", ['-c', 'import twitter_words']),
+                                ("twitter_words.py -h", ['twitter_words.py', '-h']),
+                                ("archive count -ft", ['twitter_words.py', '-a', archive, '-ft']),
+                                ("archive count", ['twitter_words.py', '-a', archive]),
+                                ("import twitter_feed", ['-c', 'import twitter_feed'])):
+            print(f"{name:<28s}{time_command(arguments, user_args.repeat) * 1000:>12.0f} ms")
+
+# counting with --entity_words against tokenizing whole texts. it's no faster with the fast tokenizer, which finds
+# hashtags and mentions in the same regex pass, and the nltk entity path tokenizes the batch in one call where the
+# nltk token path makes one per tweet - that, not the entities, is its difference
+def bench_entity_words(statuses, repeat):
+    print(f"entity words: {len(statuses)} tweets, best of {repeat}")
+    records = list(tweet_record.iter_records(statuses))
+
+    def count_records(records, fast_tokenizer, entity_words):
+        tweet_words = twitter_words.TweetWords(1, 1, 0, fast_tokenizer=fast_tokenizer, entity_words=entity_words)
+        tweet_words.count_records(records)
+
+    tokens_time = time_best(lambda: count_records(records, True, False), repeat)
+    print_rate("fast tokens", len(records), tokens_time)
+    print_rate("fast entities + text", len(records), time_best(lambda: count_records(records, True, True), repeat),
+               tokens_time)
+
+    nltk_records = records[:2000]
+    tokens_time = time_best(lambda: count_records(nltk_records, False, False), 1)
+    entities_time = time_best(lambda: count_records(nltk_records, False, True), 1)
+    print_rate("nltk tokens", len(nltk_records), tokens_time)
+    print_rate("nltk entities + text", len(nltk_records), entities_time, tokens_time)
+
+# raw status capture - the stream thread's cost per tweet with the writer thread compressing blocks, and
+# replaying the capture in full or a time range through the index against scanning a gzip archive of
+# the same tweets. tweets are taken as received 20 a second
+def bench_capture(statuses, repeat):
+    import shutil
+    import tweet_capture
+
+    lines = [json.dumps(status) for status in statuses]
+    received = [1500000000 + i / 20 for i in range(len(lines))]
+    print(f"capture: {len(lines)} tweets, best of {repeat}")
+
+    directory = tempfile.mkdtemp(prefix='twitter_bench_capture')
+    try:
+        def capture():
+            shutil.rmtree(directory)
+            writer = tweet_capture.CaptureWriter(directory).start()
+            start = time.perf_counter()
+            for line, receive_time in zip(lines, received):
+                writer.add(line, receive_time)
+            add_seconds = time.perf_counter() - start
+            writer.stop()
+
+            return add_seconds
+
+        capture_time = time_best(capture, repeat)
+        add_time = min(capture() for _ in range(repeat))
+        print(f"{'stream thread add':<28s}{add_time / len(lines) * 1e6:>12.2f} us/tweet")
+        print_rate("capture written", len(lines), capture_time)
+
+        archive_path = f"{directory}.jsonl.gz"
+        with gzip.open(archive_path, 'wt', encoding='utf-8') as archive_file:
+            archive_file.write("".join(line + "\n" for line in lines))
+
+        # parsed the same as the archive
+        def replay(start_ms=None, end_ms=None):
+            return sum(1 for _, block_lines in tweet_capture.iter_captured_blocks(directory, start_ms, end_ms)
+                       for _ in tweet_archive.parse_archive_lines(block_lines))
+
+        def scan(start, end):
+            count = 0
+            for status in tweet_archive.parse_archive_lines(tweet_archive.read_archive_lines([archive_path])):
+                created = twitter_helper.parse_created_at(status['created_at']).timestamp() if start else None
+                if not start or start <= created < end:
+                    count += 1
+
+            return count
+
+        scan_time = time_best(lambda: scan(None, None), repeat)
+        print_rate("archive scan", len(lines), scan_time)
+        print_rate("replay", len(lines), time_best(replay, repeat), scan_time)
+
+        # the middle 1%
+        start, end = received[len(lines) * 99 // 200], received[len(lines) * 101 // 200]
+        range_count = replay(int(start * 1000), int(end * 1000))
+        scan_time = time_best(lambda: scan(start, end), 1)
+        range_time = time_best(lambda: replay(int(start * 1000), int(end * 1000)), repeat)
+        print(f"{'archive scan 1% range':<28s}{scan_time * 1000:>12.1f} ms")
+        print(f"{'replay 1% range':<28s}{range_time * 1000:>12.1f} ms  {range_count} tweets "
+              f"({scan_time / range_time:.0f}x)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        if os.path.exists(f"{directory}.jsonl.gz"):
+            os.remove(f"{directory}.jsonl.gz")
+
+# counting with an index writer, and term and conjunctive searches of the index against scanning the
+# tweets' counted terms in memory. the terms searched are the most common one, one of median
+# frequency, and pairs of them
+class TermCollector(object):
+    def __init__(self):
+        self.tweet_terms = []
+
+    def add_records(self, records, tweet_terms):
+        self.tweet_terms.extend(set(terms) for terms in tweet_terms if terms)
+
+def bench_index(statuses, repeat):
+    import shutil
+    import tweet_index
+
+    records = list(tweet_record.iter_records(statuses))
+    print(f"index: {len(records)} tweets, best of {repeat}")
+
+    def count_records(index_writer):
+        tweet_words = twitter_words.TweetWords(1, 1, 0, fast_tokenizer=True, tweet_index=index_writer)
+        tweet_words.count_records(records)
+
+    directory = tempfile.mkdtemp(prefix='twitter_bench_index')
+    try:
+        def count_indexed():
+            shutil.rmtree(directory)
+            index_writer = tweet_index.IndexWriter(directory)
+            count_records(index_writer)
+            index_writer.close()
+            return index_writer
+
+        count_time = time_best(lambda: count_records(None), repeat)
+        print_rate("count", len(records), count_time)
+        print_rate("count + index", len(records), time_best(count_indexed, repeat), count_time)
+        print(f"{'index size':<28s}{count_indexed().bytes_written / len(records):>12.1f} bytes/tweet")
+
+        collector = TermCollector()
+        count_records(collector)
+        term_counts = collections.Counter(term for terms in collector.tweet_terms for term in terms)
+        ranked = [term for term, _ in term_counts.most_common()]
+        common, second, median = ranked[0], ranked[1], ranked[len(ranked) // 100]
+        queries = [[common], [median], [common, second], [common, median]]
+
+        with tweet_index.TweetIndex(directory) as index:
+            for terms in queries:
+                search_time = time_best(lambda: index.search(terms, 20), repeat)
+                matches, _ = index.search(terms, 20)
+                scan_time = time_best(lambda: sum(1 for tweet_terms in collector.tweet_terms
+                                                  if all(term in tweet_terms for term in terms)), 1)
+                print(f"{' '.join(terms)[:27]:<28s}{search_time * 1000:>10.2f} ms  scan {scan_time * 1000:.1f} ms "
+                      f"({scan_time / search_time:.0f}x), {matches} tweets")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+# counting phrases exactly and lossy counted against counting words alone, with the items each keeps
+# and how many of the exact top phrases the lossy counts have in the same top
+def bench_ngrams(statuses, top, repeat):
+    records = list(tweet_record.iter_records(statuses))
+    print(f"ngrams: {len(records)} tweets, top {top}, best of {repeat}")
+
+    def count_records(ngram_size=0, ngram_error=0):
+        tweet_words = twitter_words.TweetWords(1, 1, top, fast_tokenizer=True, ngram_size=ngram_size,
+                                               ngram_error=ngram_error)
+        for start in range(0, len(records), twitter_words.RECORD_BATCH_SIZE):
+            tweet_words.count_records(records[start:start + twitter_words.RECORD_BATCH_SIZE])
+
+        return tweet_words
+
+    count_time = time_best(count_records, repeat)
+    print_rate("count", len(records), count_time)
+
+    exact = None
+    for ngram_size, ngram_error in ((2, 0), (3, 0), (3, 0.0001), (3, 0.00001)):
+        tweet_words = count_records(ngram_size, ngram_error)
+        name = f"count + {ngram_size}-grams {'exact' if not ngram_error else f'lossy {ngram_error:g}'}"
+        print_rate(name, len(records), time_best(lambda: count_records(ngram_size, ngram_error), repeat), count_time)
+        if not ngram_error:
+            exact = tweet_words.ngrams
+            print(f"{'':<28s}{len(exact):>12d} items")
+            continue
+
+        # phrases over the error bound are the ones lossy counting guarantees to keep
+        max_error = tweet_words.ngrams.max_error
+        guaranteed = [ngram for ngram, count in exact.items() if count > max_error]
+        kept = sum(ngram in tweet_words.ngrams for ngram in guaranteed)
+        print(f"{'':<28s}{len(tweet_words.ngrams):>12d} items kept, {kept} of {len(guaranteed)} over {max_error}")
+
+# near-duplicate checks per tweet in batches of 50 as the feed renders them, on the tweets with a quarter
+# as many copies of 20 of them added, each with one word changed and a new url. detected counts copies
+# found, false the originals flagged (their copies can come first)
+def bench_dedupe(statuses, repeat):
+    import tweet_duplicates
+
+    rng = random.Random(1)
+    texts = [record.text for record in tweet_record.iter_records(statuses) if not record.is_retweet]
+    campaign = [text for text in texts if len(text.split()) >= 8][:20]
+    checked = []
+    copies = []
+    for text in texts:
+        checked.append(text)
+        copies.append(False)
+        if rng.random() < 0.25:
+            words = rng.choice(campaign).split()
+            words[rng.randrange(len(words))] = rng.choice(("sale", "free", "now"))
+            checked.append(" ".join(words) + f" https://t.co/{rng.randrange(10 ** 8):08d}")
+            copies.append(True)
+
+    print(f"dedupe: {len(texts)} tweets and {sum(copies)} copies, best of {repeat}")
+
+    def check():
+        detector = tweet_duplicates.DuplicateDetector()
+        duplicates = []
+        for start in range(0, len(checked), 50):
+            duplicates += detector.check_batch(checked[start:start + 50])
+
+        return duplicates
+
+    check_time = time_best(check, repeat)
+    duplicates = check()
+    detected = sum(duplicate and copy for duplicate, copy in zip(duplicates, copies))
+    false = sum(duplicate and not copy for duplicate, copy in zip(duplicates, copies))
+    print(f"{'check':<28s}{check_time / len(checked) * 1e6:>12.2f} us/tweet")
+    print(f"{'detected':<28s}{detected:>12d} of {sum(copies)} copies, {false} others")
+
+# tagging tweets with 5 to 100 tracked keywords (the corpus' commonest words, some paired up) in one
+# automaton pass against a whole word regex search per keyword
+def bench_keywords(statuses, repeat):
+    import tweet_keywords
+
+    texts = [record.text for record in tweet_record.iter_records(statuses)]
+    word_counts = collections.Counter(word for text in texts for word in re.findall(r'\w{3,}', text.lower()))
+    common = [word for word, _ in word_counts.most_common(150)]
+    print(f"keywords: {len(texts)} tweets, best of {repeat}")
+
+    for keyword_count in (5, 20, 100):
+        keywords = common[:keyword_count]
+        keywords[1::5] = [f"{word} {common[-index - 1]}" for index, word in enumerate(keywords[1::5])]
+        matcher = tweet_keywords.KeywordMatcher(keywords)
+        patterns = [[re.compile(rf'(?<!\w){re.escape(word)}(?!\w)') for word in keyword.split()]
+                    for keyword in keywords]
+
+        def search(text):
+            text = text.lower()
+            return [keyword for keyword, keyword_patterns in zip(keywords, patterns)
+                    if all(pattern.search(text) for pattern in keyword_patterns)]
+
+        search_time = time_best(lambda: [search(text) for text in texts], repeat)
+        match_time = time_best(lambda: [matcher.match(text) for text in texts], repeat)
+        mismatched = sum(matcher.match(text) != search(text) for text in texts)
+        print_rate(f"regex x {keyword_count}", len(texts), search_time)
+        print_rate(f"automaton x {keyword_count}", len(texts), match_time, search_time)
+        if mismatched:
+            print(f"{'mismatched':<28s}{mismatched:>12d} tweets")
+
+# counting with a trend index, and window top-k and bursts from its buckets against counting the
+# window's tweets again. the corpus is spread out to 0.2 tweets a second, 720 an hour
+def bench_trends(user_args, top, repeat):
+    import tweet_trends
+
+    corpus = tweet_corpus.TweetCorpus(seed=user_args.seed, mode=user_args.mode, tweets_per_second=0.2)
+    records = list(tweet_record.iter_records(corpus.statuses(user_args.number)))
+    print(f"trends: {len(records)} tweets over {len(records) / 0.2 / 3600:.1f} hours, best of {repeat}")
+
+    def count_records(trend_index):
+        tweet_words = twitter_words.TweetWords(1, 1, 0, fast_tokenizer=True, trend_index=trend_index)
+        tweet_words.count_records(records)
+
+    count_time = time_best(lambda: count_records(None), repeat)
+    print_rate("count", len(records), count_time)
+    print_rate("count + trend index", len(records), time_best(lambda: count_records(tweet_trends.TrendIndex()),
+                                                               repeat), count_time)
+
+    trend_index = tweet_trends.TrendIndex()
+    count_records(trend_index)
+    end = trend_index.get_end()
+    minutes = [tweet_trends.get_record_minute(record) for record in records]
+
+    def count_window(window):
+        tweet_words = twitter_words.TweetWords(1, 1, 0, fast_tokenizer=True)
+        tweet_words.count_records([record for record, minute in zip(records, minutes) if end - window <= minute])
+        return tweet_words.get_top_items(tweet_words.hashtags, top)
+
+    for window in (600, 3600, 6 * 3600):
+        index_time = time_best(lambda: trend_index.get_top('hashtags', window, top), repeat)
+        burst_time = time_best(lambda: trend_index.get_bursts('hashtags', window, 4 * window, top), repeat)
+        scan_time = time_best(lambda: count_window(window), 1)
+        print(f"{f'top {window // 60} min':<28s}{index_time * 1000:>10.2f} ms  recount {scan_time * 1000:.1f} ms "
+              f"({scan_time / index_time:.0f}x), bursts vs {window * 4 // 60} min {burst_time * 1000:.2f} ms")
+
+def get_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('bench', help="benchmark to run", choices=['suite', 'imports', 'tokenizer', 'topk', 'vocabulary', 'sentiment', 'render', 'records', 'entities', 'wordcloud', 'capture', 'trends', 'index', 'ngrams', 'dedupe', 'keywords'])
+    parser.add_argument('-a', '--archive', help="use tweets from jsonl archive files instead of the synthetic corpus",
+                        nargs='+', metavar='FILE')
+    parser.add_argument('-n', '--number', help="number of tweets", type=int, default=20000)
+    parser.add_argument('-s', '--seed', help="synthetic corpus random seed", type=int, default=1)
+    parser.add_argument('-m', '--mode', help="synthetic corpus status json as from the stream or the rest timeline",
+                        choices=[tweet_corpus.STREAM, tweet_corpus.REST], default=tweet_corpus.STREAM)
+    parser.add_argument('-v', '--vocabulary', help="synthetic vocabulary sizes for topk and vocabulary", type=int, nargs='+',
+                        default=[100000, 1000000])
+    parser.add_argument('-t', '--top', help="top words for topk and wordcloud", type=int, default=50)
+    parser.add_argument('-r', '--repeat', help="repeat timings and keep the best", type=int, default=3)
+    parser.add_argument('-c', '--cases', help="suite cases to run (first word of the name)", nargs='+')
+    parser.add_argument('-o', '--output', help="save suite results to a json file", metavar='FILE')
+    parser.add_argument('-b', '--baseline', help="compare suite results with a saved json file", metavar='FILE')
+    args = parser.parse_args()
+
+    return args
+
+def main():
+    user_args = get_arguments()
+
+    if user_args.bench == 'suite':
+        bench_suite(get_statuses(user_args), user_args)
+
+    elif user_args.bench == 'imports':
+        bench_imports(user_args)
+
+    elif user_args.bench == 'entities':
+        bench_entity_words(get_statuses(user_args), user_args.repeat)
+
+    elif user_args.bench == 'tokenizer':
+        bench_tokenizer(get_texts(user_args), user_args.repeat)
+
+    elif user_args.bench == 'sentiment':
+        bench_sentiment(get_texts(user_args), user_args.repeat)
+
+    elif user_args.bench == 'render':
+        bench_render(get_statuses(user_args), user_args.repeat)
+
+    elif user_args.bench == 'records':
+        bench_records(get_statuses(user_args), user_args.repeat)
+
+    elif user_args.bench == 'capture':
+        bench_capture(get_statuses(user_args), user_args.repeat)
+
+    elif user_args.bench == 'dedupe':
+        bench_dedupe(get_statuses(user_args), user_args.repeat)
+
+    elif user_args.bench == 'keywords':
+        bench_keywords(get_statuses(user_args), user_args.repeat)
+
+    elif user_args.bench == 'ngrams':
+        bench_ngrams(get_statuses(user_args), user_args.top, user_args.repeat)
+
+    elif user_args.bench == 'index':
+        bench_index(get_statuses(user_args), user_args.repeat)
+
+    elif user_args.bench == 'trends':
+        bench_trends(user_args, user_args.top, user_args.repeat)
+
+    elif user_args.bench == 'topk':
+        bench_topk(user_args.vocabulary, user_args.top, user_args.repeat)
+
+    elif user_args.bench == 'vocabulary':
+        bench_vocabulary(user_args.vocabulary, user_args.top, user_args.repeat)
+
+    elif user_args.bench == 'wordcloud':
+        bench_wordcloud(user_args.top, user_args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -8,8 +8,13 @@ import textwrap
 import tweepy
 import ssl
 import time
+import threading
 
 import twitter_helper
+import status_queue
+import tweet_metrics
+import tweet_record
+import tweet_entities
 
 class FeedListener(tweepy.streaming.StreamListener):
     # tweet padding and line widths in chars
@@ -18,114 +23,231 @@ class FeedListener(tweepy.streaming.StreamListener):
 
     term = twitter_helper.TextColorSet()
 
-    def __init__(self):
+    # tracked keywords' tags are drawn in these colours in turn
+    KEYWORD_COLORS = ["38", "172", "112", "140", "220", "203", "75", "178"]
+
+    # statuses are projected to tweet records and queued on the stream thread, a FeedRenderer thread
+    # formats and prints them. with a tweet_capture.CaptureWriter the raw status json is captured too.
+    # with a keyword matcher (tweet_keywords.KeywordMatcher) each status is tagged with the tracked keywords
+    # it matched and counted per keyword, tags are coloured by keyword_colors (keyword -> 256 colour code)
+    # or in turn, and with a keyword filter only tweets matching one of its keywords are rendered
+    def __init__(self, queue_size=1000, overflow=status_queue.StatusQueue.DROP_OLDEST, capture=None,
+                 keyword_matcher=None, keyword_colors=None, keyword_filter=None):
          super().__init__()
          self.tweet_count = 0
          self.retweet_count = 0
+         self.lagged_count = 0
 
-    @classmethod
-    def handle_urls(cls, urls, text, url_index, tag="URL"):
-        url_list = []
-        for url in urls:
-            text = text.replace(url['url'], cls.term.gray(f"[{tag}#{url_index}]"))
-            url_list.append(f"[{url_index}]{url['expanded_url']}")
-            url_index += 1
-
-        return url_list, text, url_index
+         self.keyword_matcher = keyword_matcher
+         self.keyword_stats = None
+         self.keyword_filter = set(keyword_filter) if keyword_filter else None
+         self.filtered_count = 0
 
-    @classmethod
-    def handle_hashtags(cls, hashtags, text):
-        for hashtag in hashtags:
-            text = text.replace(f"#{hashtag['text']}", cls.term.orange(f"#{hashtag['text']}"))
+         # fastest keywords (keyword, tweets per minute), shown in the header
+         self.keyword_rates = []
 
-        return text
+         self._keyword_colors = {}
+         if keyword_matcher is not None:
+             import tweet_keywords
 
-    @classmethod
-    def clean_text(cls, text):
-        text = html.unescape(text)
-        text = re.sub('[ ]{2,}', ' ', text)
-        text = re.sub('[\r\n]{1,}', cls.term.gray(' • '), text)
+             self.keyword_stats = tweet_keywords.KeywordStats(keyword_matcher.keywords)
+             # keyword colours go in a term of the listener's own, not the class one all listeners share
+             self.term = twitter_helper.TextColorSet()
+             keyword_colors = keyword_colors or {}
+             for index, keyword in enumerate(keyword_matcher.keywords):
+                 name = f"keyword_{index}"
+                 code = keyword_colors.get(keyword, self.KEYWORD_COLORS[index % len(self.KEYWORD_COLORS)])
+                 self.term.add_iro(name, code)
+                 self._keyword_colors[keyword] = name
 
-        return text
+         # near-duplicates collapsed by a FeedRenderer and the most tweets of one, shown in the header
+         self.duplicate_count = 0
+         self.duplicate_group = 0
 
-    def on_status(self, status):
-        self.tweet_count += 1
+         # last frame of a live word cloud, shown in the header
+         self.word_cloud_frame = None
 
-        if hasattr(status, 'retweeted_status'):
-            if status.retweeted_status:
-                self.retweet_count += 1
-                return
+         # bursting hashtags and words, shown in the header
+         self.trending = []
 
-        text = ""
-        if hasattr(status, 'extended_tweet') and status.truncated:
-            text = status.extended_tweet['full_text']
-        else:
-            text = status.text
+         self.status_queue = status_queue.StatusQueue(queue_size, overflow)
+         self.capture = capture
 
-        tweet_url_index = 0 # per tweet
-        tweet_url_list = []
+    # screen names, runs of spaces and line breaks in the text between entities
+    TEXT_CLEAN_PATTERN = re.compile(r'(@[A-Za-z0-9_]{1,15})|([ ]{2,})|([\r\n]+)')
 
-        if hasattr(status, 'extended_tweet'):
-            if 'entities' in status.extended_tweet:
-                if 'urls' in status.extended_tweet['entities']:
-                    url_list, text, tweet_url_index = self.handle_urls(status.extended_tweet['entities']['urls'], text, tweet_url_index)
-                    tweet_url_list += url_list
+    @classmethod
+    def _clean_match(cls, match):
+        if match.group(1):
+            return cls.term.gold(match.group(1))
+        if match.group(2):
+            return ' '
+        return cls.term.gray(' • ')
 
-                if 'hashtags' in status.extended_tweet['entities']:
-                    text = self.handle_hashtags(status.extended_tweet['entities']['hashtags'], text)
+    @classmethod
+    def clean_text(cls, text):
+        if '&' in text:
+            text = html.unescape(text)
 
-        if hasattr(status, 'entities'):
-            if 'urls' in status.entities:
-                url_list, text, tweet_url_index = self.handle_urls(status.entities['urls'], text, tweet_url_index)
-                tweet_url_list += url_list
+        return cls.TEXT_CLEAN_PATTERN.sub(cls._clean_match, text)
 
-            if 'hashtags' in status.entities:
-                text = self.handle_hashtags(status.entities['hashtags'], text)
+    # one left to right pass building the coloured text from entity spans, returns the url list
+    # and the text
+    @classmethod
+    def render_text(cls, text, entities):
+        output = []
+        url_list = []
+        url_index = 0 # per tweet
+        position = 0
+
+        for start, end, kind, entity in tweet_entities.get_entity_spans(text, entities):
+            if start > position:
+                output.append(cls.clean_text(text[position:start]))
+
+            if kind == tweet_entities.URL or kind == tweet_entities.MEDIA:
+                tag = "URL" if kind == tweet_entities.URL else "MEDIA"
+                output.append(cls.term.gray(f"[{tag}#{url_index}]"))
+                url_list.append(f"[{url_index}]{entity['expanded_url']}")
+                url_index += 1
+            elif kind == tweet_entities.HASHTAG:
+                output.append(cls.term.orange(text[start:end]))
+            else:
+                output.append(cls.term.gold(text[start:end]))
+
+            position = end
+
+        output.append(cls.clean_text(text[position:]))
+
+        return url_list, "".join(output)
+
+    # statuses skip tweepy's Status models, other stream messages go to the StreamListener handlers
+    def on_data(self, raw_data):
+        record = tweet_record.parse_record(raw_data)
+        if record is None:
+            return super().on_data(raw_data)
+
+        # a capture that stopped on a write error is let go, its summary reports the error
+        if self.capture and not self.capture.add(raw_data.strip()):
+            self.capture = None
+
+        return self.on_status(record)
+
+    # tags the status with the keywords matched in its text and expanded urls, as the stream matched them
+    def match_keywords(self, status):
+        text = status.text
+        if status.urls:
+            text = " ".join([text, *filter(None, status.urls)])
+
+        status.keywords = self.keyword_matcher.match(text)
+        self.keyword_stats.add(status.keywords, status.is_retweet)
+
+        metrics = tweet_metrics.METRICS
+        if metrics.enabled:
+            for keyword in status.keywords:
+                metrics.count(f"keyword_{keyword}_tweets")
+                if status.is_retweet:
+                    metrics.count(f"keyword_{keyword}_retweets")
+
+    # status is a TweetRecord
+    def on_status(self, status):
+        self.tweet_count += 1
 
-            if 'media' in status.entities:
-                url_list, text, tweet_url_index = self.handle_urls(status.entities['media'], text, tweet_url_index, tag="MEDIA")
-                tweet_url_list += url_list
+        metrics = tweet_metrics.METRICS
+        if metrics.enabled:
+            metrics.count('tweets')
+
+        if self.keyword_matcher is not None:
+            if metrics.enabled:
+                with metrics.timer('match_keywords'):
+                    self.match_keywords(status)
+            else:
+                self.match_keywords(status)
+
+        if status.is_retweet:
+            self.retweet_count += 1
+            if metrics.enabled:
+                metrics.count('retweets')
+            return
+
+        if self.keyword_filter is not None and self.keyword_filter.isdisjoint(status.keywords):
+            self.filtered_count += 1
+            if metrics.enabled:
+                metrics.count('filtered')
+            return
+
+        if metrics.enabled:
+            with metrics.timer('queue_put'):
+                self.status_queue.put(status)
+            metrics.gauge('queue_depth', len(self.status_queue))
+            metrics.gauge('dropped', self.status_queue.dropped)
+        else:
+            self.status_queue.put(status)
+
+    def get_counts_header(self):
+        header = f"[tweets: {self.term.darkcyan(self.tweet_count)} retweet: {self.term.darkcyan(self.retweet_count)}"
+        if self.status_queue.dropped:
+            header += f" dropped: {self.term.darkcyan(self.status_queue.dropped)}"
+        if self.lagged_count:
+            header += f" lagged: {self.term.darkcyan(self.lagged_count)}"
+        if self.filtered_count:
+            header += f" filtered: {self.term.darkcyan(self.filtered_count)}"
+        if self.duplicate_count:
+            header += f" dupes: {self.term.darkcyan(self.duplicate_count)}" \
+                      f" {self.term.darkcyan(f'(top x{self.duplicate_group})')}"
+        if self.word_cloud_frame:
+            frame = self.word_cloud_frame
+            header += f" cloud: {self.term.darkcyan(frame.number)}" \
+                      f" {self.term.darkcyan(f'{frame.layout_seconds + frame.write_seconds:.2f}s')}"
+        if self.trending:
+            header += " trending: " + " ".join(self.term.orange(term) if term[0] == "#" else self.term.gold(term)
+                                               for term in self.trending)
+
+        if self.keyword_rates:
+            header += " keywords: " + " ".join(f"{self.render_keyword(keyword)} {self.term.darkcyan(f'{rate:.1f}/m')}"
+                                               for keyword, rate in self.keyword_rates)
+
+        return header + "]"
+
+    def render_keyword(self, keyword):
+        return self.term.iro(keyword, self._keyword_colors.get(keyword, ""))
+
+    # formatted tweet record output as a string
+    def render_status(self, status):
+        tweet_url_list, text = self.render_text(status.text, status.entities)
 
         # tweet quote
         quote_status = ""
-        if hasattr(status, 'is_quote_status'):
-            if status.is_quote_status:
-                quote_status = "[quote]"
+        if status.is_quote:
+            quote_status = "[quote]"
 
         quote_mentions = ""
-        if hasattr(status, 'quoted_status'):
-            if 'entities' in status.quoted_status:
-                if 'user_mentions' in status.quoted_status['entities']:
-                    for user in status.quoted_status['entities']['user_mentions']:
-                        quote_mentions += f" {self.term.plum('@' + user['screen_name'])}"
-
-        # twitter screen names
-        text = re.sub(twitter_helper.TwitterHelper.TWEET_SCREEN_NAME_PATTERN, self.term.gold(r'\1'), text)
-
-        # additional text cleanup
-        text = self.clean_text(text)
+        for screen_name in status.quoted_mentions:
+            quote_mentions += f" {self.term.plum('@' + screen_name)}"
 
         # output
-        print(f"[tweets: {self.term.darkcyan(self.tweet_count)} retweet: {self.term.darkcyan(self.retweet_count)}]")
+        lines = [self.get_counts_header()]
 
-        header_string = f"[{self.term.green(status.created_at)}]" + \
-                        f"[{self.term.purple('@' + status.user.screen_name)}] {quote_status}{quote_mentions}"
+        keyword_tags = "".join(f"[{self.render_keyword(keyword)}]" for keyword in status.keywords)
+        header_string = f"[{self.term.green(status.created)}]" + \
+                        f"[{self.term.purple('@' + status.screen_name)}]{keyword_tags} {quote_status}{quote_mentions}"
 
         text = f"{textwrap.dedent(text).strip()}"
 
         padding = ' '*self.PADDING_WIDTH
         width = self.PADDING_WIDTH + self.LINE_WIDTH
-        print(f"{textwrap.fill(header_string, width=width+self.PADDING_WIDTH, subsequent_indent=padding)}")
-        print(f"{textwrap.fill(text, width=width, initial_indent=padding, subsequent_indent=padding)}")
+        lines.append(f"{textwrap.fill(header_string, width=width+self.PADDING_WIDTH, subsequent_indent=padding)}")
+        lines.append(f"{textwrap.fill(text, width=width, initial_indent=padding, subsequent_indent=padding)}")
 
         if tweet_url_list:
             urls = twitter_helper.insert_newlines(tweet_url_list, self.LINE_WIDTH, padding_count=self.PADDING_WIDTH,
                                                   padding_first_line=True, newline_to_spaces=False)
 
             color_urls = f"{self.term.gray(urls)}"
-            print(f"{color_urls}")
+            lines.append(f"{color_urls}")
+
+        lines.append("")
 
-        print()
+        return "\n".join(lines) + "\n"
 
     def on_error(self, status):
         if status == 420:
@@ -135,11 +257,214 @@ class FeedListener(tweepy.streaming.StreamListener):
 
         return False
 
+# drains the listener's status queue in batches, one write per batch. statuses that waited longer than
+# lag_seconds in the queue are counted as lagged. with a word cloud renderer the words of rendered
+# tweets are counted and the top words handed to it every word_cloud_interval seconds. with a trend
+# index (tweet_trends.TrendIndex) the counts are also kept by minute and the most bursting hashtags and
+# words of the last trend_window seconds against the trend_baseline seconds before go to the header
+# every trend_interval seconds. with a duplicate detector (tweet_duplicates.DuplicateDetector) near-duplicates
+# of recently rendered tweets are counted in the header instead of rendered or counted. the listener's
+# fastest keywords go to the header once per batch. statuses still queued when it's stopped are rendered
+# before it ends
+class FeedRenderer(threading.Thread):
+    TRENDING_TOP = 3
+    KEYWORDS_TOP = 3
+
+    # a feed runs for days - phrases counted under this share of all are dropped, and the other counters
+    # keep this many items per word cloud word (per trending term without one) in space-saving counters
+    NGRAM_ERROR = 0.0001
+    CAPACITY_PER_TOP = 50
+
+    def __init__(self, listener, batch_size=50, lag_seconds=2.0, out=sys.stdout, word_cloud=None,
+                 word_cloud_interval=30.0, trend_index=None, trend_window=600, trend_baseline=3600,
+                 trend_interval=10.0, ngram_size=0, duplicate_detector=None):
+        super().__init__(daemon=True)
+        self.listener = listener
+        self.batch_size = batch_size
+        self.lag_seconds = lag_seconds
+        self.out = out
+
+        self.word_cloud = word_cloud
+        self.word_cloud_interval = word_cloud_interval
+        self.trend_index = trend_index
+        self.trend_window = trend_window
+        self.trend_baseline = trend_baseline
+        self.trend_interval = trend_interval
+        self.duplicate_detector = duplicate_detector
+
+        self.tweet_words = None
+        if word_cloud or trend_index is not None:
+            import twitter_words
+
+            # without a word cloud the totals aren't shown, trends come from the trend index
+            top = word_cloud.top if word_cloud else self.TRENDING_TOP
+            self.tweet_words = twitter_words.TweetWords(min_word_length=1, min_word_frequency=1,
+                                                        display_top=word_cloud.top if word_cloud else 0,
+                                                        fast_tokenizer=True, entity_words=True,
+                                                        counter_capacity=top * self.CAPACITY_PER_TOP,
+                                                        trend_index=trend_index, ngram_size=ngram_size,
+                                                        ngram_error=self.NGRAM_ERROR)
+        self._next_word_cloud = time.monotonic() + word_cloud_interval
+        self._next_trends = time.monotonic() + trend_interval
+
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def drop_duplicates(self, batch):
+        with tweet_metrics.METRICS.timer('dedupe'):
+            duplicates = self.duplicate_detector.check_batch([status.text for _, status in batch])
+
+        duplicate_count = sum(duplicates)
+        if not duplicate_count:
+            return batch
+
+        self.listener.duplicate_count += duplicate_count
+        self.listener.duplicate_group = self.duplicate_detector.largest_group
+        tweet_metrics.METRICS.count('duplicates', duplicate_count)
+
+        return [item for item, duplicate in zip(batch, duplicates) if not duplicate]
+
+    def render_batch(self, batch):
+        metrics = tweet_metrics.METRICS
+        if self.duplicate_detector is not None:
+            batch = self.drop_duplicates(batch)
+            if not batch:
+                return
+
+        if self.listener.keyword_stats is not None:
+            self.listener.keyword_rates = self.listener.keyword_stats.get_top(self.KEYWORDS_TOP)
+
+        now = time.monotonic()
+        output = []
+        for queued_time, status in batch:
+            if now - queued_time > self.lag_seconds:
+                self.listener.lagged_count += 1
+
+            if metrics.enabled:
+                metrics.observe('queue_wait', now - queued_time)
+                with metrics.timer('render'):
+                    output.append(self.listener.render_status(status))
+            else:
+                output.append(self.listener.render_status(status))
+
+        with metrics.timer('write'):
+            self.out.write("".join(output))
+            self.out.flush()
+
+        if self.tweet_words:
+            with metrics.timer('count_words'):
+                self.tweet_words.count_records([status for _, status in batch])
+
+        if metrics.enabled:
+            metrics.count('rendered', len(batch))
+            metrics.gauge('batch_size', len(batch))
+            metrics.gauge('lagged', self.listener.lagged_count)
+
+    # picks up finished frames and submits the top words when the interval is up, the renderer
+    # skips them if they barely changed
+    def update_word_cloud(self):
+        metrics = tweet_metrics.METRICS
+        for frame in self.word_cloud.poll():
+            self.listener.word_cloud_frame = frame
+            metrics.observe('wordcloud_layout', frame.layout_seconds)
+            metrics.observe('wordcloud_write', frame.write_seconds)
+            metrics.count('wordcloud_frames')
+
+        now = time.monotonic()
+        if now >= self._next_word_cloud:
+            self._next_word_cloud = now + self.word_cloud_interval
+            if not self.word_cloud.submit(self.tweet_words.get_filtered_words()):
+                metrics.count('wordcloud_skipped')
+
+    # hashtags and words of three letters or more by burst score
+    def update_trends(self):
+        now = time.monotonic()
+        if now < self._next_trends:
+            return
+        self._next_trends = now + self.trend_interval
+
+        with tweet_metrics.METRICS.timer('trends'):
+            bursts = self.trend_index.get_bursts('hashtags', self.trend_window, self.trend_baseline,
+                                                 self.TRENDING_TOP)
+            bursts += self.trend_index.get_bursts('words', self.trend_window, self.trend_baseline, self.TRENDING_TOP,
+                                                  item_filter=self.tweet_words.get_word_filter(min_length=3))
+
+        bursts.sort(key=lambda burst: burst[3], reverse=True)
+        self.listener.trending = [term for term, *_ in bursts[:self.TRENDING_TOP]]
+
+    def run(self):
+        while not self._stopping.is_set():
+            batch = self.listener.status_queue.get_batch(self.batch_size, timeout=0.5)
+            if batch:
+                self.render_batch(batch)
+
+            if self.word_cloud:
+                self.update_word_cloud()
+
+            if self.trend_index is not None:
+                self.update_trends()
+
+        while True:
+            batch = self.listener.status_queue.get_batch(self.batch_size, timeout=0)
+            if not batch:
+                break
+
+            self.render_batch(batch)
+
 def get_arguments():
     parser = argparse.ArgumentParser()
     parser.add_argument('-k', '--keywords', help="track tweets with keywords (comma seperated).", type=str, required=True)
+    parser.add_argument('-kf', '--keyword_filter', help="only render tweets matching one of these tracked keywords "
+                        "(comma seperated).", type=str, metavar='KEYWORDS')
+    parser.add_argument('-kc', '--keyword_colors', help="colour keyword tags with 256 colour codes "
+                        "(comma seperated, e.g. python:38,rust:172).", type=twitter_helper.arg_keyword_colors,
+                        metavar='KEYWORD:CODE')
+    parser.add_argument('-q', '--queue_size', help="max tweets waiting to be rendered.", type=int, default=1000)
+    parser.add_argument('-o', '--overflow', help="when the render queue is full drop the oldest tweet, sample the "
+                        "incoming tweets or block the stream.", choices=status_queue.StatusQueue.OVERFLOW_POLICIES,
+                        default=status_queue.StatusQueue.DROP_OLDEST)
+    parser.add_argument('-m', '--metrics', help="write render timings, rates and queue depth to FILE on exit (.prom "
+                        "for prometheus text, otherwise json).", metavar='FILE')
+    parser.add_argument('-mi', '--metrics_interval', help="also rewrite the metrics file every SECONDS.", type=float,
+                        default=0, metavar='SECONDS')
+    parser.add_argument('-wc', '--wordcloud', help="keep a word cloud of the tweets' words up to date in a background "
+                        "process.", default=False, action='store_true')
+    parser.add_argument('-wo', '--wordcloud_output', help="word cloud image FILE (default wordcloud.png next to the "
+                        "script, implies --wordcloud).", metavar='FILE')
+    parser.add_argument('-wi', '--wordcloud_interval', help="refresh the word cloud every SECONDS.", type=float,
+                        default=30.0, metavar='SECONDS')
+    parser.add_argument('-wz', '--wordcloud_size', help="word cloud image size (default 1280x800).",
+                        type=twitter_helper.arg_size, metavar='WIDTHxHEIGHT')
+    parser.add_argument('-wt', '--wordcloud_top', help="words in the word cloud.", type=int, default=200)
+    parser.add_argument('-wd', '--wordcloud_min_change', help="skip a refresh unless the top words' frequencies "
+                        "moved by at least this share (0-1).", type=float, default=0.02)
+    parser.add_argument('-ng', '--ngrams', help="also show phrases of 2 to N words in the word cloud.", type=int,
+                        default=0, metavar='N')
+    parser.add_argument('-dd', '--dedupe', help="count near-duplicates of the last TWEETS rendered tweets in the "
+                        "header instead of rendering them.", type=int, default=0, metavar='TWEETS')
+    parser.add_argument('-tr', '--trends', help="show the most bursting hashtags and words in the header.",
+                        default=False, action='store_true')
+    parser.add_argument('-trw', '--trend_window', help="bursts of the last MINUTES.", type=float, default=10,
+                        metavar='MINUTES')
+    parser.add_argument('-trb', '--trend_baseline', help="against the MINUTES before the window.", type=float,
+                        default=60, metavar='MINUTES')
+    parser.add_argument('-tri', '--trend_interval', help="update the trending terms every SECONDS.", type=float,
+                        default=10.0, metavar='SECONDS')
+    parser.add_argument('-c', '--capture', help="capture the raw tweets to rotating compressed segments in DIR "
+                        "(replay with tweet_capture.py).", metavar='DIR')
+    parser.add_argument('-cs', '--capture_size', help="start a new segment after MB.", type=float, default=64,
+                        metavar='MB')
+    parser.add_argument('-ct', '--capture_seconds', help="start a new segment after SECONDS.", type=float,
+                        default=3600, metavar='SECONDS')
+    parser.add_argument('-wm', '--wordcloud_mask', help="only draw words where the mask image FILE isn't white.",
+                        metavar='FILE')
     args = parser.parse_args()
 
+    if args.wordcloud_output:
+        args.wordcloud = True
+
     return args
 
 def main():
@@ -153,12 +478,70 @@ def main():
     user_args = get_arguments()
     keyword_list = user_args.keywords.split(',')
 
-    twitter_stream = tweepy.Stream(tweepy_auth, FeedListener())
+    import tweet_keywords
+
+    keyword_matcher = tweet_keywords.KeywordMatcher(keyword_list)
+    keyword_filter = None
+    if user_args.keyword_filter:
+        keyword_filter = [keyword.strip() for keyword in user_args.keyword_filter.split(',') if keyword.strip()]
+        unknown = set(keyword_filter).difference(keyword_matcher.keywords)
+        if unknown:
+            print(f"{term.darkcyan('Filter keywords not tracked:')} {', '.join(sorted(unknown))}")
+            return
+
+    if user_args.metrics:
+        tweet_metrics.METRICS.enable(user_args.metrics, user_args.metrics_interval, prefix="twitter_feed")
+
+    word_cloud = None
+    if user_args.wordcloud:
+        import wordcloud_renderer
+
+        width, height = user_args.wordcloud_size or (wordcloud_renderer.DEFAULT_WIDTH,
+                                                     wordcloud_renderer.DEFAULT_HEIGHT)
+        word_cloud = wordcloud_renderer.WordcloudRenderer(user_args.wordcloud_output, width, height,
+                                                          top=user_args.wordcloud_top,
+                                                          min_change=user_args.wordcloud_min_change,
+                                                          mask_path=user_args.wordcloud_mask).start()
+
+    capture = None
+    if user_args.capture:
+        import tweet_capture
+
+        capture = tweet_capture.CaptureWriter(user_args.capture, max_bytes=int(user_args.capture_size * 1024 * 1024),
+                                              max_seconds=user_args.capture_seconds).start()
+
+    feed_listener = FeedListener(queue_size=user_args.queue_size, overflow=user_args.overflow, capture=capture,
+                                 keyword_matcher=keyword_matcher, keyword_colors=user_args.keyword_colors,
+                                 keyword_filter=keyword_filter)
+    trend_index = None
+    if user_args.trends:
+        import tweet_trends
+
+        # minutes kept for the window and baseline, the widest range queried - older ones are rolled up to
+        # hours and dropped once they're out of it
+        retention = int((user_args.trend_window + user_args.trend_baseline) * 60)
+        trend_index = tweet_trends.TrendIndex(minute_retention=retention, hour_retention=retention)
+
+    duplicate_detector = None
+    if user_args.dedupe:
+        import tweet_duplicates
+
+        duplicate_detector = tweet_duplicates.DuplicateDetector(window=user_args.dedupe)
+
+    feed_renderer = FeedRenderer(feed_listener, word_cloud=word_cloud,
+                                 word_cloud_interval=user_args.wordcloud_interval, trend_index=trend_index,
+                                 trend_window=int(user_args.trend_window * 60),
+                                 trend_baseline=int(user_args.trend_baseline * 60),
+                                 trend_interval=user_args.trend_interval, ngram_size=user_args.ngrams,
+                                 duplicate_detector=duplicate_detector)
+    feed_renderer.start()
+
+    twitter_stream = tweepy.Stream(tweepy_auth, feed_listener)
 
     print(f"{time.ctime()}")
     while (error_retry > 0):
         try:
-            twitter_stream.filter(track=keyword_list, async=False)
+            twitter_stream.filter(track=keyword_list, is_async=False)
         except ssl.SSLError:
             print(f"\n{term.darkcyan('Connection timeout. Stopping twitter feed.')}")
             twitter_stream.disconnect()
@@ -174,9 +557,30 @@ def main():
 
             break
 
+        # tweets sent while reconnecting are missed, the capture flags the next block
+        if capture and capture.error is None:
+            capture.mark_gap()
+            print(f"{term.darkcyan('Capture gap marked.')}")
+
         print(f"{time.ctime()} (retry: {error_retry})")
         error_retry -= 1
         time.sleep(10)
 
+    feed_renderer.stop()
+    feed_renderer.join()
+
+    if word_cloud:
+        word_cloud.stop()
+        print(word_cloud.get_summary())
+
+    if capture:
+        capture.stop()
+        print(capture.get_summary())
+
+    if duplicate_detector is not None:
+        print(duplicate_detector.get_summary())
+
+    print(feed_listener.keyword_stats.get_summary())
+
 if __name__ == '__main__':
     main()
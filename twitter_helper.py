@@ -2,7 +2,7 @@ import os
 import re
 import argparse
 import json
-import tweepy
+import datetime
 
 import text_colorizer
 
@@ -43,6 +43,22 @@ class TwitterHelper(object):
             msg = "must start with @, be alphanumeric and < 16 characters or be a numeric id."
             raise argparse.ArgumentTypeError(msg)
 
+    # comma separated list of ids
+    @classmethod
+    def arg_twitter_ids(cls, user_ids):
+        return [cls.arg_twitter_id(user_id.strip()) for user_id in str(user_ids).split(',') if user_id.strip()]
+
+    # file of ids, one per line, # comments
+    @classmethod
+    def arg_twitter_ids_file(cls, path):
+        try:
+            with open(path, 'r') as ids_file:
+                lines = [line.split('#', 1)[0].strip() for line in ids_file]
+        except OSError as err:
+            raise argparse.ArgumentTypeError(f"can't read users file: {err}")
+
+        return [cls.arg_twitter_id(line) for line in lines if line]
+
 def get_twitter_env_api_keys(consumer_key='TWITTER_CONSUMER_KEY', consumer_secret='TWITTER_CONSUMER_SECRET',
                              access_key='TWITTER_ACCESS_KEY', access_secret='TWITTER_ACCESS_SECRET'):
 
@@ -62,11 +78,76 @@ def get_twitter_env_api_keys(consumer_key='TWITTER_CONSUMER_KEY', consumer_secre
     return api_keys
 
 def get_tweepy_auth_handler(twitter_api_keys):
+    import tweepy
+
     auth = tweepy.OAuthHandler(twitter_api_keys['consumer_key'], twitter_api_keys['consumer_secret'])
     auth.set_access_token(twitter_api_keys['access_key'], twitter_api_keys['access_secret'])
 
     return auth
 
+# status json text and the entities of that text - full_text in extended mode, extended_tweet for
+# truncated stream statuses
+def get_status_text_entities(status):
+    if 'full_text' in status:
+        return status['full_text'], status.get('entities') or {}
+
+    if status.get('truncated') and 'extended_tweet' in status:
+        extended_tweet = status['extended_tweet']
+        return extended_tweet['full_text'], extended_tweet.get('entities', {})
+
+    return status.get('text', ""), status.get('entities') or {}
+
+def get_status_text(status):
+    return get_status_text_entities(status)[0]
+
+# status json created_at string to naive utc datetime (same as tweepy)
+def parse_created_at(created_at):
+    if not created_at:
+        return None
+
+    return datetime.datetime.strptime(created_at, '%a %b %d %H:%M:%S +0000 %Y')
+
+# WIDTHxHEIGHT argument
+def arg_size(value):
+    try:
+        width, height = (int(side) for side in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"size must be WIDTHxHEIGHT: {value}")
+
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive: {value}")
+
+    return width, height
+
+# comma separated KEYWORD:CODE argument of 256 colour codes, as a dict
+def arg_keyword_colors(value):
+    colors = {}
+    for keyword_color in value.split(','):
+        keyword, _, code = keyword_color.rpartition(':')
+        if not keyword.strip() or not code.strip().isdigit() or int(code) > 255:
+            raise argparse.ArgumentTypeError(f"colours must be KEYWORD:CODE with codes 0-255: {keyword_color}")
+
+        colors[keyword.strip()] = code.strip()
+
+    return colors
+
+# utc iso time (2018-10-10T20:19, 2018-10-10 20:19:24) or epoch seconds argument, in epoch seconds
+def arg_time(value):
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"time must be iso (utc) or epoch seconds: {value}")
+
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+
+    return moment.timestamp()
+
 def print_json(json_block, sort=True, indents=4):
     if type(json_block) is str:
         print(json.dumps(json.loads(json_block), sort_keys=sort, indent=indents))
@@ -1,37 +1,124 @@
 import os
 import sys
 import argparse
-import tweepy
 import re
 import json
-import nltk
-import wordcloud
+import itertools
+import heapq
+import operator
+import functools
+import contextlib
 import collections
-import prettytable
-import textblob
-import numpy
-import PIL
-import matplotlib
+import importlib.util
 
 import twitter_helper
+import tweet_archive
+import tweet_tokenizer
+import heavy_hitters
+import tweet_metrics
+import tweet_output
+import tweet_record
+import tweet_entities
+import tweet_trends
+import word_ngrams
+
+# nltk, tweepy, textblob, prettytable and wordcloud (matplotlib, numpy, PIL) are slow to import and are
+# imported by the functions that use them, so a plain archive word count or --help doesn't load them
+
+COUNTER_TYPES = (collections.Counter, heavy_hitters.ApproximateCounter)
+
+# most statuses a user_timeline call returns
+TIMELINE_PAGE_SIZE = 200
+
+# tweets counted together by main
+RECORD_BATCH_SIZE = 500
 
 class TweetWords(twitter_helper.TwitterHelper):
-    def __init__(self, min_word_length, min_word_frequency, display_top):
-        self.words = collections.Counter()
+    COUNTER_NAMES = ('words', 'retweets', 'replies', 'mentions', 'hashtags', 'media', 'urls', 'ngrams')
+
+    # long tailed counters that can be counted approximately in fixed memory
+    APPROXIMATE_COUNTER_NAMES = ('words', 'retweets', 'replies', 'mentions', 'hashtags', 'media', 'urls')
+
+    def __init__(self, min_word_length, min_word_frequency, display_top, fast_tokenizer=False, counter_capacity=0,
+                 compact_vocabulary=False, entity_words=False, trend_index=None, tweet_index=None, ngram_size=0,
+                 ngram_error=0, ngram_pmi=False, duplicate_detector=None):
         self.min_word_length = min_word_length
         self.min_word_frequency = min_word_frequency
         self.display_top = display_top
 
+        # space-saving counters keeping at most counter_capacity items, 0 for exact counters
+        self.counter_capacity = counter_capacity
+
+        # words counted in an int id vocabulary with numpy counts instead of a Counter
+        self.compact_vocabulary = compact_vocabulary
+
+        # hashtags and mentions taken from the tweet entities, only the text between entities is tokenized
+        self.entity_words = entity_words
+
+        # with a tweet_trends.TrendIndex the counts of each minute's tweets also go to its bucket
+        self.trend_index = trend_index
+
+        # with a tweet_index.IndexWriter each record is indexed by the words, hashtags and mentions counted
+        # for it, collected in _tweet_terms while a batch is counted
+        self.tweet_index = tweet_index
+        self._tweet_terms = None
+
+        # with an ngram_size runs of words are also counted as n-grams of 2 to ngram_size words, lossy
+        # counted dropping those under ngram_error of all counted unless it's 0. shown phrases are ranked
+        # by pmi with ngram_pmi, otherwise by count - a lossy counted phrase's guaranteed count
+        self.ngram_size = ngram_size
+        self.ngram_error = ngram_error
+        self.ngram_pmi = ngram_pmi
+
+        # with a list each tweet's n-grams are appended to it instead of counted, to be counted in tweet
+        # order elsewhere by count_ngram_lists - lossy counts depend on the order and prune points
+        self.ngram_lists = None
+
+        # with a tweet_duplicates.DuplicateDetector near-duplicates of recently counted tweets aren't
+        # counted (retweets are left to the retweet counts)
+        self.duplicate_detector = duplicate_detector
+
         self.include_retweet_words = False
 
-        self.retweets = collections.Counter()
-        self.replies = collections.Counter()
-        self.mentions = collections.Counter()
-        self.hashtags = collections.Counter()
-        self.media = collections.Counter()
-        self.urls = collections.Counter()
+        self.reset_counters()
 
-        self.tweet_tokenizer = nltk.tokenize.TweetTokenizer()
+        self.fast_tokenizer = fast_tokenizer
+        if fast_tokenizer:
+            self.tweet_tokenizer = tweet_tokenizer.FastTweetTokenizer()
+        else:
+            import nltk
+
+            self.tweet_tokenizer = nltk.tokenize.TweetTokenizer()
+
+    def reset_counters(self):
+        for name in self.COUNTER_NAMES:
+            if self.compact_vocabulary and name == 'words':
+                import word_vocabulary
+
+                self.words = word_vocabulary.VocabularyCounter()
+            elif self.ngram_size and self.ngram_error and name == 'ngrams':
+                self.ngrams = heavy_hitters.LossyCounter(self.ngram_error)
+            elif self.counter_capacity and name in self.APPROXIMATE_COUNTER_NAMES:
+                setattr(self, name, heavy_hitters.SpaceSavingCounter(self.counter_capacity))
+            else:
+                setattr(self, name, collections.Counter())
+
+    def get_counters(self):
+        return {name: getattr(self, name) for name in self.COUNTER_NAMES}
+
+    # merging in the order tweets were counted keeps counts and insertion order (ties) the same as
+    # counting them all in one TweetWords
+    def merge_counters(self, counters):
+        for name in self.COUNTER_NAMES:
+            if name in counters:
+                getattr(self, name).update(counters[name])
+
+    def merge(self, other):
+        self.merge_counters(other.get_counters())
+
+    def count_ngram_lists(self, ngram_lists):
+        for ngrams in ngram_lists:
+            self._count_items(self.ngrams, ngrams)
 
     @staticmethod
     def _get_attr_padding(list_items):
@@ -39,7 +126,7 @@ class TweetWords(twitter_helper.TwitterHelper):
         for item in list_items:
             if type(list_items) is list:
                 attr = item[0]
-            elif type(list_items) is collections.Counter:
+            elif isinstance(list_items, COUNTER_TYPES):
                 attr = item
             else:
                 print(f"padding type error: {type(list_items)}")
@@ -54,49 +141,78 @@ class TweetWords(twitter_helper.TwitterHelper):
     def get_sorted_items(item_counter, reverse_sort=True):
         return sorted(item_counter.items(), key=lambda pair: pair[1], reverse=reverse_sort)
 
-    # trying out filtering using sort to get top words and then back to counter object so
-    # word cloud can use
-    def get_filtered_words(self):
-        filtered = collections.Counter()
-        if self.words:
-            for item in self.words:
-                attr = item
-                value = self.words[item]
-                if len(attr) >= self.min_word_length and value >= self.min_word_frequency \
-                    and attr not in wordcloud.STOPWORDS:
+    # single pass top-k of the items passing item_filter, same order as a full sort (ties stay in
+    # insertion order), all items sorted when top is 0
+    @staticmethod
+    def get_top_items(item_counter, top=0, item_filter=None):
+        items = item_counter.items()
+        if item_filter is not None:
+            items = filter(item_filter, items)
 
-                    filtered[attr] = value
+        if top > 0:
+            return heapq.nlargest(top, items, key=operator.itemgetter(1))
 
-        # gets a sorted list of tuples
-        filtered_sort = self.get_sorted_items(filtered)
+        return sorted(items, key=operator.itemgetter(1), reverse=True)
 
-        final_list = collections.Counter()
-        i = 0
-        for item in filtered_sort:
-            attr, value = item
+    # the min_length, min_freq and stopword filter of shown words as a (word, count) predicate
+    def get_word_filter(self, min_length=None, min_frequency=None):
+        min_length = self.min_word_length if min_length is None else min_length
+        min_frequency = self.min_word_frequency if min_frequency is None else min_frequency
+        stopwords = get_stopwords()
 
-            if self.display_top == 0:
-                final_list[attr] = value
-            else:
-                if i < self.display_top:
-                    final_list[attr] = value
-                    i += 1
-                else:
-                    break
+        def is_display_word(pair):
+            return pair[1] >= min_frequency and len(pair[0]) >= min_length and pair[0] not in stopwords
+
+        return is_display_word
+
+    # min_length, min_freq and stopword filters applied while selecting the top words
+    def get_top_words(self):
+        # filters and top-k run over the vocabulary's arrays
+        if self.compact_vocabulary:
+            return self.words.top_items(self.display_top, self.min_word_length, self.min_word_frequency,
+                                        get_stopwords())
+
+        return self.get_top_items(self.words, self.display_top, self.get_word_filter())
+
+    # (phrase, count) of the top n-grams by count, or by pmi as collocations
+    def get_top_phrases(self, top=None):
+        top = self.display_top if top is None else top
+        if self.ngram_pmi:
+            min_count = max(self.min_word_frequency, word_ngrams.MIN_COLLOCATION_COUNT)
+            return [(ngram, count) for ngram, count, _ in word_ngrams.get_collocations(self.ngrams, top, min_count)]
+
+        return word_ngrams.get_top_ngrams(self.ngrams, top, self.min_word_frequency)
+
+    # top words back to a counter object so word cloud can use, with the top phrases when n-grams are
+    # counted (the most counted of both up to display_top)
+    def get_filtered_words(self, top_words=None):
+        words = collections.Counter(dict(self.get_top_words() if top_words is None else top_words))
+        if not self.ngram_size:
+            return words
 
-        return final_list
+        words.update(dict(self.get_top_phrases()))
+        if self.display_top:
+            words = collections.Counter(dict(words.most_common(self.display_top)))
 
-    def print_items(self, list_items, words=False):
+        return words
+
+    # error bounds are printed for items from an approximate (space-saving) counter
+    def print_items(self, list_items, words=False, counter=None):
         if not list_items:
             print("none.")
         else:
             i = 0
             pad_to = self._get_attr_padding(list_items)
 
+            if counter is None and isinstance(list_items, heavy_hitters.ApproximateCounter):
+                counter = list_items
+            if not isinstance(counter, heavy_hitters.ApproximateCounter):
+                counter = None
+
             for item in list_items:
                 if type(list_items) is list:
                     attr, value = item
-                elif type(list_items) is collections.Counter:
+                elif isinstance(list_items, COUNTER_TYPES):
                     attr = item
                     value = list_items[attr]
                 else:
@@ -106,12 +222,130 @@ class TweetWords(twitter_helper.TwitterHelper):
                 if words:
                     if len(attr) >= self.min_word_length and value >= self.min_word_frequency:
                         if i < self.display_top or self.display_top == 0:
-                            print("{0:<{1}s}{2}".format(attr, pad_to, value))
+                            self._print_item(attr, value, pad_to, counter)
                             i += 1
                 else:
-                    print("{0:<{1}s}{2}".format(attr, pad_to, value))
+                    self._print_item(attr, value, pad_to, counter)
 
-    def count_words(self, tweet):
+    # an item shown at its guaranteed count (lossy counted phrases) is printed with the count it may have
+    @staticmethod
+    def _print_item(attr, value, pad_to, counter=None):
+        error = counter.error(attr) if counter is not None else 0
+        if error and value == counter.guaranteed(attr):
+            print("{0:<{1}s}{2} (up to {3})".format(attr, pad_to, value, value + error))
+        elif error:
+            print("{0:<{1}s}{2} (error <= {3})".format(attr, pad_to, value, error))
+        else:
+            print("{0:<{1}s}{2}".format(attr, pad_to, value))
+
+    @staticmethod
+    def print_count_bounds(counter):
+        if isinstance(counter, heavy_hitters.SpaceSavingCounter):
+            print(f"(approximate: {len(counter)} of max {counter.capacity} items kept from {counter.total} counted, "
+                  f"counts over by at most {counter.max_error})")
+        elif isinstance(counter, heavy_hitters.LossyCounter) and counter.max_error:
+            print(f"(approximate: {len(counter)} items kept from {counter.total} counted, counts of "
+                  f"{counter.max_error} or less dropped, shown at guaranteed counts, under by at most {counter.max_error})")
+
+    # count a tweet record - urls, media, replies and words, returns the tweet text
+    def count_record(self, record):
+        if self.trend_index is not None or self.tweet_index is not None or self.duplicate_detector is not None:
+            self.count_records([record])
+            return self.get_record_text(record)
+
+        tweet_text = self._count_record_entities(record)
+
+        # do all the word things
+        if self.entity_words:
+            self.count_entity_words(tweet_text, record.entities)
+        else:
+            self.count_words(tweet_text)
+
+        return tweet_text
+
+    # records with their words counted in one tokenizer batch, a batch per minute with a trend index
+    def count_records(self, records):
+        if self.duplicate_detector is not None:
+            records = self._drop_duplicates(records)
+
+        if self.trend_index is None:
+            self._count_records(records)
+            return
+
+        for minute, minute_records in itertools.groupby(records, tweet_trends.get_record_minute):
+            minute_records = list(minute_records)
+            self._count_trend_minute(minute, len(minute_records), lambda: self._count_records(minute_records))
+
+    def _drop_duplicates(self, records):
+        records = list(records)
+        duplicates = self.duplicate_detector.check_batch([None if record.is_retweet else record.text
+                                                          for record in records])
+
+        return [record for record, duplicate in zip(records, duplicates) if not duplicate]
+
+    def _count_records(self, records):
+        if self.tweet_index is not None:
+            records = list(records)
+            self._tweet_terms = []
+
+        if self.entity_words:
+            self.count_entity_words_batch([(self._count_record_entities(record), record.entities)
+                                           for record in records])
+        else:
+            self.count_words_batch([self._count_record_entities(record) for record in records])
+
+        if self.tweet_index is not None:
+            self.tweet_index.add_records(records, self._tweet_terms)
+            self._tweet_terms = None
+
+    # count() counts tweets of the same minute into fresh counters for the indexed kinds, which are added
+    # to the trend index and merged into the totals - merged in counting order the totals are the same as
+    # counted directly
+    def _count_trend_minute(self, minute, tweets, count):
+        kinds = self.trend_index.kinds
+        totals = [getattr(self, name) for name in kinds]
+        counters = {name: collections.Counter() for name in kinds}
+        for name, counter in counters.items():
+            setattr(self, name, counter)
+
+        try:
+            result = count()
+        finally:
+            for name, counter in zip(kinds, totals):
+                setattr(self, name, counter)
+
+        self.merge_counters(counters)
+        self.trend_index.add(minute, counters, tweets)
+
+        return result
+
+    # count a status json
+    def count_status(self, status):
+        return self.count_record(tweet_record.TweetRecord.from_json(status))
+
+    def count_statuses(self, statuses):
+        self.count_records(tweet_record.iter_records(statuses))
+
+    @staticmethod
+    def get_record_text(record):
+        return record.text.replace("&amp;", "&")
+
+    def _count_record_entities(self, record):
+        tweet_text = self.get_record_text(record)
+
+        for url in record.urls:
+            self.urls[url] += 1
+
+        for media_url in record.media:
+            self.media[media_url] += 1
+
+        if record.in_reply_to_screen_name:
+            self.replies["@" + record.in_reply_to_screen_name.lower()] += 1
+
+        return tweet_text
+
+    # counts the retweeted @name, returns where the words start in the text or None
+    def _get_word_start(self, tweet):
         # retweets - don't count string but count @name as a mention
         retweet_match = self.RETWEET_PATTERN.match(tweet)
 
@@ -122,11 +356,203 @@ class TweetWords(twitter_helper.TwitterHelper):
 
             # don't process retweets any further
             if self.include_retweet_words:
-                tweet = retweet_match.group(2)
+                return retweet_match.start(2)
+
+            return None
+
+        return 0
+
+    # the text to count words in or None
+    def _get_word_text(self, tweet):
+        start = self._get_word_start(tweet)
+        if start is None:
+            return None
+
+        return tweet[start:] if start else tweet
+
+    # items of one tweet - counted in one update, same counts and order as one at a time
+    def _count_items(self, counter, items):
+        if type(counter) is collections.Counter:
+            counter.update(items)
+        elif self.compact_vocabulary and counter is self.words:
+            counter.add_words(items)
+        elif type(counter) is heavy_hitters.LossyCounter:
+            counter.add_items(items)
+        else:
+            for item in items:
+                counter[item] += 1
+
+    # the words, hashtags and mentions of one tweet, kept as the tweet's terms while indexing
+    def _count_terms(self, word_list, hashtag_list, mention_list):
+        if hashtag_list:
+            self._count_items(self.hashtags, hashtag_list)
+        if mention_list:
+            self._count_items(self.mentions, mention_list)
+        self._count_items(self.words, word_list)
+
+        if self._tweet_terms is not None:
+            self._tweet_terms.append(word_list + hashtag_list + mention_list)
+
+    # a tweet without counted words (a retweet) has no terms
+    def _skip_terms(self):
+        if self._tweet_terms is not None:
+            self._tweet_terms.append(())
+
+    # tokens from the fast tokenizer come already lowercased and classified
+    def count_tokens(self, tokens):
+        word_list = []
+        hashtag_list = []
+        mention_list = []
+        self._count_token_kinds(tokens, word_list, hashtag_list, mention_list, get_stopwords())
+        self._count_terms(word_list, hashtag_list, mention_list)
+
+        if self.ngram_size:
+            self._count_ngrams(tokens)
+
+    # runs of plain words broken by stopwords, punctuation, urls, hashtags and mentions, counted as their
+    # words and n-grams from the tokens already classified. the screen name pattern also matches bare
+    # words, so name tokens without an @ are words here. with entity words the text between entities is
+    # joined, a run can span a hashtag or mention taken out of it
+    def _count_ngrams(self, tokens):
+        stopwords = get_stopwords()
+        ngrams = []
+        run = []
+        for kind, word in tokens:
+            if ((kind is tweet_tokenizer.TOKEN_WORD or kind is tweet_tokenizer.TOKEN_NAME and word[0] != "@") and
+                    word[0].isalnum() and word not in stopwords):
+                run.append(word)
+            elif run:
+                word_ngrams.add_run_ngrams(run, self.ngram_size, ngrams)
+                run = []
+
+        if run:
+            word_ngrams.add_run_ngrams(run, self.ngram_size, ngrams)
+
+        if ngrams:
+            if self.ngram_lists is not None:
+                self.ngram_lists.append(ngrams)
             else:
-                return
+                self._count_items(self.ngrams, ngrams)
+
+    # words, hashtags and mentions added to their lists. i is the tweet's token index so far (the first
+    # token isn't counted as a mention), returns it after the tokens
+    def _count_token_kinds(self, tokens, word_list, hashtag_list, mention_list, stopwords, i=0):
+        for kind, word in tokens:
+            if kind is tweet_tokenizer.TOKEN_HASHTAG:
+                hashtag_list.append(word)
+            elif kind is tweet_tokenizer.TOKEN_NAME:
+                if i != 0:
+                    mention_list.append(word)
+            elif kind is tweet_tokenizer.TOKEN_WORD:
+                if word not in stopwords:
+                    word_list.append(word)
+
+            i += 1
+
+        return i
+
+    # entity parts, text between entities and leading entity of a tweet (tweet_entities.split_entities),
+    # None when its words aren't counted
+    def _split_entities(self, tweet, entities):
+        start = self._get_word_start(tweet)
+        if start is None:
+            return None
+
+        return tweet_entities.split_entities(tweet, entities, start)
+
+    # hashtag and mention entities are counted as their tokens would be, then the tokens of the text
+    # between them. a leading entity is the tweet's first token (a leading mention isn't counted)
+    def _count_entity_tokens(self, entity_parts, leading_entity, tokens):
+        word_list = []
+        hashtag_list = []
+        mention_list = []
+        for index, (kind, text) in enumerate(entity_parts):
+            if kind is tweet_entities.HASHTAG:
+                hashtag_list.append(text.lower())
+            elif kind is tweet_entities.MENTION and (index or not leading_entity):
+                mention_list.append(text.lower())
+
+        self._count_token_kinds(tokens, word_list, hashtag_list, mention_list, get_stopwords(),
+                                1 if leading_entity else 0)
+        self._count_terms(word_list, hashtag_list, mention_list)
+
+        if self.ngram_size:
+            self._count_ngrams(tokens)
+
+    # lowercased, classified tokens of each text. nltk tokenizes them joined on the separator the fast
+    # tokenizer batches with, one call instead of one per text
+    def _classify_texts(self, texts):
+        if self.fast_tokenizer:
+            return self.tweet_tokenizer.classify_batch(texts)
+
+        if not texts:
+            return []
+
+        batch = [[]]
+        joined = tweet_tokenizer.BATCH_SEPARATOR.join(text.replace("\x00", " ") for text in texts)
+        for token in self.tweet_tokenizer.tokenize(joined):
+            if token == "\x00":
+                batch.append([])
+                continue
+
+            word = token.lower().strip()
+            if word:
+                batch[-1].append((tweet_tokenizer.classify_token(word), word))
+
+        return batch
+
+    def count_entity_words(self, tweet, entities):
+        split = self._split_entities(tweet, entities)
+        if split is None:
+            self._skip_terms()
+            return
+
+        entity_parts, text, leading_entity = split
+        self._count_entity_tokens(entity_parts, leading_entity, self._classify_texts([text])[0])
+
+    # (text, entities) pairs, the text between entities of all the tweets tokenized in one batch
+    def count_entity_words_batch(self, tweets):
+        splits = [self._split_entities(tweet, entities) for tweet, entities in tweets]
+        batch = iter(self._classify_texts([split[1] for split in splits if split is not None]))
+
+        for split in splits:
+            if split is None:
+                self._skip_terms()
+            else:
+                self._count_entity_tokens(split[0], split[2], next(batch))
+
+    # batch of tweet texts, tokenized in one call with the fast tokenizer
+    def count_words_batch(self, tweets):
+        if not self.fast_tokenizer:
+            for tweet in tweets:
+                self.count_words(tweet)
+            return
+
+        word_texts = list(map(self._get_word_text, tweets))
+        batch = iter(self.tweet_tokenizer.classify_batch([text for text in word_texts if text is not None]))
+
+        for text in word_texts:
+            if text is None:
+                self._skip_terms()
+            else:
+                self.count_tokens(next(batch))
+
+    def count_words(self, tweet):
+        tweet = self._get_word_text(tweet)
+        if tweet is None:
+            self._skip_terms()
+            return
+
+        if self.fast_tokenizer:
+            self.count_tokens(self.tweet_tokenizer.classify(tweet))
+            return
 
         word_array = self.tweet_tokenizer.tokenize(tweet)
+        stopwords = get_stopwords()
+        word_list = []
+        hashtag_list = []
+        mention_list = []
+        ngram_words = [] if self.ngram_size else None
 
         i = 0
         for word in word_array:
@@ -136,6 +562,9 @@ class TweetWords(twitter_helper.TwitterHelper):
             if not word:
                 continue
 
+            if ngram_words is not None:
+                ngram_words.append(word)
+
             if not self.WORD_HTTP_PATTERN.match(word):
                 # not sure about this - doesnt start with alpha,@,# or doesn't end with alpha
                 # removes parenthesis and quotes etc - aggressive / nltk handles now mostly
@@ -146,128 +575,303 @@ class TweetWords(twitter_helper.TwitterHelper):
 
                 # hashtags and mentions else words
                 if word[0] == "#" and len(word)>1:
-                    self.hashtags[word] += 1
+                    hashtag_list.append(word)
                 elif self.is_screen_name(word):
                     if i != 0:
-                        self.mentions[word] += 1
+                        mention_list.append(word)
                 else:
-                    if word not in wordcloud.STOPWORDS:
-                        self.words[word] += 1
+                    if word not in stopwords:
+                        word_list.append(word)
 
             i += 1
 
+        self._count_terms(word_list, hashtag_list, mention_list)
+
+        if ngram_words:
+            self._count_ngrams([(tweet_tokenizer.classify_token(word), word) for word in ngram_words])
+
+# wordcloud's stopword list read from its package data file without importing wordcloud
+@functools.lru_cache(maxsize=None)
+def get_stopwords():
+    spec = importlib.util.find_spec('wordcloud')
+    if spec is None or not spec.submodule_search_locations:
+        import wordcloud
+
+        return frozenset(wordcloud.STOPWORDS)
+
+    with open(os.path.join(spec.submodule_search_locations[0], 'stopwords')) as stopwords_file:
+        return frozenset(map(str.strip, stopwords_file.readlines()))
+
 def get_arguments():
     parser = argparse.ArgumentParser()
-    parser.add_argument('-u', '--user', help="twitter user @name", type=twitter_helper.TwitterHelper.arg_twitter_id, required=True)
-    parser.add_argument('-c', '--count', help="get count number of tweets", type=int, default=1)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-u', '--user', help="twitter user @name (comma seperated for more than one)",
+                        type=twitter_helper.TwitterHelper.arg_twitter_ids)
+    source.add_argument('-uf', '--users_file', help="file of twitter user @names, one per line",
+                        type=twitter_helper.TwitterHelper.arg_twitter_ids_file, metavar='FILE')
+    source.add_argument('-a', '--archive', help="read tweets from jsonl archive files (plain or gzip, - for stdin)",
+                        nargs='+', metavar='FILE')
+    source.add_argument('-sn', '--snapshot', help="report from saved count snapshots (merged as they are read)",
+                        nargs='+', metavar='FILE')
+    parser.add_argument('-c', '--count', help="get count number of tweets (default 1, all for archives)", type=int,
+                        default=None)
+    parser.add_argument('-ca', '--cache', help="cache user timelines in a local sqlite file, only fetching new tweets",
+                        metavar='FILE')
     parser.add_argument('-rt', '--retweets', help="include retweets ", required=False, default=False, action='store_true')
     parser.add_argument('-s', '--show', help="show count tweets ", required=False, default=False, action='store_true')
+    parser.add_argument('-sf', '--show_format', help="shown tweets as one table at the end, a table streamed as "
+                        "tweets are counted, or jsonl or csv rows (implies --show)", choices=tweet_output.FORMATS)
+    parser.add_argument('-so', '--show_output', help="write shown tweets to FILE instead of stdout", default='-',
+                        metavar='FILE')
+    parser.add_argument('-tb', '--textblob', help="score shown tweets sentiment with textblob (slower, exact)",
+                        required=False, default=False, action='store_true')
     parser.add_argument('-l', '--min_length', help="min word length", type=int, default=1)
     parser.add_argument('-f', '--min_freq', help="min word frequency", type=int, default=1)
     parser.add_argument('-t', '--top', help="display top number of words by freq", type=int, default=0)
+    parser.add_argument('-ft', '--fast_tokenizer', help="use the compiled tweet tokenizer instead of nltk",
+                        required=False, default=False, action='store_true')
+    parser.add_argument('-ew', '--entity_words', help="take hashtags and mentions from the tweet entities and only "
+                        "tokenize the text between them (twitter's entity bounds, not a speed option)", required=False, default=False, action='store_true')
+    parser.add_argument('-ap', '--approximate', help="count words, names, hashtags, urls and media approximately "
+                        "in fixed memory keeping at most capacity items each", type=int, default=0, metavar='CAPACITY')
+    parser.add_argument('-cv', '--compact_vocabulary', help="count words with int ids and numpy counts (less memory "
+                        "for large vocabularies)", required=False, default=False, action='store_true')
+    parser.add_argument('-sv', '--save_vocabulary', help="save the word counts to FILE (.npz, or a directory of .npy "
+                        "files for memory mapping)", metavar='FILE')
+    parser.add_argument('-ss', '--save_snapshot', help="save all counts to a snapshot FILE that tweet_snapshot.py can "
+                        "merge with others", metavar='FILE')
+    parser.add_argument('-w', '--workers', help="concurrent timeline fetches for more than one user", type=int,
+                        default=4)
+    parser.add_argument('-j', '--jobs', help="count archive tweets using jobs worker processes", type=int, default=1)
     parser.add_argument('-wc', '--wordcloud', help="create word cloud", required=False, default=False, action='store_true')
+    parser.add_argument('-wo', '--wordcloud_output', help="word cloud image FILE (default wordcloud.png next to the "
+                        "script, implies --wordcloud)", metavar='FILE')
+    parser.add_argument('-wz', '--wordcloud_size', help="word cloud image size (default 1280x800)",
+                        type=twitter_helper.arg_size, metavar='WIDTHxHEIGHT')
+    parser.add_argument('-wm', '--wordcloud_mask', help="only draw words where the mask image FILE isn't white",
+                        metavar='FILE')
+    parser.add_argument('-ng', '--ngrams', help="also count phrases of 2 to N words and report the top ones",
+                        type=int, default=0, metavar='N')
+    parser.add_argument('-nge', '--ngram_error', help="count phrases approximately, dropping those under RATE of all "
+                        "counted (0 to count exactly)", type=float, default=0, metavar='RATE')
+    parser.add_argument('-pmi', '--pmi', help="rank phrases by pointwise mutual information instead of count",
+                        required=False, default=False, action='store_true')
+    parser.add_argument('-dd', '--dedupe', help="leave near-duplicates of the last TWEETS counted tweets out of the "
+                        "counts (minhash, 0 to count all)", type=int, default=0, metavar='TWEETS')
+    parser.add_argument('-tr', '--trends', help="index the counts by minute of created_at and report the top and "
+                        "bursting hashtags and words of the last window", required=False, default=False,
+                        action='store_true')
+    parser.add_argument('-trw', '--trend_window', help="trend window MINUTES", type=float, default=60,
+                        metavar='MINUTES')
+    parser.add_argument('-trb', '--trend_baseline', help="bursts are counts over those of the MINUTES before the "
+                        "window", type=float, default=24 * 60, metavar='MINUTES')
+    parser.add_argument('-tre', '--trend_end', help="trend window ending at TIME (utc iso or epoch seconds, "
+                        "default the newest tweet)", type=twitter_helper.arg_time, metavar='TIME')
+    parser.add_argument('-ix', '--index', help="index the tweets by their counted words, hashtags and mentions in "
+                        "DIR for tweet_index.py searches", metavar='DIR')
+    parser.add_argument('-m', '--metrics', help="write stage timings and counters to FILE on exit (.prom for "
+                        "prometheus text, otherwise json)", metavar='FILE')
+    parser.add_argument('-mi', '--metrics_interval', help="also rewrite the metrics file every SECONDS", type=float,
+                        default=0, metavar='SECONDS')
     args = parser.parse_args()
 
-    return args
+    if args.show_format:
+        args.show = True
+    args.show_format = args.show_format or tweet_output.TABLE
 
-def create_wordcloud(words):
-    current_directory = os.path.dirname(__file__)
+    if args.wordcloud_output:
+        args.wordcloud = True
 
-    stopwords = set(wordcloud.STOPWORDS)
+    # one user keeps the single timeline path
+    args.users = args.user or args.users_file or []
+    args.user = args.users[0] if len(args.users) == 1 else None
 
-    word_cloud = wordcloud.WordCloud(
-        background_color='white',
-        width=1280,
-        height=800,
-        stopwords=stopwords)
+    return args
 
-    word_cloud.generate_from_frequencies(words)
-    word_cloud.to_file(os.path.join(current_directory, 'wordcloud.png'))
+def create_wordcloud(words, path=None, size=None, mask_path=None):
+    import wordcloud_renderer
+
+    width, height = size or (wordcloud_renderer.DEFAULT_WIDTH, wordcloud_renderer.DEFAULT_HEIGHT)
+    frames = wordcloud_renderer.WordcloudFrames(path, width, height, mask_path)
+    frame = frames.render(words)
+    print(f"{wordcloud_renderer.format_frame(frame)} to {frame.path}", file=sys.stderr)
+
+def get_api():
+    import tweepy
 
-def main():
     twitter_api_keys = twitter_helper.get_twitter_env_api_keys()
     tweepy_auth = twitter_helper.get_tweepy_auth_handler(twitter_api_keys)
 
-    api = tweepy.API(tweepy_auth, wait_on_rate_limit=True, wait_on_rate_limit_notify=True, compression=True)
+    # pages come back as status json, no tweepy models
+    return tweepy.API(tweepy_auth, wait_on_rate_limit=True, wait_on_rate_limit_notify=True, compression=True,
+                      parser=tweepy.parsers.JSONParser())
 
-    user_args = get_arguments()
+# timeline pages fetched older and older by max_id. tweepy's Cursor parses every page into models to
+# find the next max_id whatever the api's parser
+def get_timeline_statuses(user_args):
+    import tweepy
 
-    # print(f"type: {type(user_args)} - {user_args}")
-    # sys.exit()
+    api = get_api()
+
+    count = user_args.count or 1
+    max_id = None
+    fetched = 0
+    while fetched < count:
+        kwargs = {'max_id': max_id} if max_id is not None else {}
+        try:
+            page = api.user_timeline(screen_name=user_args.user, count=min(count - fetched, TIMELINE_PAGE_SIZE),
+                                     include_rts=user_args.retweets, tweet_mode='extended', **kwargs)
+        except tweepy.TweepError as err:
+            print(err)
+            break
+
+        if not page:
+            break
 
-    tweet_words = TweetWords(min_word_length=user_args.min_length, min_word_frequency=user_args.min_freq,
-                             display_top=user_args.top)
+        page = page[:count - fetched]
+        yield from page
+        fetched += len(page)
+        max_id = page[-1]['id'] - 1
+
+# fetch only tweets missing from the cache then read the timeline from it
+def get_cached_timeline_statuses(user_args):
+    import tweepy
+    import timeline_cache
+
+    cache = timeline_cache.TimelineCache(user_args.cache)
+    count = user_args.count or 1
 
     try:
-        timeline_statuses = tweepy.Cursor(api.user_timeline, screen_name=user_args.user, count=user_args.count,
-                                          include_rts=user_args.retweets, cursor=-1,
-                                          tweet_mode='extended').items(user_args.count)
+        fetched = cache.update(get_api(), user_args.user, count, include_retweets=user_args.retweets)
+        print(f"cache: fetched {fetched} tweets in {cache.api_calls} api calls", file=sys.stderr)
+    except tweepy.TweepError as err:
+        print(f"cache: {err}", file=sys.stderr)
 
-        tweets_table = prettytable.PrettyTable(['', 'Created', 'Reply', 'RT', 'Text', 'Sentiment'])
-        tweets_table.align = "l"
-        tweets_table.hrules = True
+    try:
+        yield from cache.iter_statuses(user_args.user, count, include_retweets=user_args.retweets)
+    finally:
+        cache.close()
 
-        tweet_counter = 0
-        while True:
-            try:
-                tweet = next(timeline_statuses)
-            except tweepy.TweepError as err:
-                print(err)
-                break
-            except StopIteration:
-                break
-
-            tweet_counter += 1
-
-            tweet_created = tweet.created_at
-
-            tweet_text = ""
-            if hasattr(tweet, 'full_text'):
-                tweet_text = tweet.full_text
-            else:
-                tweet_text = tweet.text
+def get_tweet_words(user_args, trend_index=None, tweet_index=None, duplicate_detector=None):
+    return TweetWords(min_word_length=user_args.min_length, min_word_frequency=user_args.min_freq,
+                      display_top=user_args.top, fast_tokenizer=user_args.fast_tokenizer,
+                      counter_capacity=user_args.approximate, compact_vocabulary=user_args.compact_vocabulary,
+                      entity_words=user_args.entity_words, trend_index=trend_index, tweet_index=tweet_index,
+                      ngram_size=user_args.ngrams, ngram_error=user_args.ngram_error, ngram_pmi=user_args.pmi,
+                      duplicate_detector=duplicate_detector)
 
-            tweet_text = tweet_text.replace("&amp;", "&")
+# timelines of many users fetched concurrently, counted per user as pages arrive
+def count_user_timelines(user_args, trend_index=None, tweet_index=None, duplicate_detector=None):
+    import timeline_scheduler
 
-            if hasattr(tweet, 'entities'):
-                if 'urls' in tweet.entities:
-                    for u in tweet.entities['urls']:
-                        tweet_words.urls[u.get('expanded_url')] += 1
+    scheduler = timeline_scheduler.TimelineScheduler(get_scheduler_api, workers=user_args.workers)
+    user_words = {user: get_tweet_words(user_args, trend_index, tweet_index, duplicate_detector)
+                  for user in user_args.users}
 
-            if hasattr(tweet, 'extended_entities'):
-                if 'media' in tweet.extended_entities:
-                    for m in tweet.extended_entities['media']:
-                        tweet_words.media[m.get('media_url_https')] += 1
+    metrics = tweet_metrics.METRICS
+    tweet_rate = tweet_archive.TweetRate(report_every=0)
+    pages = scheduler.iter_pages(user_args.users, user_args.count or 1, user_args.retweets)
+    for user, statuses in metrics.timed('fetch', pages):
+        with metrics.timer('count'):
+            user_words[user].count_statuses(statuses)
+        tweet_rate.tick(len(statuses))
+        metrics.count('tweets', len(statuses))
 
-            # do all the word things
-            tweet_words.count_words(tweet_text)
+    metrics.count('api_calls', scheduler.api_calls)
+    tweet_rate.report(prefix=f"{len(user_args.users)} users ({scheduler.api_calls} api calls)")
+
+    return user_words, tweet_rate.count
+
+# rate limits are handled by the scheduler instead of tweepy waiting
+def get_scheduler_api():
+    import tweepy
 
-            tweet_reply_name = ""
-            if tweet.in_reply_to_screen_name:
-                tweet_reply_name = "@" + tweet.in_reply_to_screen_name
-                tweet_words.replies[tweet_reply_name.lower()] += 1
+    twitter_api_keys = twitter_helper.get_twitter_env_api_keys()
+    tweepy_auth = twitter_helper.get_tweepy_auth_handler(twitter_api_keys)
 
-            retweet_name = ""
-            retweet_match = tweet_words.RETWEET_PATTERN.match(tweet_text)
-            if retweet_match:
-                retweet_name = retweet_match.group(1)
+    return tweepy.API(tweepy_auth, wait_on_rate_limit=False, compression=True, parser=tweepy.parsers.JSONParser())
 
-            feelings = textblob.TextBlob(tweet_text)
-            sentiment = f"pol:{feelings.sentiment[0]:.2f}\nsub:{feelings.sentiment[1]:.2f}"
+def get_archive_statuses(user_args):
+    statuses = tweet_archive.iter_archive_statuses(user_args.archive, include_retweets=user_args.retweets)
 
-            tweet_text = twitter_helper.insert_newlines(tweet_text, 65)
-            tweets_table.add_row([tweet_counter, tweet_created, tweet_reply_name, retweet_name, tweet_text, sentiment])
-    except tweepy.TweepError as err:
-        print(f"error: {err}")
+    if user_args.count:
+        statuses = itertools.islice(statuses, user_args.count)
+
+    return statuses
+
+# records in lists of batch_size, counted a batch at a time (one tokenizer call, one trend index
+# bucket per minute) before their rows are shown
+def iter_record_batches(statuses, batch_size=RECORD_BATCH_SIZE):
+    records = tweet_record.iter_records(statuses)
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            break
+
+        yield batch
+
+def save_vocabulary(tweet_words, path):
+    import word_vocabulary
+
+    vocabulary = tweet_words.words
+    if not tweet_words.compact_vocabulary:
+        vocabulary = word_vocabulary.VocabularyCounter()
+        vocabulary.update(tweet_words.words)
+
+    vocabulary.save(path)
+    print(f"vocabulary: {len(vocabulary)} words saved to {path}", file=sys.stderr)
+
+# a shown tweet's row
+def get_tweet_row(number, record):
+    tweet_text = TweetWords.get_record_text(record)
+
+    tweet_reply_name = ""
+    if record.in_reply_to_screen_name:
+        tweet_reply_name = "@" + record.in_reply_to_screen_name
+
+    retweet_name = ""
+    retweet_match = TweetWords.RETWEET_PATTERN.match(tweet_text)
+    if retweet_match:
+        retweet_name = retweet_match.group(1)
+
+    return tweet_output.TweetRow(number, record.id, record.created, tweet_reply_name, retweet_name, tweet_text)
 
-    if tweets_table and user_args.show:
-        print("TWEETS")
-        print(tweets_table)
-        print()
+# shown tweets written as they are counted, scored for sentiment a batch at a time
+def get_row_writer(user_args, show_file):
+    metrics = tweet_metrics.METRICS
+
+    def score_sentiments(texts):
+        with metrics.timer('sentiment'):
+            return get_sentiments(texts, user_args.textblob)
+
+    return tweet_output.get_row_writer(user_args.show_format, score_sentiments, show_file)
+
+# (polarity, subjectivity) for each text - batched lexicon scores or per tweet textblob
+def get_sentiments(texts, use_textblob=False):
+    if use_textblob:
+        import textblob
+
+        return [textblob.TextBlob(text).sentiment for text in texts]
+
+    return get_lexicon_sentiment().score_batch(texts)
+
+# one lexicon engine for every batch, so the lexicon is loaded once and the memo of scores kept
+@functools.lru_cache(maxsize=None)
+def get_lexicon_sentiment():
+    import tweet_sentiment
+
+    return tweet_sentiment.LexiconSentiment()
+
+def print_report(tweet_words):
+    top_words = tweet_words.get_top_words()
 
     if tweet_words.words:
         print("WORDS")
-        tweet_words.print_items(tweet_words.get_sorted_items(tweet_words.words), True)
+        tweet_words.print_items(top_words, True, counter=tweet_words.words)
+        tweet_words.print_count_bounds(tweet_words.words)
+
+    if tweet_words.ngram_size and tweet_words.ngrams:
+        print_phrases(tweet_words)
 
     # if tweet_words.retweets:
     #     print("\nRETWEETED")
@@ -283,15 +887,224 @@ def main():
     #
     if tweet_words.hashtags:
         print("\nHASHTAGS")
-        tweet_words.print_items(tweet_words.get_sorted_items(tweet_words.hashtags), False)
+        tweet_words.print_items(tweet_words.get_top_items(tweet_words.hashtags), False, counter=tweet_words.hashtags)
+        tweet_words.print_count_bounds(tweet_words.hashtags)
 
     # print("\nMEDIA")
     # tweet_words.print_items(tweet_words.media, False)
     # print("\nURLS")
     # tweet_words.print_items(tweet_words.urls, False)
 
+    return top_words
+
+# top n-grams by count, or collocations with their pmi
+def print_phrases(tweet_words):
+    print("\nCOLLOCATIONS" if tweet_words.ngram_pmi else "\nPHRASES")
+    if not tweet_words.ngram_pmi:
+        tweet_words.print_items(tweet_words.get_top_phrases(), False, counter=tweet_words.ngrams)
+    else:
+        min_count = max(tweet_words.min_word_frequency, word_ngrams.MIN_COLLOCATION_COUNT)
+        collocations = word_ngrams.get_collocations(tweet_words.ngrams, tweet_words.display_top, min_count)
+        if not collocations:
+            print("none.")
+
+        pad_to = max((len(ngram) for ngram, *_ in collocations), default=0) + 1
+        for ngram, count, pmi in collocations:
+            print(f"{ngram:<{pad_to}s}{count} (pmi {pmi:.2f})")
+
+    tweet_words.print_count_bounds(tweet_words.ngrams)
+
+# top and bursting hashtags and words of the trend window
+def print_trends(tweet_words, trend_index, window_minutes, baseline_minutes, end=None, top=10):
+    window = int(window_minutes * 60)
+    baseline = int(baseline_minutes * 60)
+    end = trend_index.get_end(end)
+
+    _, tweets = trend_index.get_window('hashtags', end - window, end)
+    _, baseline_tweets = trend_index.get_window('hashtags', end - window - baseline, end - window)
+    print(f"TRENDS {tweet_trends.format_time(end - window)} - {tweet_trends.format_time(end)} ({tweets} tweets), "
+          f"bursts against the {baseline_minutes:g} minutes before ({baseline_tweets} tweets)")
+
+    for kind, item_filter in (('hashtags', None), ('words', tweet_words.get_word_filter())):
+        top_items = trend_index.get_top(kind, window, top, end, item_filter)
+        print(f"\nTOP {kind.upper()}")
+        tweet_words.print_items(top_items, False)
+
+        bursts = trend_index.get_bursts(kind, window, baseline, top, end, item_filter=item_filter)
+        print(f"\nBURSTING {kind.upper()}")
+        if not bursts:
+            print("none.")
+
+        pad_to = max((len(term) for term, *_ in bursts), default=0) + 1
+        for term, count, expected, score in bursts:
+            print(f"{term:<{pad_to}s}{count} (expected {expected:.1f}, score {score:.1f})")
+
+def main():
+    user_args = get_arguments()
+
+    # print(f"type: {type(user_args)} - {user_args}")
+    # sys.exit()
+
+    metrics = tweet_metrics.METRICS
+    if user_args.metrics:
+        metrics.enable(user_args.metrics, user_args.metrics_interval, prefix="twitter_words")
+
+    trend_index = tweet_trends.TrendIndex() if user_args.trends else None
+
+    tweet_index = None
+    if user_args.index and not user_args.snapshot:
+        import tweet_index as tweet_index_module
+
+        tweet_index = tweet_index_module.IndexWriter(user_args.index)
+
+    duplicate_detector = None
+    if user_args.dedupe and not user_args.snapshot:
+        import tweet_duplicates
+
+        duplicate_detector = tweet_duplicates.DuplicateDetector(window=user_args.dedupe)
+
+    tweet_words = get_tweet_words(user_args, trend_index, tweet_index, duplicate_detector)
+
+    # tweets from the api can raise tweepy errors, archives never import tweepy
+    api_errors = ()
+    if user_args.user or user_args.users:
+        import tweepy
+
+        api_errors = (tweepy.TweepError,)
+
+    row_writer = None
+    show_file = sys.stdout
+    if user_args.show and user_args.show_output != '-':
+        show_file = open(user_args.show_output, 'w', encoding='utf-8', newline='')
+
+    tweet_total = 0
+    try:
+        parallel_archive = user_args.archive and user_args.jobs > 1 and not (user_args.show or user_args.count or
+                                                                             user_args.trends or user_args.index or
+                                                                             user_args.dedupe)
+
+        if parallel_archive:
+            # counted by the worker processes, no rows for the table
+            import tweet_workers
+
+            with metrics.timer('count_archive'):
+                tweet_count = tweet_workers.count_archive(tweet_words, user_args.archive, user_args.jobs,
+                                                          include_retweets=user_args.retweets)
+            metrics.count('tweets', tweet_count)
+            tweet_total = tweet_count
+            statuses = []
+        elif user_args.snapshot:
+            import tweet_snapshot
+
+            if user_args.show or user_args.count or user_args.trends or user_args.index or user_args.dedupe:
+                print("warning: --show, --count, --trends, --index and --dedupe ignored for snapshots.",
+                      file=sys.stderr)
+
+            with metrics.timer('load_snapshot'):
+                header = tweet_snapshot.load_snapshots(tweet_words, user_args.snapshot)
+            tweet_total = header['tweets']
+            print(f"snapshot: {tweet_total} tweets from {len(header['sources'])} sources"
+                  f"{' (approximate counts)' if header['approximate'] else ''}", file=sys.stderr)
+            statuses = []
+        elif len(user_args.users) > 1:
+            if user_args.show or user_args.cache:
+                print("warning: --show and --cache ignored for more than one user.", file=sys.stderr)
+
+            # per user results then the aggregate
+            user_timelines, tweet_total = count_user_timelines(user_args, trend_index, tweet_index,
+                                                              duplicate_detector)
+            for user, user_words in user_timelines.items():
+                print(f"USER {user}")
+                with metrics.timer('report'):
+                    print_report(user_words)
+                print()
+                with metrics.timer('merge'):
+                    tweet_words.merge(user_words)
+
+            print("ALL USERS")
+            statuses = []
+        elif user_args.archive:
+            if user_args.jobs > 1:
+                print("warning: --jobs ignored with --show, --count, --trends, --index or --dedupe.", file=sys.stderr)
+            statuses = get_archive_statuses(user_args)
+        elif user_args.cache:
+            statuses = get_cached_timeline_statuses(user_args)
+        else:
+            statuses = get_timeline_statuses(user_args)
+
+        if user_args.show:
+            row_writer = get_row_writer(user_args, show_file)
+
+        tweet_counter = 0
+        for records in metrics.timed('fetch', iter_record_batches(statuses)):
+            # do all the word things
+            with metrics.timer('count'):
+                tweet_words.count_records(records)
+            metrics.count('tweets', len(records))
+
+            # no row work unless rows are shown
+            if row_writer is None:
+                tweet_counter += len(records)
+                continue
+
+            for record in records:
+                tweet_counter += 1
+
+                with metrics.timer('table_rows'):
+                    tweet_row = get_tweet_row(tweet_counter, record)
+
+                row_writer.add(tweet_row)
+
+        tweet_total += tweet_counter
+    except api_errors as err:
+        print(f"error: {err}")
+        metrics.count('errors')
+
+    if duplicate_detector is not None:
+        metrics.count('duplicates', duplicate_detector.duplicate_count)
+        print(duplicate_detector.get_summary(), file=sys.stderr)
+
+    if tweet_index is not None:
+        with metrics.timer('index'):
+            tweet_index.close()
+        print(tweet_index.get_summary(), file=sys.stderr)
+
+    if row_writer is not None:
+        with metrics.timer('table'):
+            row_writer.close()
+
+        if show_file is not sys.stdout:
+            show_file.close()
+
+    # jsonl and csv rows on stdout stay machine readable, the report goes to stderr
+    report_file = sys.stdout
+    if show_file is sys.stdout and user_args.show_format in (tweet_output.JSONL, tweet_output.CSV):
+        report_file = sys.stderr
+
+    with metrics.timer('report'), contextlib.redirect_stdout(report_file):
+        top_words = print_report(tweet_words)
+
+        if trend_index is not None and trend_index.tweet_count:
+            print()
+            with metrics.timer('trends'):
+                print_trends(tweet_words, trend_index, user_args.trend_window, user_args.trend_baseline,
+                             user_args.trend_end, user_args.top or 10)
+
+    if user_args.save_snapshot:
+        import tweet_snapshot
+
+        with metrics.timer('save_snapshot'):
+            sources = [os.path.basename(path) for path in user_args.archive or []] or user_args.users
+            count = tweet_snapshot.save_snapshot(user_args.save_snapshot, tweet_words, tweet_total, sources)
+        print(f"snapshot: {count} items from {tweet_total} tweets saved to {user_args.save_snapshot}", file=sys.stderr)
+
+    if user_args.save_vocabulary:
+        save_vocabulary(tweet_words, user_args.save_vocabulary)
+
     if user_args.wordcloud:
-        create_wordcloud(tweet_words.get_filtered_words())
+        with metrics.timer('wordcloud'):
+            create_wordcloud(tweet_words.get_filtered_words(top_words), user_args.wordcloud_output,
+                             user_args.wordcloud_size, user_args.wordcloud_mask)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,78 @@
+import math
+import heapq
+import operator
+import collections
+
+import heavy_hitters
+
+# word n-grams are counted as the words joined with spaces in one counter with the single words they
+# are made of, "climate change" next to "climate" and "change", so one counter holds everything pmi needs
+# and merges and snapshots like any other
+SEPARATOR = " "
+
+# collocations rarer than this are left out, pmi favours pairs of rare words seen once or twice
+MIN_COLLOCATION_COUNT = 5
+
+def get_size(ngram):
+    return ngram.count(SEPARATOR) + 1
+
+# the single words of a run and its n-grams of 2 to size words ending at each word
+def add_run_ngrams(run, size, ngrams):
+    for end in range(1, len(run) + 1):
+        ngrams.append(run[end - 1])
+        for n in range(2, min(size, end) + 1):
+            ngrams.append(SEPARATOR.join(run[end - n:end]))
+
+# the counts n-grams are ranked and shown by - from an approximate counter the count an n-gram is guaranteed
+# (its count less its error), so a phrase first counted after a prune isn't ranked by the error it started with
+def get_counts(counter):
+    if isinstance(counter, heavy_hitters.ApproximateCounter):
+        return ((ngram, counter.guaranteed(ngram)) for ngram in counter)
+
+    return counter.items()
+
+# (ngram, count) of n-grams of 2 words or more counted at least min_count times, all sorted when top is 0
+def get_top_ngrams(counter, top=0, min_count=1):
+    items = ((ngram, count) for ngram, count in get_counts(counter) if count >= min_count and SEPARATOR in ngram)
+    if top > 0:
+        return heapq.nlargest(top, items, key=operator.itemgetter(1))
+
+    return sorted(items, key=operator.itemgetter(1), reverse=True)
+
+# counted n-grams and single words of each size
+def get_size_totals(counter):
+    totals = collections.Counter()
+    for ngram, count in counter.items():
+        totals[get_size(ngram)] += count
+
+    return totals
+
+# (ngram, count, pmi) of n-grams of 2 words or more by pointwise mutual information - log2 of how much
+# more often the words are seen together than they would be by chance, p(ngram) / (p(w1) * .. * p(wn)),
+# each probability taken over the counted n-grams of its size. from an approximate counter the pruned
+# tail is left out of the totals, which shifts every score by about the same amount, and n-grams are scored
+# by their guaranteed counts
+def get_collocations(counter, top=0, min_count=MIN_COLLOCATION_COUNT):
+    totals = get_size_totals(counter)
+    if not totals[1]:
+        return []
+
+    log_words = math.log2(totals[1])
+    collocations = []
+    for ngram, count in get_counts(counter):
+        if count < min_count or SEPARATOR not in ngram:
+            continue
+
+        words = ngram.split(SEPARATOR)
+        word_counts = [counter.get(word, 0) for word in words]
+        if not all(word_counts):
+            continue
+
+        pmi = (math.log2(count) - math.log2(totals[len(words)]) -
+               sum(math.log2(word_count) for word_count in word_counts) + len(words) * log_words)
+        collocations.append((ngram, count, pmi))
+
+    if top > 0:
+        return heapq.nlargest(top, collocations, key=operator.itemgetter(2))
+
+    return sorted(collocations, key=operator.itemgetter(2), reverse=True)
@@ -0,0 +1,275 @@
+import os
+import numpy
+
+# compact word counts - each distinct word is interned once to a dense int id (in first seen order) and
+# counts and word lengths live in growable numpy arrays instead of boxed ints in a Counter. filters and
+# top-k run vectorized over the arrays and only the selected ids are turned back into words.
+# saved as .npz, or as a directory of .npy files that load memory-mapped
+class VocabularyCounter(object):
+    INITIAL_CAPACITY = 1024
+    FORMAT_VERSION = 1
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        # word -> id while counting, the id -> word list is rebuilt from the dict's order when needed
+        self._ids = {}
+        self._words = None
+        self._counts = numpy.zeros(capacity, dtype=numpy.int64)
+        self._lengths = numpy.zeros(capacity, dtype=numpy.int32)
+        self._size = 0
+
+        # set when loaded from a file - words stay utf-8 encoded until needed
+        self._blob = None
+        self._offsets = None
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        return iter(self._get_words())
+
+    def __contains__(self, word):
+        return word in self._get_ids()
+
+    def __getitem__(self, word):
+        word_id = self._get_ids().get(word)
+        if word_id is None:
+            return 0
+
+        return int(self._counts[word_id])
+
+    # supports the counter[word] += n idiom used for Counters
+    def __setitem__(self, word, count):
+        word_id = self._get_ids().get(word)
+        if word_id is None:
+            word_id = self._intern(word)
+        elif not self._counts.flags.writeable:
+            self._grow(len(self._counts))
+
+        self._counts[word_id] = count
+
+    @property
+    def total(self):
+        return int(self._counts[:self._size].sum())
+
+    @property
+    def counts(self):
+        return self._counts[:self._size]
+
+    @property
+    def lengths(self):
+        return self._lengths[:self._size]
+
+    # bytes held by the arrays, words and the id dict are extra
+    @property
+    def nbytes(self):
+        return self._counts.nbytes + self._lengths.nbytes
+
+    def word(self, word_id):
+        if self._blob is not None:
+            return bytes(self._blob[self._offsets[word_id]:self._offsets[word_id + 1]]).decode('utf-8')
+
+        return self._get_words()[word_id]
+
+    def _get_words(self):
+        if self._words is None:
+            if self._ids is not None:
+                self._words = list(self._ids)
+            else:
+                self._words = [self.word(word_id) for word_id in range(self._size)]
+
+        return self._words
+
+    def _get_ids(self):
+        if self._ids is None:
+            self._ids = {word: word_id for word_id, word in enumerate(self._get_words())}
+
+        return self._ids
+
+    def _grow(self, capacity):
+        # loaded arrays can be read only memory maps, growing copies them
+        counts = numpy.zeros(capacity, dtype=numpy.int64)
+        counts[:self._size] = self._counts[:self._size]
+        lengths = numpy.zeros(capacity, dtype=numpy.int32)
+        lengths[:self._size] = self._lengths[:self._size]
+
+        self._counts = counts
+        self._lengths = lengths
+
+    def _intern(self, word):
+        ids = self._get_ids()
+        self._blob = self._offsets = None
+
+        word_id = self._size
+        if word_id >= len(self._counts) or not self._counts.flags.writeable:
+            self._grow(max(self.INITIAL_CAPACITY, len(self._counts) * 2))
+
+        ids[word] = word_id
+        if self._words is not None:
+            self._words.append(word)
+        self._lengths[word_id] = len(word)
+        self._size += 1
+
+        return word_id
+
+    def get_id(self, word):
+        word_id = self._get_ids().get(word)
+        if word_id is None:
+            word_id = self._intern(word)
+
+        return word_id
+
+    # counts every word in an iterable (one tweet's words) with one array update
+    def add_words(self, words):
+        if not words:
+            return
+
+        get_id = self.get_id
+        word_ids = [get_id(word) for word in words]
+        if not self._counts.flags.writeable:
+            self._grow(len(self._counts))
+
+        numpy.add.at(self._counts, word_ids, 1)
+
+    def get(self, word, default=None):
+        word_id = self._get_ids().get(word)
+        if word_id is None:
+            return default
+
+        return int(self._counts[word_id])
+
+    def keys(self):
+        return list(self._get_words())
+
+    def values(self):
+        return self.counts.tolist()
+
+    def items(self):
+        return list(zip(self._get_words(), self.counts.tolist()))
+
+    # merging in another vocabulary maps its ids to ours and adds the counts in one go
+    def update(self, counts):
+        if isinstance(counts, VocabularyCounter):
+            if not counts:
+                return
+
+            get_id = self.get_id
+            word_ids = numpy.fromiter((get_id(word) for word in counts._get_words()), dtype=numpy.int64,
+                                      count=len(counts))
+            if not self._counts.flags.writeable:
+                self._grow(len(self._counts))
+
+            numpy.add.at(self._counts, word_ids, counts.counts)
+            return
+
+        for word, count in counts.items():
+            self[word] = self[word] + count
+
+    # boolean mask over ids of the words passing the min length, min count and stopword filters
+    def get_mask(self, min_length=0, min_frequency=0, stopwords=None):
+        mask = numpy.ones(self._size, dtype=bool)
+        if min_length > 1:
+            mask &= self.lengths >= min_length
+        if min_frequency > 1:
+            mask &= self.counts >= min_frequency
+        if stopwords:
+            ids = self._get_ids()
+            stopword_ids = [ids[word] for word in stopwords if word in ids]
+            mask[stopword_ids] = False
+
+        return mask
+
+    # ids of the top counts under mask, same order as a stable sort by count (ties stay in first seen order)
+    def get_top_ids(self, top=0, mask=None):
+        counts = self.counts
+        candidates = numpy.flatnonzero(mask) if mask is not None else numpy.arange(self._size)
+
+        if 0 < top < len(candidates):
+            candidate_counts = counts[candidates]
+            # count of the top-th item, everything above it is in and ties fill up the rest in id order
+            threshold = numpy.partition(candidate_counts, len(candidates) - top)[len(candidates) - top]
+            above = candidates[candidate_counts > threshold]
+            ties = candidates[candidate_counts == threshold][:top - len(above)]
+            candidates = numpy.sort(numpy.concatenate((above, ties)))
+
+        return candidates[numpy.argsort(-counts[candidates], kind='stable')]
+
+    # stopwords are dropped from top + len(stopwords) candidates rather than masked, so a loaded
+    # vocabulary only decodes the words it returns
+    def top_items(self, top=0, min_length=0, min_frequency=0, stopwords=None):
+        fetch = top + len(stopwords) if top and stopwords else top
+        top_ids = self.get_top_ids(fetch, self.get_mask(min_length, min_frequency))
+        counts = self.counts
+
+        items = [(self.word(word_id), int(counts[word_id])) for word_id in top_ids.tolist()]
+        if stopwords:
+            items = [item for item in items if item[0] not in stopwords]
+
+        return items[:top] if top else items
+
+    def most_common(self, n=None):
+        return self.top_items(n or 0)
+
+    def _get_blob(self):
+        if self._blob is not None:
+            return self._blob, self._offsets
+
+        encoded = [word.encode('utf-8') for word in self._get_words()]
+        offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(word) for word in encoded], out=offsets[1:])
+
+        return numpy.frombuffer(b"".join(encoded), dtype=numpy.uint8), offsets
+
+    # .npz file, or any other path as a directory of .npy files for memory-mapped loading
+    def save(self, path):
+        blob, offsets = self._get_blob()
+        arrays = {'counts': self.counts, 'lengths': self.lengths, 'offsets': offsets, 'blob': blob,
+                  'version': numpy.array([self.FORMAT_VERSION])}
+
+        if path.endswith('.npz'):
+            numpy.savez_compressed(path, **arrays)
+            return
+
+        os.makedirs(path, exist_ok=True)
+        for name, array in arrays.items():
+            numpy.save(os.path.join(path, f"{name}.npy"), array)
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        if path.endswith('.npz'):
+            with numpy.load(path) as npz_file:
+                arrays = {name: npz_file[name] for name in npz_file.files}
+        else:
+            arrays = {name: numpy.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None)
+                      for name in ('counts', 'lengths', 'offsets', 'blob', 'version')}
+
+        version = int(arrays['version'][0])
+        if version > cls.FORMAT_VERSION:
+            raise ValueError(f"unsupported vocabulary version {version} in {path}")
+
+        vocabulary = cls.__new__(cls)
+        vocabulary._counts = arrays['counts']
+        vocabulary._lengths = arrays['lengths']
+        vocabulary._blob = arrays['blob']
+        vocabulary._offsets = arrays['offsets']
+        vocabulary._size = len(vocabulary._counts)
+        vocabulary._words = None
+        vocabulary._ids = None
+
+        return vocabulary
+
+    def __getstate__(self):
+        blob, offsets = self._get_blob()
+        return {'counts': numpy.array(self.counts), 'lengths': numpy.array(self.lengths),
+                'blob': bytes(blob), 'offsets': offsets}
+
+    def __setstate__(self, state):
+        self._counts = state['counts']
+        self._lengths = state['lengths']
+        self._blob = numpy.frombuffer(state['blob'], dtype=numpy.uint8)
+        self._offsets = state['offsets']
+        self._size = len(self._counts)
+        self._words = None
+        self._ids = None
@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+import queue
+import heapq
+import operator
+import collections
+import multiprocessing
+
+DEFAULT_WIDTH = 1280
+DEFAULT_HEIGHT = 800
+DEFAULT_TOP = 200
+
+# a rendered frame - layout and write times in seconds
+Frame = collections.namedtuple('Frame', ['number', 'words', 'layout_seconds', 'write_seconds', 'path'])
+
+def get_default_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wordcloud.png')
+
+def get_top_frequencies(frequencies, top=DEFAULT_TOP):
+    if top and len(frequencies) > top:
+        return dict(heapq.nlargest(top, frequencies.items(), key=operator.itemgetter(1)))
+
+    return dict(frequencies)
+
+# total variation distance between two frequency dicts taken as distributions - 0 for the same
+# proportions, 1 for no words in common. a word entering or leaving the top adds its share
+def get_change(previous, current):
+    previous_total = sum(previous.values())
+    current_total = sum(current.values())
+    if not previous_total or not current_total:
+        return 0.0 if previous_total == current_total else 1.0
+
+    distance = 0.0
+    for word in previous.keys() | current.keys():
+        distance += abs(previous.get(word, 0) / previous_total - current.get(word, 0) / current_total)
+
+    return distance / 2
+
+# wordcloud loads its font_path again for every size it tries for every word. PIL reads a font from a
+# file object too, so the frames' WordCloud is given this in place of the path and the font file is read
+# from disk once per WordcloudFrames
+class _FontFile(object):
+    def __init__(self, path):
+        with open(path, 'rb') as font_file:
+            self._data = font_file.read()
+
+    def read(self):
+        return self._data
+
+# one WordCloud (font, colours, mask) set up once and laid out again for each frame. frames are written
+# to a temp file and renamed so a viewer never reads half an image
+class WordcloudFrames(object):
+    def __init__(self, path=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, mask_path=None, seed=1,
+                 background_color='white'):
+        import numpy
+        import wordcloud
+        from PIL import Image
+
+        self.path = path or get_default_path()
+        self.seed = seed
+        self.frame_count = 0
+
+        # the mask image is read and resized once, white pixels are left empty
+        mask = None
+        if mask_path:
+            with Image.open(mask_path) as mask_image:
+                mask = numpy.array(mask_image.convert('L').resize((width, height)))
+
+        # words are filtered before they get here
+        self.word_cloud = wordcloud.WordCloud(background_color=background_color, width=width, height=height,
+                                              mask=mask, max_words=DEFAULT_TOP, stopwords=set())
+        self.word_cloud.font_path = _FontFile(self.word_cloud.font_path)
+
+    def render(self, frequencies):
+        import random
+
+        self.frame_count += 1
+        self.word_cloud.max_words = max(len(frequencies), 1)
+
+        # same seed every frame so a word keeps its place while the counts barely move
+        self.word_cloud.random_state = random.Random(self.seed)
+
+        start = time.perf_counter()
+        self.word_cloud.generate_from_frequencies(frequencies)
+        layout_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        root, extension = os.path.splitext(self.path)
+        temp_path = f"{root}.tmp{extension}"
+        self.word_cloud.to_image().save(temp_path)
+        os.replace(temp_path, self.path)
+        write_seconds = time.perf_counter() - start
+
+        return Frame(self.frame_count, len(frequencies), layout_seconds, write_seconds, self.path)
+
+def _render_frames(requests, results, options):
+    frames = WordcloudFrames(**options)
+    while True:
+        frequencies = requests.get()
+        if frequencies is None:
+            break
+
+        try:
+            results.put(frames.render(frequencies))
+        except (ValueError, OSError) as err:
+            results.put(err)
+
+# renders word clouds in a child process so the layout (seconds for a large image) never holds up
+# the caller. at most one frame is in flight - frequencies submitted meanwhile replace each other and
+# the latest is sent when the frame is done. frequencies that moved less than min_change (get_change)
+# from the last rendered frame are skipped
+class WordcloudRenderer(object):
+    def __init__(self, path=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, top=DEFAULT_TOP, min_change=0.02,
+                 mask_path=None):
+        self.top = top
+        self.min_change = min_change
+        self.options = {'path': path or get_default_path(), 'width': width, 'height': height,
+                        'mask_path': mask_path}
+
+        self.frames = []
+        self.skipped = 0
+        self.errors = 0
+
+        self._requests = None
+        self._results = None
+        self._process = None
+        self._in_flight = False
+        self._pending = None
+        self._last = None
+
+    @property
+    def path(self):
+        return self.options['path']
+
+    @property
+    def last_frame(self):
+        return self.frames[-1] if self.frames else None
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        self._requests = context.Queue()
+        self._results = context.Queue()
+        self._process = context.Process(target=_render_frames, args=(self._requests, self._results, self.options),
+                                        daemon=True)
+        self._process.start()
+
+        return self
+
+    # returns whether the frequencies were queued for rendering
+    def submit(self, frequencies):
+        frequencies = get_top_frequencies(frequencies, self.top)
+        if not frequencies:
+            return False
+
+        last = self._pending or self._last
+        if last is not None and get_change(last, frequencies) < self.min_change:
+            self.skipped += 1
+            return False
+
+        if self._in_flight:
+            self._pending = frequencies
+        else:
+            self._send(frequencies)
+
+        return True
+
+    def _send(self, frequencies):
+        self._requests.put(frequencies)
+        self._in_flight = True
+        self._last = frequencies
+        self._pending = None
+
+    # frames finished since the last poll, sends the pending frequencies once the process is free
+    def poll(self, timeout=0):
+        finished = []
+        while self._in_flight:
+            try:
+                result = self._results.get(timeout=timeout) if timeout else self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            self._in_flight = False
+            if isinstance(result, Exception):
+                self.errors += 1
+                print(f"wordcloud: {result}", file=sys.stderr)
+            else:
+                self.frames.append(result)
+                finished.append(result)
+
+            if self._pending is not None:
+                self._send(self._pending)
+
+        return finished
+
+    # waits for the frame in flight (and a pending one) before stopping the process, unless the process
+    # has died and no frame can come
+    def stop(self, timeout=60):
+        finished = []
+        if self._process is None:
+            return finished
+
+        deadline = time.monotonic() + timeout
+        while self._in_flight and self._process.is_alive() and time.monotonic() < deadline:
+            finished += self.poll(timeout=min(max(deadline - time.monotonic(), 0.01), 0.5))
+
+        if self._process.is_alive():
+            self._requests.put(None)
+            self._process.join(timeout=max(deadline - time.monotonic(), 1))
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+
+        return finished
+
+    def get_summary(self):
+        if not self.frames:
+            return f"wordcloud: no frames, {self.skipped} skipped"
+
+        render_seconds = [frame.layout_seconds + frame.write_seconds for frame in self.frames]
+        return (f"wordcloud: {len(self.frames)} frames, {self.skipped} skipped, render mean "
+                f"{sum(render_seconds) / len(render_seconds):.2f}s max {max(render_seconds):.2f}s to {self.path}")
+
+def format_frame(frame):
+    return (f"wordcloud: frame {frame.number}, {frame.words} words, layout {frame.layout_seconds:.2f}s "
+            f"write {frame.write_seconds:.2f}s")